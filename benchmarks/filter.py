@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""Measures the word filter's hot path against synthetic message corpora.
+
+Runs the same in-memory checks as Filter.on_message, FilterState.scan followed by highlighting
+and picking a punishment for messages that pop the filter, so no connection to discord or
+postgres is needed. Run from the repo root:
+
+    python -m benchmarks.filter --messages 5000 --words 10 --words 1000
+"""
+import argparse
+import gc
+import random
+import string
+import time
+import tracemalloc
+import typing
+from utils.cache import FilterState
+from utils.filter_engine import PUNISHMENT_ORDER, SHORT_WORD_LENGTH, FilterWord, highest_punishment, highlight
+
+CHANNEL_ID = 1
+WHITELISTED_CHANNEL_ID = 2
+
+VOCABULARY = ("the", "a", "is", "it", "to", "and", "you", "that", "was", "for", "on", "are", "with", "they", "be",
+              "at", "one", "have", "this", "from", "what", "some", "can", "out", "other", "were", "all", "there",
+              "when", "use", "your", "how", "said", "each", "which", "their", "time", "will", "about", "many",
+              "then", "them", "would", "like", "so", "these", "her", "long", "make", "thing", "see", "him", "two",
+              "has", "look", "more", "day", "could", "go", "come", "did", "number", "sound", "most", "people",
+              "lol", "ok", "yeah", "anyone", "know", "why", "does", "bot", "server", "update", "game", "help")
+UNICODE_WORDS = ("héllo", "café", "naïve", "日本語", "こんにちは", "привет", "مرحبا", "😂", "👍🏻", "🎉", "ｆｕｌｌｗｉｄｔｈ",
+                 "zero​width", "ß", "ﬁne", "Ωmega")
+EVASION_SEPARATORS = (" ", ".", "-", "_", "*", " . ")
+
+
+def make_words(amount: int, rng: random.Random, fuzzy_threshold: int = None) -> typing.Dict[str, FilterWord]:
+    """Filtered words of realistic lengths, a third short enough to also be matched spelled out"""
+    words = {}
+    while len(words) < amount:
+        length = rng.choice((3, 4, 4, 5, 6, 7, 8, 10))
+        word = "".join(rng.choices(string.ascii_lowercase, k=length))
+        words[word] = FilterWord(word, rng.choice(PUNISHMENT_ORDER),
+                                 fuzzy_threshold if length < SHORT_WORD_LENGTH else None)
+    return words
+
+
+def _sentence(rng: random.Random, length: int) -> typing.List[str]:
+    return [rng.choice(VOCABULARY) for _ in range(length)]
+
+
+def _maybe_insert(tokens: typing.List[str], words: typing.List[str], hit_rate: float, rng: random.Random,
+                  disguise: typing.Callable[[str], str] = str):
+    if rng.random() < hit_rate:
+        tokens.insert(rng.randrange(len(tokens) + 1), disguise(rng.choice(words)))
+
+
+def chat_corpus(words: typing.List[str], amount: int, hit_rate: float, rng: random.Random) -> typing.List[str]:
+    """Short messages of common words and punctuation"""
+    messages = []
+    for _ in range(amount):
+        tokens = _sentence(rng, rng.randint(3, 25))
+        _maybe_insert(tokens, words, hit_rate, rng)
+        message = " ".join(tokens)
+        messages.append(message.capitalize() + rng.choice(("", ".", "?", "!", " :)", "...")))
+    return messages
+
+
+def paste_corpus(words: typing.List[str], amount: int, hit_rate: float, rng: random.Random) -> typing.List[str]:
+    """Long code and log pastes close to the 2000 character message limit"""
+    messages = []
+    for _ in range(amount):
+        lines = ["```py"]
+        while sum(map(len, lines)) < 1900:
+            tokens = _sentence(rng, rng.randint(2, 6))
+            lines.append(rng.choice((
+                f"    {'_'.join(tokens)} = {rng.randint(0, 10 ** 6)}",
+                f"[{rng.randint(0, 23):02}:{rng.randint(0, 59):02}] INFO {' '.join(tokens)}",
+                f"def {'_'.join(tokens)}(self, *args):",
+                f"# {' '.join(tokens)}"
+            )))
+        _maybe_insert(lines, words, hit_rate, rng)
+        lines.append("```")
+        messages.append("\n".join(lines)[:2000])
+    return messages
+
+
+def spaced_corpus(words: typing.List[str], amount: int, hit_rate: float, rng: random.Random) -> typing.List[str]:
+    """Chat where filtered words are spelled out with separators to dodge the filter"""
+    def disguise(word):
+        separator = rng.choice(EVASION_SEPARATORS)
+        return separator.join(c.upper() if rng.random() < 0.3 else c for c in word)
+
+    messages = []
+    for _ in range(amount):
+        tokens = _sentence(rng, rng.randint(3, 20))
+        _maybe_insert(tokens, words, hit_rate, rng, disguise)
+        # innocent single letters spelled out as well, the worst case for the spaced matcher
+        if rng.random() < 0.5:
+            tokens.insert(rng.randrange(len(tokens) + 1), " ".join(rng.choice(VOCABULARY)))
+        messages.append(" ".join(tokens))
+    return messages
+
+
+def unicode_corpus(words: typing.List[str], amount: int, hit_rate: float, rng: random.Random) -> typing.List[str]:
+    """Chat mixed with accents, other scripts, emoji and invisible characters"""
+    messages = []
+    for _ in range(amount):
+        tokens = _sentence(rng, rng.randint(3, 20))
+        for _ in range(rng.randint(1, 6)):
+            tokens.insert(rng.randrange(len(tokens) + 1), rng.choice(UNICODE_WORDS))
+        _maybe_insert(tokens, words, hit_rate, rng)
+        messages.append(" ".join(tokens))
+    return messages
+
+
+CORPORA = {
+    'chat': chat_corpus,
+    'paste': paste_corpus,
+    'spaced': spaced_corpus,
+    'unicode': unicode_corpus
+}
+
+
+def check(state: FilterState, content: str) -> typing.Optional[typing.Tuple[str, str]]:
+    """Filter.on_message without the discord calls, returns the highlighted message and punishment of a pop"""
+    matches = state.scan(CHANNEL_ID, content)
+    if not matches:
+        return None
+    return highlight(content, matches), highest_punishment(matches)
+
+
+def _percentile(ordered: typing.Sequence[float], p: float) -> float:
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+def measure(state: FilterState, messages: typing.List[str]) -> dict:
+    """Times every message, then runs the corpus again under tracemalloc for the allocations"""
+    for content in messages[:100]:
+        check(state, content)
+
+    gc.collect()
+    gc.disable()
+    timings = []
+    pops = 0
+    try:
+        start = time.perf_counter()
+        for content in messages:
+            before = time.perf_counter()
+            popped = check(state, content)
+            timings.append(time.perf_counter() - before)
+            pops += popped is not None
+        elapsed = time.perf_counter() - start
+    finally:
+        gc.enable()
+
+    # tracemalloc slows everything down, so allocations are measured on their own pass
+    peaks = []
+    tracemalloc.start()
+    try:
+        for content in messages:
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            check(state, content)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - baseline)
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'per_second': len(messages) / elapsed,
+        'p50': _percentile(timings, 50),
+        'p99': _percentile(timings, 99),
+        'pops': pops / len(messages),
+        'mean_alloc': sum(peaks) / len(peaks),
+        'max_alloc': max(peaks)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and latency of the word filter's hot path")
+    parser.add_argument("--messages", type=int, default=2000, help="messages per corpus")
+    parser.add_argument("--words", type=int, action='append', help="filtered words, defaults to 10, 100 and 1000")
+    parser.add_argument("--corpus", choices=list(CORPORA), action='append', help="defaults to every corpus")
+    parser.add_argument("--hit-rate", type=float, default=0.05, help="share of messages containing a filtered word")
+    parser.add_argument("--fuzzy", type=int, default=75, help="fuzzy threshold of short words, 0 to turn it off")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{args.messages} messages per corpus, {args.hit_rate:.0%} containing a filtered word\n")
+    print(f"{'corpus':<8} {'words':>6} {'build ms':>9} {'msgs/s':>10} {'p50 us':>8} {'p99 us':>8} {'popped':>7} "
+          f"{'alloc B':>9} {'max B':>9}")
+    for amount in args.words or (10, 100, 1000):
+        rng = random.Random(args.seed)
+        words = make_words(amount, rng, args.fuzzy or None)
+        build_start = time.perf_counter()
+        state = FilterState(0, words, {WHITELISTED_CHANNEL_ID})
+        build = time.perf_counter() - build_start
+        for name in args.corpus or CORPORA:
+            messages = CORPORA[name](list(words), args.messages, args.hit_rate, random.Random(args.seed))
+            result = measure(state, messages)
+            print(f"{name:<8} {amount:>6} {build * 1000:>9.2f} {result['per_second']:>10.0f} "
+                  f"{result['p50'] * 1e6:>8.1f} {result['p99'] * 1e6:>8.1f} {result['pops']:>7.1%} "
+                  f"{result['mean_alloc']:>9.0f} {result['max_alloc']:>9}")
+
+
+if __name__ == "__main__":
+    main()
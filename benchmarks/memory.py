@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Measures how much memory discord.py's caches use under each memory profile.
+
+Builds a synthetic population of guilds, members and messages straight into a
+ConnectionState, no connection to discord is needed. Run from the repo root:
+
+    python -m benchmarks.memory --guilds 200 --members 500
+"""
+import argparse
+import gc
+import tracemalloc
+import discord
+from discord.state import ConnectionState
+from utils.memory import PROFILES, MemoryProfile, resize_message_cache
+
+SELF_ID = 1
+
+
+def _member_payload(user_id: int) -> dict:
+    return {
+        'user': {'id': str(user_id), 'username': f"user{user_id}", 'discriminator': str(user_id % 10000).zfill(4),
+                 'avatar': None},
+        'roles': [],
+        'joined_at': "2021-01-01T00:00:00+00:00",
+        'deaf': False,
+        'mute': False,
+        'flags': 0
+    }
+
+
+def _guild_payload(guild_id: int, members: int, chunked: bool, joined_fraction: float) -> dict:
+    """A GUILD_CREATE payload, unchunked guilds only carry the bot itself and members that
+    joined while the bot was running"""
+    cached = members if chunked else int(members * joined_fraction)
+    base = guild_id * 1_000_000
+    payload_members = [_member_payload(SELF_ID)] + [_member_payload(base + i) for i in range(2, cached + 2)]
+    return {
+        'id': str(guild_id),
+        'name': f"guild {guild_id}",
+        'owner_id': str(base + 2),
+        'member_count': members,
+        'roles': [{'id': str(guild_id), 'name': "@everyone", 'permissions': "0", 'position': 0, 'color': 0,
+                   'hoist': False, 'managed': False, 'mentionable': False}],
+        'channels': [{'id': str(guild_id + 1), 'type': 0, 'name': "general", 'position': 0,
+                      'permission_overwrites': []}],
+        'members': payload_members,
+        'emojis': [],
+        'features': []
+    }
+
+
+def _message_payload(message_id: int, channel_id: int, author_id: int) -> dict:
+    return {
+        'id': str(message_id),
+        'channel_id': str(channel_id),
+        'author': _member_payload(author_id)['user'],
+        'content': "a synthetic message of an ordinary length for a chat channel",
+        'timestamp': "2021-01-01T00:00:00+00:00",
+        'edited_timestamp': None,
+        'tts': False,
+        'mention_everyone': False,
+        'mentions': [],
+        'mention_roles': [],
+        'attachments': [],
+        'embeds': [],
+        'pinned': False,
+        'type': 0
+    }
+
+
+class _Bot:
+    """Just enough of a client for resize_message_cache"""
+
+    def __init__(self, state: ConnectionState):
+        self._connection = state
+
+    @property
+    def guilds(self):
+        return self._connection.guilds
+
+
+def measure(profile: MemoryProfile, guilds: int, members: int, messages: int, joined_fraction: float) -> dict:
+    """Builds the population under a profile and returns the bytes it took"""
+    gc.collect()
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+
+    options = profile.client_options()
+    state = ConnectionState(dispatch=lambda *a, **k: None, handlers={}, hooks={}, http=None, **options)
+    state.clear()
+    state.user = discord.ClientUser(state=state, data=_member_payload(SELF_ID)['user'])
+    if not isinstance(getattr(type(state), 'self_id', None), property):
+        state.self_id = SELF_ID  # older discord.py versions store it separately
+    for guild_id in range(1, guilds + 1):
+        guild = discord.Guild(data=_guild_payload(guild_id * 10, members, profile.chunk_guilds_at_startup,
+                                                  joined_fraction), state=state)
+        state._add_guild(guild)
+
+    resize_message_cache(_Bot(state), profile.messages_per_guild)
+    for guild in state.guilds:
+        channel = guild.text_channels[0]
+        for i in range(messages):
+            message = discord.Message(state=state, channel=channel,
+                                      data=_message_payload(guild.id * 100_000 + i, channel.id, guild.id * 1_000_000 + 2))
+            state._messages.append(message)
+
+    gc.collect()
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    used = end - start
+    cached_members = sum(len(g._members) for g in state.guilds)
+    return {
+        'profile': profile.name,
+        'bytes': used,
+        'per_guild': used / guilds,
+        'per_member': used / (guilds * members),
+        'cached_members': cached_members,
+        'cached_messages': len(state._messages)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory used by discord.py's caches under each memory profile")
+    parser.add_argument("--guilds", type=int, default=100)
+    parser.add_argument("--members", type=int, default=500, help="members per guild")
+    parser.add_argument("--messages", type=int, default=200, help="messages seen per guild")
+    parser.add_argument("--joined-fraction", type=float, default=0.02,
+                        help="share of members that join while the bot is running, for unchunked profiles")
+    parser.add_argument("--profile", choices=list(PROFILES), action='append', help="defaults to every profile")
+    args = parser.parse_args()
+
+    print(f"{args.guilds} guilds, {args.members} members and {args.messages} messages per guild\n")
+    print(f"{'profile':<10} {'total MiB':>10} {'B/guild':>12} {'B/member':>10} {'members':>10} {'messages':>10}")
+    for name in args.profile or PROFILES:
+        result = measure(PROFILES[name], args.guilds, args.members, args.messages, args.joined_fraction)
+        print(f"{result['profile']:<10} {result['bytes'] / 2 ** 20:>10.2f} {result['per_guild']:>12.0f} "
+              f"{result['per_member']:>10.1f} {result['cached_members']:>10} {result['cached_messages']:>10}")
+
+
+if __name__ == "__main__":
+    main()
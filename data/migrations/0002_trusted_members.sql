@@ -0,0 +1,13 @@
+-- one row per trusted user instead of an array per guild, trusting someone no longer rewrites the whole list
+CREATE TABLE IF NOT EXISTS terrygon.trusted_members
+(
+    guild_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    PRIMARY KEY (guild_id, user_id)
+);
+
+INSERT INTO terrygon.trusted_members (guild_id, user_id)
+    SELECT guild_id, unnest(trusted_uid) FROM terrygon.trusted_users WHERE trusted_uid IS NOT NULL
+    ON CONFLICT DO NOTHING;
+
+DROP TABLE terrygon.trusted_users;
@@ -0,0 +1,3 @@
+-- per word similarity (out of 100) a spelled out run of letters needs to count as the word, NULL for exact matches only
+ALTER TABLE terrygon.filtered_words ADD COLUMN IF NOT EXISTS fuzzy_threshold SMALLINT
+    CHECK (fuzzy_threshold BETWEEN 1 AND 100);
@@ -0,0 +1,2 @@
+-- filtered words can be regular expressions, checked against a safe subset when added
+ALTER TABLE terrygon.filtered_words ADD COLUMN IF NOT EXISTS is_regex BOOLEAN NOT NULL DEFAULT FALSE;
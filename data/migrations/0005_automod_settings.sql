@@ -0,0 +1,15 @@
+-- per guild thresholds for automod, each check trips at its limit or more within its seconds
+CREATE TABLE IF NOT EXISTS terrygon.automod_settings
+(
+    guild_id BIGINT PRIMARY KEY,
+    automod_enabled BOOLEAN DEFAULT FALSE,
+    flood_messages SMALLINT DEFAULT 6,
+    flood_seconds SMALLINT DEFAULT 5,
+    mention_limit SMALLINT DEFAULT 10,
+    mention_seconds SMALLINT DEFAULT 15,
+    duplicate_limit SMALLINT DEFAULT 4,
+    duplicate_seconds SMALLINT DEFAULT 30,
+    automod_punishment TEXT DEFAULT 'delete'
+);
+
+INSERT INTO terrygon.automod_settings (guild_id) SELECT guild_id FROM terrygon.guild_settings ON CONFLICT DO NOTHING;
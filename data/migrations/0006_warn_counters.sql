@@ -0,0 +1,16 @@
+-- how many warns each user has in each guild, kept in step by the statements in utils/warns.py
+CREATE TABLE IF NOT EXISTS terrygon.warn_counters
+(
+    guild_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    warns INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, user_id)
+);
+
+INSERT INTO terrygon.warn_counters (guild_id, user_id, warns)
+    SELECT guild_id, user_id, COUNT(*) FROM terrygon.warns GROUP BY guild_id, user_id
+    ON CONFLICT (guild_id, user_id) DO UPDATE SET warns = excluded.warns;
+
+-- every warn lookup is by guild and user in warn order, warns_idx led with user_id and author_id
+CREATE INDEX IF NOT EXISTS warns_guild_user_idx ON terrygon.warns (guild_id, user_id, warn_id);
+DROP INDEX IF EXISTS terrygon.warns_idx;
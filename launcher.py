@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Runs Terrygon as several processes, each handling a range of shards.
+
+Configured by the [cluster] block of config.toml, run this instead of terrygon.py.
+A cluster that exits with code 0 (the restart command) is started again, any
+other exit code leaves it stopped. The launcher exits once every cluster has stopped.
+"""
+import asyncio
+import multiprocessing
+import os
+import secrets
+import sys
+import aiohttp
+from logzero import setup_logger
+from utils import cluster
+from utils.config import get_config
+
+DISCORD_API = "https://discord.com/api/v9"
+
+
+def run_cluster(cluster_id: int, shard_ids: list, shard_count: int, port: int, secret: str):
+    """Worker process entry point, each cluster gets its own event loop and database pool"""
+    from terrygon import Terrygon
+    bot = Terrygon(shard_ids=shard_ids, shard_count=shard_count)
+    bot.cluster = cluster.ClusterClient(bot, cluster_id, port, secret)
+    bot.run(bot.config.token)
+
+
+async def recommended_shards(token: str) -> int:
+    """Asks discord how many shards the bot should use"""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{DISCORD_API}/gateway/bot", headers={'Authorization': f"Bot {token}"}) as resp:
+            resp.raise_for_status()
+            return (await resp.json())['shards']
+
+
+class Launcher:
+    def __init__(self):
+        self.log = setup_logger(name="launcher_log", logfile="data/logs/console_output.log", maxBytes=100000)
+        self.config = get_config().snapshot
+        self.cluster_config = self.config.section('cluster')
+        self.secret = secrets.token_hex(32)
+        self.port = self.cluster_config.get('ipc_port', 4200)
+        self.hub = cluster.ClusterHub(self.secret, self.log)
+        self.processes = {}
+        self.shards = []
+        self.shard_count = 0
+
+    def spawn(self, cluster_id: int) -> multiprocessing.Process:
+        process = multiprocessing.Process(target=run_cluster, name=f"terrygon-cluster-{cluster_id}", args=(
+            cluster_id, self.shards[cluster_id], self.shard_count, self.port, self.secret))
+        process.start()
+        self.log.info(f"Cluster {cluster_id} started with shards {self.shards[cluster_id]} (pid {process.pid})")
+        return process
+
+    async def run(self):
+        self.shard_count = self.cluster_config.get('shard_count', 0) or await recommended_shards(self.config.token)
+        self.shards = cluster.split_shards(self.shard_count, self.cluster_config.get('clusters', os.cpu_count() or 1))
+        self.log.info(f"Launching {self.shard_count} shards over {len(self.shards)} clusters")
+        server = await self.hub.start(self.port)
+        for cluster_id in range(len(self.shards)):
+            self.processes[cluster_id] = self.spawn(cluster_id)
+
+        while self.processes:
+            await asyncio.sleep(1)
+            for cluster_id, process in list(self.processes.items()):
+                if process.is_alive():
+                    continue
+                if process.exitcode == 0:
+                    self.log.info(f"Cluster {cluster_id} restarting")
+                    self.processes[cluster_id] = self.spawn(cluster_id)
+                else:
+                    self.log.warning(f"Cluster {cluster_id} stopped with exit code {process.exitcode}")
+                    del self.processes[cluster_id]
+
+        server.close()
+        await server.wait_closed()
+
+
+if __name__ == "__main__":
+    # a fresh interpreter per cluster, forked processes would share the launcher's event loop state
+    multiprocessing.set_start_method('spawn')
+    try:
+        asyncio.get_event_loop().run_until_complete(Launcher().run())
+    except KeyboardInterrupt:
+        sys.exit(1)
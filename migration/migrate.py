@@ -298,11 +298,11 @@ async def main(old_db_path: str, new_db_path: str):
         'guildid': 'guild_id'
     }))
 
-    # trusted
-    await transfer_data(old_data['trustedusers'], 'trusted_users', new_db, dict({
-        'guildid': 'guild_id',
-        'trusteduid': 'trusted_uid'
-    }))
+    # trusted, one row per trusted user
+    for row in old_data['trustedusers']:
+        for user_id in row['trusteduid'] or ():
+            await new_db.execute("INSERT INTO trusted_members (guild_id, user_id) VALUES ($1, $2) ON CONFLICT DO NOTHING",
+                                 row['guildid'], user_id)
 
     # channel_block
     await transfer_data(old_data['channel_block'], 'channel_block', new_db, dict({
@@ -313,6 +313,13 @@ async def main(old_db_path: str, new_db_path: str):
         'reason': 'reason'
     }))
 
+    # warn counters, the 0006 backfill ran before any warns were imported
+    await new_db.execute("""
+        INSERT INTO warn_counters (guild_id, user_id, warns)
+            SELECT guild_id, user_id, COUNT(*) FROM warns GROUP BY guild_id, user_id
+            ON CONFLICT (guild_id, user_id) DO UPDATE SET warns = excluded.warns
+    """)
+
     print("Finished.")
 
 if os.name == 'nt':
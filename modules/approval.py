@@ -22,29 +22,26 @@ class Approval(commands.Cog):
     @approval_system_manager.command(name="toggle")
     async def toggle(self, ctx: commands.Context):
         """Enables or disables a server's approval system"""
-        async with self.bot.db.acquire() as conn:
-            approval_role_id = await conn.fetchval("SELECT approved_role FROM roles WHERE guild_id = $1", ctx.guild.id)
-            approval_channel_id = await conn.fetchval("SELECT approval_channel FROM channels WHERE guild_id = $1", ctx.guild.id)
-            if approval_role_id is None or approval_channel_id:
-                await ctx.send("Missing registered approval role or approval gateway channel. To configure these, please use `approvalsystem configure`. This command is for enabling or disabling an existing approval system!")
-                return
+        guild_config = await self.bot.guild_config.get(ctx.guild.id)
+        if guild_config.approved_role is None or guild_config.approval_channel:
+            await ctx.send("Missing registered approval role or approval gateway channel. To configure these, please use `approvalsystem configure`. This command is for enabling or disabling an existing approval system!")
+            return
 
-            status = await conn.fetchval("SELECT approval_system FROM guild_settings WHERE guild_id = $1", ctx.guild.id)
-            if status:
-                await conn.execute("UPDATE guild_settings SET approval_system = FALSE WHERE guild_id = $1", ctx.guild.id)
-                try:
-                    await self.bot.terrygon_logger.toggle_log_setup('unset', 'approval system', ctx.author, 'mod_logs')
-                except errors.LoggingError:
-                    pass
-                await ctx.send("Approval system disabled")
+        if guild_config.approval_system:
+            await self.bot.guild_config.set(ctx.guild.id, approval_system=False)
+            try:
+                await self.bot.terrygon_logger.toggle_log_setup('unset', 'approval system', ctx.author, 'mod_logs')
+            except errors.LoggingError:
+                pass
+            await ctx.send("Approval system disabled")
 
-            else:
-                await conn.execute("UPDATE guild_settings SET approval_system = TRUE WHERE guild_id = $1", ctx.guild.id)
-                try:
-                    await self.bot.terrygon_logger.toggle_log_setup('set', 'approval system', ctx.author, 'mod_logs')
-                except errors.LoggingError:
-                    pass
-                await ctx.send("Approval system enabled! use approve to let new members in")
+        else:
+            await self.bot.guild_config.set(ctx.guild.id, approval_system=True)
+            try:
+                await self.bot.terrygon_logger.toggle_log_setup('set', 'approval system', ctx.author, 'mod_logs')
+            except errors.LoggingError:
+                pass
+            await ctx.send("Approval system enabled! use approve to let new members in")
 
     @commands.guild_only()
     @checks.is_staff_or_perms("Owner", administrator=True)
@@ -93,11 +90,8 @@ class Approval(commands.Cog):
         if approval_role is None or approval_channel is None:
             return await ctx.send("Invalid data given, please run this command again")
 
-        async with self.bot.db.acquire() as conn:
-            await conn.execute(
-                "UPDATE guild_settings SET approval_system = TRUE WHERE guild_id = $1", ctx.guild.id)
-            await conn.execute("UPDATE channels SET approval_channel = $1 WHERE guild_id = $2", approval_channel.id, ctx.guild.id)
-            await conn.execute("UPDATE roles SET approved_role = $1 WHERE guild_id =$2", approval_role.id, ctx.guild.id)
+        await self.bot.guild_config.set(ctx.guild.id, approval_system=True, approval_channel=approval_channel.id,
+                                        approved_role=approval_role.id)
 
         # now to set the permissions up
         try:
@@ -125,14 +119,12 @@ class Approval(commands.Cog):
     @approval_system_manager.command()
     async def remove(self, ctx: commands.Context):
         """Disables and removes an approval system fully from a server"""
-        async with self.bot.db.acquire() as conn:
-            if not await conn.fetchval("SELECT approval_system FROM guild_settings WHERE guild_id = $1", ctx.guild.id):
-                return await ctx.send("You do not have an approval system enabled, and thus do not need this!")
+        guild_config = await self.bot.guild_config.get(ctx.guild.id)
+        if not guild_config.approval_system:
+            return await ctx.send("You do not have an approval system enabled, and thus do not need this!")
 
-            approval_role = ctx.guild.get_role(
-                await conn.fetchval("SELECT approved_role FROM roles WHERE guild_id = $1", ctx.guild.id))
-            approval_channel = ctx.guild.get_channel(
-                await conn.fetchval("SELECT approval_channel FROM channels WHERE guild_id = $1", ctx.guild.id))
+        approval_role = ctx.guild.get_role(guild_config.approved_role)
+        approval_channel = ctx.guild.get_channel(guild_config.approval_channel)
 
         # remove all permissions that the approval system needed
         if approval_role:
@@ -150,7 +142,7 @@ class Approval(commands.Cog):
             else:
                 await msg.edit(content="Role not deleted.")
         else:
-            await self.bot.db.execute("UPDATE roles SET approved_role = NULL WHERE guild_id = $1", ctx.guild.id)
+            await self.bot.guild_config.set(ctx.guild.id, approved_role=None)
             await ctx.send("Approval role has already been deleted, removing from database")
 
         if approval_channel:
@@ -165,12 +157,12 @@ class Approval(commands.Cog):
                 await msg.edit(content="Channel not deleted")
         else:
             try:
-                await self.bot.db.execute("UPDATE channels SET approval_channel = NULL WHERE guild_id = $1", ctx.guild.id)
+                await self.bot.guild_config.set(ctx.guild.id, approval_channel=None)
             except asyncpg.UndefinedColumnError:
                 pass
             await ctx.send("Approval channel has already been delete, removing from database.")
 
-        await self.bot.db.execute("UPDATE guild_settings SET approval_system = NULL WHERE guild_id = $1", ctx.guild.id)
+        await self.bot.guild_config.set(ctx.guild.id, approval_system=None)
         await self.bot.db.execute("DELETE FROM approved_members WHERE guild_id = $1", ctx.guild.id)
         try:
             await self.bot.terrygon_logger.approval_deletion(ctx.author, approval_channel, approval_role)
@@ -183,12 +175,13 @@ class Approval(commands.Cog):
     async def approve(self, ctx: commands.Context, member: discord.Member):
         """Approve members"""
 
+        guild_config = await self.bot.guild_config.get(ctx.guild.id)
         async with self.bot.db.acquire() as conn:
-            if not await conn.fetchval("SELECT approval_system FROM guild_settings WHERE guild_id = $1", ctx.guild.id):
+            if not guild_config.approval_system:
                 await ctx.send("Approval system disabled, you have no need for this!")
                 return
 
-            approved_role = ctx.guild.get_role(await conn.fetchval("SELECT approved_role FROM roles WHERE guild_id = $1", ctx.guild.id))
+            approved_role = ctx.guild.get_role(guild_config.approved_role)
             if approved_role in member.roles or await conn.fetchval(
                     "SELECT user_id FROM approved_members WHERE guild_id = $1", ctx.guild.id) == member.id:
                 await ctx.send("Member already approved")
@@ -216,13 +209,13 @@ class Approval(commands.Cog):
     async def unapprove(self, ctx: commands.Context, member: discord.Member):
         """Unapprove members"""
 
+        guild_config = await self.bot.guild_config.get(ctx.guild.id)
         async with self.bot.db.acquire() as conn:
-            if not await conn.fetchval("SELECT approval_system FROM guild_settings WHERE guild_id = $1", ctx.guild.id):
+            if not guild_config.approval_system:
                 await ctx.send("Approval system disabled, you have no need for this!")
                 return
 
-            approved_role = ctx.guild.get_role(
-                await conn.fetchval("SELECT approved_role FROM roles WHERE guild_id = $1", ctx.guild.id))
+            approved_role = ctx.guild.get_role(guild_config.approved_role)
             if not approved_role in member.roles or not await conn.fetchval(
                     "SELECT user_id FROM approved_members WHERE guild_id = $1", ctx.guild.id):
                 await ctx.send("Member not approved")
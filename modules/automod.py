@@ -0,0 +1,133 @@
+import time
+import discord
+from discord.ext import commands
+from utils import checks, common, metrics
+from utils.automod import CHECKS, MAX_HASHES, MAX_WINDOW, AutomodEngine, AutomodLimits
+
+# check: (count column, seconds column, what the user did for their DM and warn reason)
+CHECK_SETTINGS = {
+    'flood': ('flood_messages', 'flood_seconds', "sent too many messages"),
+    'mentions': ('mention_limit', 'mention_seconds', "mentioned too many people"),
+    'duplicates': ('duplicate_limit', 'duplicate_seconds', "repeated the same message too many times")
+}
+
+
+class Automod(commands.Cog):
+    """
+    Catches message floods, mention spam and copy-pasted spam
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.engine = AutomodEngine()
+        self.violations = bot.metrics.add(metrics.Counter(
+            "terrygon_automod_violations_total", "Messages that tripped an automod check", ("check",)))
+        bot.metrics.add(metrics.Gauge("terrygon_automod_tracked_users", "Users automod is keeping activity for",
+                                      callback=lambda: {(): len(self.engine)}))
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if message.guild is None or message.author.bot or not isinstance(message.author, discord.Member):
+            return
+
+        context = self.bot.message_contexts.get(message)
+        guild_config = await context.config()
+        if not guild_config.automod_enabled:
+            return
+
+        mentions = len(message.raw_mentions) + len(message.raw_role_mentions) + message.mention_everyone
+        violation = self.engine.check(message.guild.id, message.author.id, AutomodLimits.from_config(guild_config),
+                                      time.monotonic(), mentions, message.content)
+        if violation is None:
+            return
+
+        # only looked up once someone trips a check
+        if await context.is_staff("Mod", manage_messages=True):
+            return
+
+        self.violations.inc(violation.check)
+        punishment = guild_config.automod_punishment or 'delete'
+        offence = CHECK_SETTINGS[violation.check][2]
+        cog = self.bot.get_cog("Filter")
+        if punishment in ('warn', 'delete') and context.actioned:
+            # the filter already deleted or warned for this message
+            punishment = 'notify'
+        elif punishment in ('warn', 'delete') and cog:
+            context.actioned = True
+            await cog.punish(message.author, message, punishment, offence=offence, reason=f"Automod: {offence}")
+        elif punishment in ('warn', 'delete'):
+            msg = ":bangbang: Unable to load the Filter cog please contact a bot maintainer."
+            await self.bot.terrygon_logger.custom_log("mod_logs", message.guild, msg)
+
+        await self.bot.terrygon_logger.automod_action(message.author, violation.check, message.content, punishment)
+
+    @commands.guild_only()
+    @checks.is_staff_or_perms("Admin", manage_guild=True)
+    @commands.group(name="automod", invoke_without_command=True)
+    async def automod(self, ctx):
+        """Configures automod"""
+        await ctx.send_help(ctx.command)
+
+    @commands.guild_only()
+    @checks.is_staff_or_perms("Admin", manage_guild=True)
+    @automod.command(name="toggle")
+    async def automod_toggle(self, ctx):
+        """Turns automod on or off"""
+        enabled = not (await self.bot.guild_config.get(ctx.guild.id)).automod_enabled
+        await self.bot.guild_config.set(ctx.guild.id, automod_enabled=enabled)
+        if not enabled:
+            self.engine.forget_guild(ctx.guild.id)
+        await ctx.send(f"Automod is now {'on' if enabled else 'off'}.")
+
+    @commands.guild_only()
+    @checks.is_staff_or_perms("Admin", manage_guild=True)
+    @automod.command(name="limit")
+    async def automod_limit(self, ctx, check: str, count: int, seconds: int):
+        """Sets when a check trips.
+        - check: `flood` for messages sent, `mentions` for users and roles mentioned or `duplicates` for the same message sent again.
+        - count: how many it takes to trip the check.
+        - seconds: the window they are counted over.
+        """
+        check = check.lower()
+        if check not in CHECKS:
+            return await ctx.send(f"Invalid check given, valid options are {', '.join(f'`{c}`' for c in CHECKS)}")
+
+        if count < 2 or not 1 <= seconds <= MAX_WINDOW:
+            return await ctx.send(f"Count must be at least 2 and seconds between 1 and {MAX_WINDOW}")
+        if check == 'duplicates' and count > MAX_HASHES:
+            return await ctx.send(f"The duplicates count can be at most {MAX_HASHES}")
+
+        count_column, seconds_column, _ = CHECK_SETTINGS[check]
+        await self.bot.guild_config.set(ctx.guild.id, **{count_column: count, seconds_column: seconds})
+        await ctx.send(f"The {check} check now trips at {count} within {seconds} seconds.")
+
+    @commands.guild_only()
+    @checks.is_staff_or_perms("Admin", manage_guild=True)
+    @automod.command(name="punishment")
+    async def automod_punishment(self, ctx, punishment: str):
+        """Sets what happens to a message that trips a check, `delete`, `warn` or `notify`"""
+        punishment = punishment.lower()
+        if punishment not in ['delete', 'warn', 'notify']:
+            return await ctx.send("Invalid punishment given, valid options are `warn`, `delete`, or `notify`")
+
+        await self.bot.guild_config.set(ctx.guild.id, automod_punishment=punishment)
+        await ctx.send(f"Automod punishment set to {punishment}.")
+
+    @commands.guild_only()
+    @checks.is_staff_or_perms("Mod", manage_messages=True)
+    @automod.command(name="settings", aliases=['show'])
+    async def automod_settings(self, ctx):
+        """Shows automod's settings"""
+        guild_config = await self.bot.guild_config.get(ctx.guild.id)
+        limits = AutomodLimits.from_config(guild_config)
+        embed = discord.Embed(title=f"Automod settings for {ctx.guild}", color=common.gen_color(ctx.guild.id))
+        punishment = (guild_config.automod_punishment or 'delete').title()
+        embed.description = f"Automod is {'on' if guild_config.automod_enabled else 'off'}\nPunishment: {punishment}"
+        for check in CHECKS:
+            count, seconds = limits.for_check(check)
+            embed.add_field(name=check.title(), value=f"{count} within {seconds} seconds")
+        await ctx.send(embed=embed)
+
+
+def setup(bot):
+    bot.add_cog(Automod(bot))
@@ -1,3 +1,4 @@
+import asyncio
 import subprocess
 import os
 import sys
@@ -25,6 +26,9 @@ class BotOwner(commands.Cog):
             await ctx.send("Cannot unload this module.")
             return
 
+        if self.bot.cluster is not None:
+            return await self.cluster_command(ctx, "unload", module=module)
+
         try:
             addon = "modules." + module
             self.bot.unload_extension(addon)
@@ -47,6 +51,9 @@ class BotOwner(commands.Cog):
     @commands.command(aliases=['reload'])
     async def load(self, ctx, module_in: str):
         """(Re)loads an addon. (Bot Owners only)"""
+        if self.bot.cluster is not None:
+            return await self.cluster_command(ctx, "load", module=module_in.lower())
+
         module = "modules." + module_in.lower()
         try:
             self.bot.unload_extension(module)
@@ -69,8 +76,26 @@ class BotOwner(commands.Cog):
             self.bot.error_log.exception(err_msg)
             await ctx.send('💢 Error trying to load the addon:\n```\n{}: {}\n```'.format(type(e).__name__, e))
 
+    @checks.is_bot_owner()
+    @commands.command(name="reloadconfig")
+    async def reload_config(self, ctx: commands.Context):
+        """Reloads config.toml without restarting the bot (Bot Owners only)"""
+        try:
+            self.bot.config_manager.reload()
+        except Exception as e:
+            err_msg = "Failed to reload config.toml: {}".format("".join(format_exception(type(e), e, e.__traceback__)))
+            self.bot.error_log.error(err_msg)
+            return await ctx.send('💢 Error reloading the config, keeping the current one:\n```\n{}: {}\n```'.format(
+                type(e).__name__, e))
+
+        await ctx.send(":white_check_mark: Config reloaded.")
+
     async def restart_bot(self, ctx: commands.Context):
         """Restarts the bot"""
+        if self.bot.cluster is not None:
+            await ctx.send("Restarting every cluster....")
+            return await self.bot.cluster.broadcast("restart")
+
         if os.environ.get("IS_DOCKER") and os.name == 'posix':
             await ctx.send("Restarting....")
             self.bot.exit_code = 0
@@ -111,6 +136,42 @@ class BotOwner(commands.Cog):
         else:
             await ctx.send("Shutting down outside of a docker container is not yet supported.")
 
+    async def cluster_command(self, ctx: commands.Context, command: str, **args):
+        """Runs a module command on every cluster and reports how each one went"""
+        try:
+            results = await self.bot.cluster.broadcast(command, **args)
+        except asyncio.TimeoutError:
+            return await ctx.send(":x: The launcher did not respond.")
+
+        lines = []
+        for cluster_id, result in sorted(results.items()):
+            if 'error' in result:
+                lines.append(f":x: Cluster {cluster_id}: `{result['error']}`")
+            else:
+                lines.append(f":white_check_mark: Cluster {cluster_id}: {args['module']} {'reloaded' if result.get('reloaded') else command + 'ed'}")
+        await ctx.send("\n".join(lines))
+
+    @checks.is_bot_owner()
+    @commands.command(name="clusterstats")
+    async def cluster_stats(self, ctx: commands.Context):
+        """Shows guilds, users and shard latency for every cluster (Bot Owner only)"""
+        if self.bot.cluster is None:
+            return await ctx.send("The bot is not running as a cluster.")
+
+        results = await self.bot.cluster.broadcast("stats")
+        rows = []
+        for cluster_id, stats in sorted(results.items()):
+            if 'error' in stats:
+                rows.append((cluster_id, "-", "-", "-", "-", stats['error']))
+                continue
+            latencies = stats['shards'].values()
+            rows.append((cluster_id, stats['pid'], ", ".join(stats['shards']), stats['guilds'], stats['users'],
+                         f"{sum(latencies) / len(latencies) * 1000:.0f}ms" if latencies else "-"))
+        ok = [r for r in results.values() if 'error' not in r]
+        rows.append(("total", "", "", sum(r['guilds'] for r in ok), sum(r['users'] for r in ok), ""))
+        table = tabulate(rows, ("cluster", "pid", "shards", "guilds", "users", "latency"), tablefmt='psql')
+        await ctx.send(f"```{table}```")
+
     @checks.is_bot_owner()
     @commands.command()
     async def pull(self, ctx: commands.Context):
@@ -132,6 +193,12 @@ class BotOwner(commands.Cog):
                     res = await conn.fetch(query)
                 else:
                     res = await conn.execute(query)
+                # raw queries can change guild config behind the cache's back, including ones run with fetch
+                # like UPDATE ... WHERE guild_id IN (SELECT ...) or UPDATE ... RETURNING
+                await self.bot.guild_config.load()
+                self.bot.staff.invalidate()
+                await self.bot.trusted.load()
+                await self.bot.filters.load()
                 if not res:
                     return await ctx.send("Nothing found in database!")
                 try:
@@ -148,6 +215,33 @@ class BotOwner(commands.Cog):
             except TypeError:
                 await ctx.send("Command has ran, no output")
 
+    @checks.is_bot_owner()
+    @commands.command(name="topqueries")
+    async def top_queries(self, ctx: commands.Context, amount: int = 10, sort_by: str = "total"):
+        """Shows the queries that took the most time, sort by total, count, mean or max (Bot Owner only)"""
+        if sort_by not in ("total", "count", "mean", "max"):
+            return await ctx.send("You can only sort by `total`, `count`, `mean` or `max`.")
+        queries = self.bot.db.query_log.top(amount, sort_by)
+        if not queries:
+            return await ctx.send("No queries have been run yet!")
+
+        rows = [(q.query if len(q.query) <= 60 else q.query[:57] + "...", q.count, f"{q.total * 1000:.0f}",
+                 f"{q.mean * 1000:.1f}", f"{q.percentile(50) * 1000:.1f}", f"{q.percentile(99) * 1000:.1f}",
+                 f"{q.max * 1000:.1f}") for q in queries]
+        table = tabulate(rows, ("query", "calls", "total ms", "mean", "p50", "p99", "max"), tablefmt='psql')
+        if len(table) > 1990:
+            return await ctx.send(f"Output is too big, try fewer than {amount} queries.")
+        await ctx.send(f"```{table}```")
+
+    @checks.is_bot_owner()
+    @commands.command(name="cachestats")
+    async def cache_stats(self, ctx: commands.Context):
+        """Shows hit and miss counters for the bot's caches (Bot Owner only)"""
+        stats = self.bot.guild_config.stats()
+        table = tabulate([("guild config", stats['guilds'], stats['hits'], stats['misses'], f"{stats['hit_rate']:.2%}")],
+                         ("cache", "guilds", "hits", "misses", "hit rate"), tablefmt='psql')
+        await ctx.send(f"```{table}```")
+
 
 def setup(bot):
     bot.add_cog(BotOwner(bot))
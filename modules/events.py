@@ -1,6 +1,7 @@
 import discord
 from discord.ext import commands
 from utils import checks
+from utils.cache import GUILD_CONFIG_TABLES
 
 
 class Events(commands.Cog):
@@ -37,31 +38,30 @@ class Events(commands.Cog):
 
     async def add_guild(self, new_guild):
         async with self.bot.db.acquire() as conn:
-            schema_list = ['channels', 'roles', 'guild_settings', 'trusted_users', 'color_settings']
+            schema_list = ['channels', 'roles', 'guild_settings', 'color_settings', 'automod_settings']
             for table in schema_list:
                 try:
                     await conn.execute(f"INSERT INTO {table} (guild_id) VALUES ($1)", new_guild.id)
                 except Exception:
                     pass
 
+        await self.bot.guild_config.refresh(new_guild.id)
+        await self.bot.filters.refresh(new_guild.id)
+
     # join leave logs
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
-        if not await self.bot.is_log_registered(member.guild, "member_logs"):
-            logs = False
-
-        else:
-            logs = True
+        guild_config = await self.bot.guild_config.get(member.guild.id)
+        logs = guild_config.member_logs is not None
 
         async with self.bot.db.acquire() as conn:
 
             # check if member is approved if needed
-            if await conn.fetchval("SELECT approval_system FROM guild_settings WHERE guild_id = $1", member.guild.id):
+            if guild_config.approval_system:
                 if await conn.fetchval("SELECT user_id FROM approved_members WHERE user_id = $1 AND guild_id = $2",
                                        member.id, member.guild.id):
                     try:
-                        approved_role = member.guild.get_role(
-                            await conn.fetchval("SELECT approved_role FROM roles WHERE guild_id = $1", member.guild.id))
+                        approved_role = member.guild.get_role(guild_config.approved_role)
                         await member.add_roles(approved_role)
                     except Exception:
                         pass
@@ -86,10 +86,8 @@ class Events(commands.Cog):
                     reason += " `Message not sent to user`"
 
                 if logs:
-                    await self.bot.terrygon_logger.softban_join(member,
-                                                                self.bot.get_user(issuer_id) if self.bot.get_user(
-                                                                    issuer_id) is not None else await self.bot.fetch_user(
-                                                                    issuer_id), reason)
+                    issuer = await self.bot.user_resolver.fetch(issuer_id) or issuer_id
+                    await self.bot.terrygon_logger.softban_join(member, issuer, reason)
 
                 try:
                     await member.kick(
@@ -108,7 +106,7 @@ class Events(commands.Cog):
                 muted_id = None
 
             if muted_id:
-                muted_role_id = await conn.fetchval("SELECT muted_role FROM roles WHERE guild_id = $1", member.guild.id)
+                muted_role_id = guild_config.muted_role
                 muted_role = member.guild.get_role(muted_role_id)
                 if not muted_role_id or not muted_role:
                     return
@@ -117,12 +115,10 @@ class Events(commands.Cog):
                                        reason=f"User muted for the reason {reason!r} on join." if reason else "User muted on join.")
 
             # check if member is probated and for auto probation.
-            probation_role_id = await conn.fetchval("SELECT probation_role FROM roles WHERE guild_id = $1",
-                                                    member.guild.id)
+            probation_role_id = guild_config.probation_role
             probation_role = member.guild.get_role(probation_role_id)
 
-            auto_probate = await conn.fetchval("SELECT auto_probate FROM guild_settings WHERE guild_id = $1",
-                                               member.guild.id)
+            auto_probate = guild_config.auto_probate
             probated_id = await conn.fetchrow("SELECT id FROM probations WHERE guild_id = $1 AND user_id = $2",
                                               member.guild.id, member.id)
             if auto_probate and not probated_id and probation_role_id and probation_role:
@@ -138,8 +134,7 @@ class Events(commands.Cog):
                                        reason=f"User probated for the reason {reason!r} on join." if reason else "User probated on join.")
 
             # logs join
-            if await conn.fetchval("SELECT enable_join_leave_logs FROM guild_settings WHERE guild_id = $1",
-                                   member.guild.id) and logs:
+            if guild_config.enable_join_leave_logs and logs:
                 await self.bot.terrygon_logger.join_leave_logs("join", member)
 
     @commands.Cog.listener()
@@ -147,8 +142,7 @@ class Events(commands.Cog):
         if not await self.bot.is_log_registered(member.guild, "member_logs"):
             return
 
-        if await self.bot.db.fetchval("SELECT enable_join_leave_logs FROM guild_settings WHERE guild_id = $1",
-                                      member.guild.id):
+        if (await self.bot.guild_config.get(member.guild.id)).enable_join_leave_logs:
             await self.bot.terrygon_logger.join_leave_logs("left", member)
 
     @commands.Cog.listener()
@@ -180,8 +174,7 @@ class Events(commands.Cog):
         if after.author.bot:
             return
 
-        if await self.bot.db.fetchval("SELECT enable_core_message_logs FROM guild_settings WHERE guild_id = $1",
-                                      after.guild.id):
+        if (await self.bot.guild_config.get(after.guild.id)).enable_core_message_logs:
             await self.bot.terrygon_logger.message_edit_logs("msgedit", before, after)
 
     @commands.Cog.listener()
@@ -189,18 +182,25 @@ class Events(commands.Cog):
         if not await self.bot.is_log_registered(message.guild, "message_logs"):
             return
 
-        if await self.bot.db.fetchval("SELECT enable_core_message_logs FROM guild_settings WHERE guild_id = $1",
-                                      message.guild.id):
+        if (await self.bot.guild_config.get(message.guild.id)).enable_core_message_logs:
             await self.bot.terrygon_logger.message_deletion("mdelete", message)
 
     @commands.Cog.listener()
     async def on_guild_join(self, guild):
         await self.add_guild(guild)
 
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        guild_config = await self.bot.guild_config.get(role.guild.id)
+        deleted = {column: None for column in GUILD_CONFIG_TABLES['roles'] if getattr(guild_config, column) == role.id}
+        if deleted:
+            await self.bot.guild_config.set(role.guild.id, **deleted)
+            self.bot.staff.invalidate(role.guild.id)
+
     @commands.Cog.listener()
     async def on_guild_channel_create(self, channel):
-        muted_role = await self.bot.db.fetchval("SELECT muted_role FROM roles WHERE guild_id = $1", channel.guild.id)
-        muted_role = channel.guild.get_role(muted_role)
+        guild_config = await self.bot.guild_config.get(channel.guild.id)
+        muted_role = channel.guild.get_role(guild_config.muted_role)
         if not muted_role:
             return
         kwargs = {
@@ -221,10 +221,8 @@ class Events(commands.Cog):
             except discord.Forbidden:
                 return
 
-        if await self.bot.db.fetchval("SELECT approval_system FROM guild_settings WHERE guild_id = $1",
-                                      channel.guild.id):
-            approval_role = channel.guild.get_role(
-                await self.bot.db.fetchval("SELECT approved_role FROM roles WHERE guild_id = $1", channel.guild.id))
+        if guild_config.approval_system:
+            approval_role = channel.guild.get_role(guild_config.approved_role)
             if not approval_role:
                 return
 
@@ -267,6 +265,10 @@ class Events(commands.Cog):
                 except Exception:
                     pass
 
+        self.bot.guild_config.invalidate(guild.id)
+        self.bot.staff.invalidate(guild.id)
+        self.bot.trusted.invalidate(guild.id)
+        self.bot.filters.invalidate(guild.id)
         await ctx.send(f"Guild {guild.name} removed")
 
     @checks.is_staff_or_perms("Admin", manage_server=True)
@@ -278,11 +280,10 @@ class Events(commands.Cog):
         To get status of auto probate, do not specify an option.
         Must have set probation system with role and channel set up.
         """
-        role_id = await self.bot.db.fetchval("SELECT probation_role FROM roles WHERE guild_id = $1", ctx.guild.id)
-        channel_id = await self.bot.db.fetchval("SELECT probation_channel FROM channels WHERE guild_id = $1",
-                                                ctx.guild.id)
+        guild_config = await self.bot.guild_config.get(ctx.guild.id)
+        role_id = guild_config.probation_role
         role = ctx.guild.get_role(role_id)
-        channel = ctx.guild.get_channel(channel_id)
+        channel = ctx.guild.get_channel(guild_config.probation_channel)
         if not role_id or not channel:
             cog = self.bot.get_cog("Settings")
             if not cog:
@@ -294,7 +295,7 @@ class Events(commands.Cog):
             if res == -1:
                 return await ctx.send("Unable to set auto probate because probation is not properly configured.")
 
-        status = await self.bot.db.fetchval("SELECT auto_probate FROM guild_settings WHERE guild_id = $1", ctx.guild.id)
+        status = guild_config.auto_probate
 
         if option is None:
             if status:
@@ -305,7 +306,7 @@ class Events(commands.Cog):
         if option.lower() in ("enable", "on", "1"):
             if status:
                 return await ctx.send("Auto probate already enabled. Use `disable`, `off`, or `0` to disable.")
-            await self.bot.db.execute("UPDATE guild_settings SET auto_probate = TRUE WHERE guild_id = $1", ctx.guild.id)
+            await self.bot.guild_config.set(ctx.guild.id, auto_probate=True)
             msg = ":warning: **Auto probate has been enabled.**"
             await ctx.send(msg)
 
@@ -313,8 +314,7 @@ class Events(commands.Cog):
             if not status:
                 return await ctx.send("Auto probate is disabled. Use `enable`, `on`, or `1` to enable")
 
-            await self.bot.db.execute("UPDATE guild_settings SET auto_probate = FALSE WHERE guild_id = $1",
-                                      ctx.guild.id)
+            await self.bot.guild_config.set(ctx.guild.id, auto_probate=False)
             msg = ":white_check_mark: **Auto probate has been disabled.**"
             await ctx.send(msg)
 
@@ -1,18 +1,9 @@
-import re
 import typing
-import string
-from fuzzywuzzy import fuzz
 import discord
 from discord.ext import commands
-from utils import checks
-
-
-def char_str_replace(dictionary: dict, input_string: str) -> str:
-    """Replaces character in a dictionary"""
-    for k, v in dictionary.items():
-        input_string = input_string.replace(k, v)
-
-    return input_string
+from utils import checks, warns
+from utils.filter_engine import SHORT_WORD_LENGTH, highest_punishment, highlight, normalise_word
+from utils.filter_engine import UnsafePattern, check_pattern
 
 
 class Filter(commands.Cog):
@@ -20,12 +11,11 @@ class Filter(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    async def word_in_filter(self, word, guild):
-        """Checks if a word is in the filter for a guild"""
-        return await self.bot.db.fetchval("SELECT id FROM filtered_words WHERE guild_id = $1 AND word = $2", guild.id,
-                                          word)
-
     # filter words funcs (add/remove)
+    def stored_word(self, guild_id: int, word: str) -> str:
+        """The key a word or regex is filtered under, words are stored lowercase but regexes as written"""
+        return word if word in self.bot.filters.get(guild_id).words else word.lower()
+
     @commands.guild_only()
     @commands.group(name="wordfilter", invoke_without_command=True)
     async def word_filter(self, ctx):
@@ -46,26 +36,44 @@ class Filter(commands.Cog):
         if punishment not in ['delete', 'warn', 'notify']:
             return await ctx.send("Invalid punishment given, valid options are `warn`, `delete`, or `notify`")
 
-        # check if word is in list
-        if await self.word_in_filter(word, ctx.guild):
+        if not await self.bot.filters.add_word(ctx.guild.id, word, punishment):
             return await ctx.send("Word is already in filter (filter ignores case)")
 
-        await self.bot.db.execute("INSERT INTO filtered_words (word, guild_id, punishment) VALUES ($1, $2, $3)", word,
-                                  ctx.guild.id, punishment)
         await ctx.send("Word added to the filter")
         await self.bot.terrygon_logger.word_filter_update("wordadd", word, ctx.author, punishment)
 
+    @commands.guild_only()
+    @checks.is_staff_or_perms("Mod", manage_messages=True)
+    @word_filter.command(name="regex")
+    async def add_regex(self, ctx, punishment, *, pattern):
+        """Adds a regular expression to the filter, matched against messages as written ignoring case.
+        - punishment: either `delete`, `warn` or `notify`, same as `wordfilter add`.
+        - pattern: the regex. Backreferences, lookarounds, nested repeats like `(a+)+`, repeated alternations like `(ab|cd)+` and more than 3 unbounded repeats are not allowed. Regexes get 5ms per message, one that takes longer is stopped.
+        """
+        punishment = punishment.lower()
+        if punishment not in ['delete', 'warn', 'notify']:
+            return await ctx.send("Invalid punishment given, valid options are `warn`, `delete`, or `notify`")
+
+        try:
+            check_pattern(pattern)
+        except UnsafePattern as e:
+            return await ctx.send(f"Unable to add that regex, {e}")
+
+        if not await self.bot.filters.add_word(ctx.guild.id, pattern, punishment, is_regex=True):
+            return await ctx.send("Regex is already in filter")
+
+        await ctx.send("Regex added to the filter")
+        await self.bot.terrygon_logger.word_filter_update("wordadd", pattern, ctx.author, punishment)
+
     @commands.guild_only()
     @checks.is_staff_or_perms("Mod", manage_messages=True)
     @word_filter.command(name="delete", aliases=["remove", "del"])
     async def del_word(self, ctx, word):
-        """Removes a word from the filter"""
-        word = word.lower()
-        w_id = await self.word_in_filter(word, ctx.guild)
-        if not w_id:
+        """Removes a word or regex from the filter"""
+        word = self.stored_word(ctx.guild.id, word)
+        if not await self.bot.filters.remove_word(ctx.guild.id, word):
             return await ctx.send("Word is not in filter")
 
-        await self.bot.db.execute("DELETE FROM filtered_words WHERE id = $1", w_id)
         await ctx.send("Word removed from filter")
         await self.bot.terrygon_logger.word_filter_update("worddelete", word, ctx.author)
 
@@ -77,25 +85,55 @@ class Filter(commands.Cog):
 
         # validate punishment
         punishment = punishment.lower()
-        word = word.lower()
+        word = self.stored_word(ctx.guild.id, word)
         if punishment not in ['delete', 'warn', 'notify']:
             return await ctx.send("Invalid punishment given, valid options are `warn`, `delete`, or `notify`")
 
-        await self.bot.db.execute("UPDATE filtered_words SET punishment = $1 WHERE word = $2 AND guild_id = $3",
-                                  punishment, word, ctx.guild.id)
+        if not await self.bot.filters.update_word(ctx.guild.id, word, punishment):
+            return await ctx.send("Word is not in filter")
+
         await ctx.send("Word punishment updated.")
         await self.bot.terrygon_logger.word_filter_update("wordupdate", word, ctx.author, punishment)
 
+    @commands.guild_only()
+    @checks.is_staff_or_perms("Mod", manage_messages=True)
+    @word_filter.command(name="threshold", aliases=["fuzzy"])
+    async def word_threshold(self, ctx, word, threshold: int = None):
+        """Sets how similar a spelled out word must be to a short filtered word to pop the filter.
+        - word: a filtered word shorter than 5 characters.
+        - threshold: similarity from 1 to 100, leave it out to only match the word exactly.
+        """
+        word = self.stored_word(ctx.guild.id, word)
+        if threshold is not None and not 1 <= threshold <= 100:
+            return await ctx.send("Threshold must be between 1 and 100")
+
+        filter_word = self.bot.filters.get(ctx.guild.id).words.get(word)
+        if filter_word is not None and filter_word.is_regex:
+            return await ctx.send("Regexes cannot be fuzzy matched")
+
+        if len(normalise_word(word)) >= SHORT_WORD_LENGTH:
+            return await ctx.send(f"Only words shorter than {SHORT_WORD_LENGTH} characters are fuzzy matched")
+
+        if not await self.bot.filters.set_threshold(ctx.guild.id, word, threshold):
+            return await ctx.send("Word is not in filter")
+
+        if threshold is None:
+            await ctx.send("Word will only be matched exactly.")
+        else:
+            await ctx.send(f"Word fuzzy threshold set to {threshold}%.")
+
     @commands.guild_only()
     @word_filter.command(name="list")
     async def list_words(self, ctx):
         """Lists filtered words"""
-        filtered_words = await self.bot.db.fetch("SELECT word, punishment FROM filtered_words WHERE guild_id = $1",
-                                                 ctx.guild.id)
+        filtered_words = self.bot.filters.get(ctx.guild.id).words
         embed = discord.Embed(title=f"Filtered words for {ctx.guild}", color=discord.Color.orange())
         word_string = ""
-        for w, p in filtered_words:
-            word_string += f"- `{w}` Punishment: {p.title()}\n"
+        for w in filtered_words.values():
+            word_string += f"- `{w.word}`{' (regex)' if w.is_regex else ''} Punishment: {w.punishment.title()}"
+            if w.fuzzy_threshold is not None:
+                word_string += f" Fuzzy threshold: {w.fuzzy_threshold}%"
+            word_string += "\n"
 
         embed.description = word_string
         await ctx.author.send(embed=embed)
@@ -104,145 +142,78 @@ class Filter(commands.Cog):
         except discord.Forbidden:
             pass
 
-    async def punish(self, member, message, punishment):
-        """Logs and gives punishment"""
+    async def punish(self, member, message, punishment, offence: str = "popped the filter",
+                     reason: str = "Filter Pop"):
+        """Logs and gives punishment, offence finishes "You have ..." in the DM and reason is the warn's reason"""
         if punishment == "delete":
-            await message.delete()
             try:
-                dm_msg = f"You have popped the filter on {member.guild}. " + "Your message has been deleted"
+                await message.delete()
+            except discord.NotFound:
+                pass
+            try:
+                dm_msg = f"You have {offence} on {member.guild}. " + "Your message has been deleted"
                 await member.send(dm_msg)
             except discord.Forbidden:
                 pass
 
         elif punishment == "warn":
-            await message.delete()
-            await self.bot.db.execute("INSERT INTO warns (user_id, author_id, guild_id, reason) VALUES ($1, $2, $3, $4)",
-                                      member.id, self.bot.user.id, member.guild.id, "Filter Pop")
             try:
-                dm_msg = f"You have popped the filter on {member.guild}. " + "You have been warned because of this."
+                await message.delete()
+            except discord.NotFound:
+                pass
+            warn_num = await warns.add_warn(self.bot.db, member.guild.id, member.id, self.bot.user.id, reason)
+            try:
+                dm_msg = f"You have {offence} on {member.guild}. " + "You have been warned because of this."
                 await member.send(dm_msg)
             except discord.Forbidden:
                 pass
-            punishment_data = await self.bot.db.fetchval(
-                "SELECT warn_punishments FROM guild_settings WHERE guild_id = $1",
-                message.guild.id)
             cog = self.bot.get_cog("Warn")
-            if punishment_data and cog:
-                highest_punishment_value = max(punishment_data.keys())
-                warn_num = int(
-                    await self.bot.db.fetchval("SELECT COUNT(warnID) FROM warns WHERE user_id = $1 AND guild_id = $2;",
-                                               member.id,
-                                               member.guild.id))
-                if str(warn_num) in list(punishment_data.keys()):
-                    await cog.punish(member, warn_num, punishment_data[str(warn_num)])
-
-                elif warn_num > int(highest_punishment_value):
-                    await cog.punish(member, warn_num, punishment_data[str(highest_punishment_value)])
-
-            elif not cog:
+            if cog:
+                warn_punishment = await cog.warn_punishment(member.guild.id, warn_num)
+                if warn_punishment is not None:
+                    await cog.punish(member, warn_num, warn_punishment)
+
+            else:
                 msg = ":bangbang: Unable to load the Warn cog please contact a bot maintainer."
                 # TODO: log properly
                 await self.bot.terrygon_logger.custom_log("modlogs", message.guild, msg)
 
-    async def check_staff_filter(self, message: discord.Message) -> bool:
-        """Checks for filter bypass for staff"""
-        is_staff = await checks.nondeco_is_staff_or_perms(message, self.bot.db, "Mod", manage_message=True)
-        bypass_on = await self.bot.db.fetchval("SELECT staff_filter FROM guild_settings WHERE guild_id = $1",
-                                               message.guild.id)
-        return is_staff and bypass_on
-
     @commands.Cog.listener()
     async def on_message(self, message):
-        """Checks messages"""
-        if message.guild is None:
-            return
-
-        staff_bypass = await self.check_staff_filter(message)
-        is_whitelist = await self.bot.db.fetchval(
-            "SELECT channel_id FROM whitelisted_channels WHERE channel_id = $1 AND guild_id = $2", message.channel.id,
-            message.guild.id)
-        is_me = self.bot.user == message.author
-        if is_me or staff_bypass or is_whitelist:
+        """Checks messages, everything needed is in memory so this never queries the database"""
+        if message.guild is None or message.author == self.bot.user:
             return
 
-        filtered_words = await self.bot.db.fetch("SELECT word, punishment FROM filtered_words WHERE guild_id = $1",
-                                                 message.guild.id)
-        if filtered_words is None:
+        context = self.bot.message_contexts.get(message)
+        state = context.filter
+        matches = state.scan(message.channel.id, message.content)
+        if not matches:
             return
-        matches = []
-        msg = re.sub(r"[^0-9a-zA-Z ]", "", message.content)
-        for word_tup in filtered_words:
-            word = word_tup[0]
-            if len(word) < 5:
-                spaced_res = re.search(" ".join(word), msg, re.I)
-                no_white_space = re.sub(r" ", "", msg)
-                res = re.search(word_tup[0], no_white_space, re.I)
-                if spaced_res:
-                    w_start, w_end = spaced_res.span(0)
-                    beginning_isolated = False
-                    ending_isolated = False
-                    if w_start == 0 and msg[w_start + 1] == " ":
-                        beginning_isolated = True
-                    elif msg[w_start + 1] == " " and msg[w_start - 1] == " ":
-                        beginning_isolated = True
-
-                    if w_end == len(msg):
-                        ending_isolated = True
-                    elif msg[w_end] == " " or len(msg) == w_end:
-                        ending_isolated = True
-
-                    if not beginning_isolated or not ending_isolated:
-                        continue
-
-                    char_span = msg[w_start: w_end]
-                    ratio = fuzz.ratio(word, char_span)
-                    partial_ratio = fuzz.partial_ratio(word, char_span)
-                    if ratio >= 70 or partial_ratio >= 70:
-                        matches.append((spaced_res, word_tup[1]))
-
-                elif res:
-                    matches.append((res, word_tup[1]))
-
-            else:
-                no_white_space = re.sub(r" ", "", msg)
-                res = re.search(word_tup[0], no_white_space, re.I)
-                if res:
-                    matches.append((res, word_tup[1]))
 
-        if len(matches) == 0:
+        # only looked up for messages that popped the filter
+        if (await context.config()).staff_filter and await context.is_staff("Mod", manage_messages=True):
             return
 
         # highlight filtered words (thanks kurisu)
-        highlighted_message = message.content
-        for match_tuple in matches:
-            match = match_tuple[0]
-            w_start, w_end = match.span(0)
-            highlighted_message = f"{highlighted_message[:w_start]}**{match.group(0)}**{highlighted_message[w_end:]}"
-
-        if next((i for i, v in enumerate(matches) if v[1] == 'warn'), None) is not None:
-            await self.punish(message.author, message, 'warn')
-            highest_punishment = 'warn'
-        elif next((i for i, v in enumerate(matches) if v[1] == 'delete'), None) is not None:
-            await self.punish(message.author, message, 'delete')
-            highest_punishment = 'delete'
-        else:
-            highest_punishment = 'notify'
+        highlighted_message = highlight(message.content, matches)
+        punishment = highest_punishment(matches)
+        if punishment in ('warn', 'delete'):
+            context.actioned = True
+            await self.punish(message.author, message, punishment)
 
         # log
-        await self.bot.terrygon_logger.filter_pop(message.author, highlighted_message, highest_punishment)
+        await self.bot.terrygon_logger.filter_pop(message.author, highlighted_message, punishment)
 
     @commands.guild_only()
     @checks.is_staff_or_perms("Owner", administrator=True)
     @commands.command(name="staffbypass")
     async def staff_filter_bypass(self, ctx):
         """Toggles the staff whitelist for the filter"""
-        bypass_on = await self.bot.db.fetchval("SELECT staff_filter FROM guild_settings WHERE guild_id = $1",
-                                               ctx.guild.id)
-        if bypass_on:
-            await self.bot.db.execute("UPDATE guild_settings SET staff_filter = false WHERE guild_id = $1", ctx.guild.id)
+        if (await self.bot.guild_config.get(ctx.guild.id)).staff_filter:
+            await self.bot.guild_config.set(ctx.guild.id, staff_filter=False)
             await ctx.send("Staff can no longer bypass the filter.")
         else:
-            await self.bot.db.execute("UPDATE guild_settings SET staff_filter = true WHERE guild_id = $1", ctx.guild.id)
+            await self.bot.guild_config.set(ctx.guild.id, staff_filter=True)
             await ctx.send("Staff can now bypass the filter.")
 
     # whitelisted channels funcs (add/remove)
@@ -261,13 +232,9 @@ class Filter(commands.Cog):
         if channel is None:
             channel = ctx.channel
 
-        if await self.bot.db.fetchval(
-                "SELECT channel_id FROM whitelisted_channels WHERE channel_id = $1 AND guild_id = $2", channel.id,
-                ctx.guild.id) is not None:
+        if not await self.bot.filters.add_channel(ctx.guild.id, channel.id):
             return await ctx.send(f"{channel.mention} is already whitelisted")
 
-        await self.bot.db.execute("INSERT INTO whitelisted_channels (channel_id, guild_id) VALUES ($1, $2)", channel.id,
-                                  ctx.guild.id)
         await ctx.send(f"{channel.mention} is now whitelisted")
         await self.bot.terrygon_logger.channel_whitelist("channelwhitelist", channel, ctx.author)
 
@@ -280,18 +247,14 @@ class Filter(commands.Cog):
             channel = ctx.channel
         if isinstance(channel, int):
             channel_id = channel
-            output = f"{channel_id} is not being whitelisted."
+            name = str(channel_id)
         else:
             channel_id = channel.id
-            output = f"{channel.mention} is not being whitelisted."
-        if not await self.bot.db.fetchval(
-                "SELECT channel_id FROM whitelisted_channels WHERE channel_id = $1 AND guild_id = $2", channel_id,
-                ctx.guild.id):
-            return await ctx.send(f"{channel.mention} is not whitelisted.")
-
-        await self.bot.db.execute("DELETE FROM whitelisted_channels WHERE channel_id = $1 AND guild_id = $2",
-                                  channel_id, ctx.guild.id)
-        await ctx.send(output)
+            name = channel.mention
+        if not await self.bot.filters.remove_channel(ctx.guild.id, channel_id):
+            return await ctx.send(f"{name} is not whitelisted.")
+
+        await ctx.send(f"{name} is not being whitelisted.")
         await self.bot.terrygon_logger.channel_whitelist("channeldewhitelist", channel, ctx.author)
 
     @commands.guild_only()
@@ -301,14 +264,12 @@ class Filter(commands.Cog):
         """Lists whitelisted channels"""
         channels = ""
         deleted_channels = ""
-        c_ids = await self.bot.db.fetchrow("SELECT channel_id FROM whitelisted_channels WHERE guild_id = $1",
-                                           ctx.guild.id)
-        for c_id in c_ids:
+        for c_id in self.bot.filters.get(ctx.guild.id).whitelist:
             c = ctx.guild.get_channel(c_id)
             if not c:
                 deleted_channels += f"- {c_id}\n"
             else:
-                channels += f"- {c.mention}"
+                channels += f"- {c.mention}\n"
 
         embed = discord.Embed(title=f"List of whitelisted channels")
         embed.description = channels
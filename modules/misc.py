@@ -4,8 +4,7 @@ import webcolors
 from discord.ext import commands
 import re
 import string
-from terrygon import read_config
-from utils import checks, common
+from utils import checks, common, memory
 from datetime import datetime, timedelta
 import typing
 import collections
@@ -23,13 +22,14 @@ class Misc(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
-        self.curActivity = discord.Game(read_config("info", "activity"))
+        self.curActivity = discord.Game(bot.config.activity)
         self.curStatus = discord.Status.online
 
     @commands.guild_only()
     @commands.command(aliases=['mc'])
     async def membercount(self, ctx: commands.Context):
         """Prints member count"""
+        await memory.ensure_chunked(ctx.guild)
         bots = 0
         for member in ctx.guild.members:
             if member.bot:
@@ -76,11 +76,10 @@ class Misc(commands.Cog):
             user = ctx.author
             in_server = True
         elif isinstance(member, int):
-            try:
-                user = await self.bot.fetch_user(member)
-                in_server = False
-            except discord.NotFound:
+            user = await self.bot.user_resolver.fetch(member)
+            if user is None:
                 return await ctx.send("💢 I cannot find that user")
+            in_server = False
         elif isinstance(member, discord.Member):
             user = member
             in_server = True
@@ -115,11 +114,10 @@ class Misc(commands.Cog):
             user = ctx.author
             in_server = True
         elif isinstance(member, int):
-            try:
-                user = await self.bot.fetch_user(member)
-                in_server = False
-            except discord.NotFound:
+            user = await self.bot.user_resolver.fetch(member)
+            if user is None:
                 return await ctx.send("💢 I cannot find that user")
+            in_server = False
         elif isinstance(member, discord.Member):
             user = member
             in_server = True
@@ -175,8 +173,8 @@ class Misc(commands.Cog):
         if ctx.guild.icon:
             embed.set_thumbnail(url=ctx.guild.icon_url)
 
-        approval_system = "enabled" if await self.bot.db.fetchval(
-            "SELECT approval_system FROM guild_settings WHERE guild_id = $1", ctx.guild.id) else "disabled"
+        guild_config = await self.bot.guild_config.get(ctx.guild.id)
+        approval_system = "enabled" if guild_config.approval_system else "disabled"
 
         embed.add_field(
             name="**Stats**",
@@ -185,6 +183,7 @@ class Misc(commands.Cog):
         )
         # adapted from https://gitlab.com/lightning-bot/Lightning/-/blob/v3/cogs/meta.py#L607
         # get member info
+        await memory.ensure_chunked(ctx.guild)
         memberStatusCollection = collections.Counter()
         for member in ctx.guild.members:
             if member.bot:
@@ -197,27 +196,21 @@ class Misc(commands.Cog):
                         inline=False)
 
         # get role info
-        async with self.bot.db.acquire() as conn:
-            mod_role = ctx.guild.get_role(
-                await conn.fetchval("SELECT mod_role FROM roles WHERE guild_id = $1", ctx.guild.id))
-            mod_role = "No Mod role set" if mod_role is None else mod_role
-
-            admin_role = ctx.guild.get_role(
-                await conn.fetchval("SELECT admin_role FROM roles WHERE guild_id = $1", ctx.guild.id))
-            admin_role = "No Admin role set" if admin_role is None else admin_role
-
-            owner_role = ctx.guild.get_role(
-                await conn.fetchval("SELECT owner_role FROM roles WHERE guild_id = $1", ctx.guild.id))
-            owner_role = "No Owner role set" if owner_role is None else owner_role
-
-            muted_role = ctx.guild.get_role(
-                await conn.fetchval("SELECT muted_role FROM roles WHERE guild_id = $1", ctx.guild.id))
-            muted_role = "No Muted role set" if muted_role is None else muted_role
-            if approval_system == 'enabled':
-                approval_role = ctx.guild.get_role(
-                    await conn.fetchval("SELECT approved_role FROM roles WHERE guild_id = $1", ctx.guild.id))
-            else:
-                approval_role = "Approval System Disabled"
+        mod_role = ctx.guild.get_role(guild_config.mod_role)
+        mod_role = "No Mod role set" if mod_role is None else mod_role
+
+        admin_role = ctx.guild.get_role(guild_config.admin_role)
+        admin_role = "No Admin role set" if admin_role is None else admin_role
+
+        owner_role = ctx.guild.get_role(guild_config.owner_role)
+        owner_role = "No Owner role set" if owner_role is None else owner_role
+
+        muted_role = ctx.guild.get_role(guild_config.muted_role)
+        muted_role = "No Muted role set" if muted_role is None else muted_role
+        if approval_system == 'enabled':
+            approval_role = ctx.guild.get_role(guild_config.approved_role)
+        else:
+            approval_role = "Approval System Disabled"
 
         embed.add_field(name="**Role Info**",
                         value=f":shield: **__Number Of Roles:__** {len(ctx.guild.roles)}\n:helicopter: **__Mod Role:__** {mod_role}\n:hammer: **__Admin Role:__** {admin_role}\n:crown: **__Owner Role:__** {owner_role}\n:+1: **__Approval Role:__** {approval_role}\n:mute: **__Muted Role:__** {muted_role}",
@@ -375,7 +368,7 @@ class Misc(commands.Cog):
                 return await ctx.send("Unable to parse RGB.")
             e = discord.Embed(title=f"Color RGB {', '.join(map(lambda c: str(c), rgb_color))}",
                               color=discord.Color.from_rgb(*rgb_color), description=f"Color Hex: {webcolors.rgb_to_hex(rgb_color)}")
-            color_file = common.image_from_rgb(rgb_color)
+            color_file = await self.bot.offload.run('image', common.image_from_rgb, rgb_color)
             e.set_image(url="attachment://color.png")
             return await ctx.send(embed=e, file=color_file)
 
@@ -383,7 +376,8 @@ class Misc(commands.Cog):
             if not hex_color_tuple:
                 return ctx.send("Unable to parse hex code.")
             e = discord.Embed(title=f"Color Hex {hex_color_tuple[1]}", color=hex_color_tuple[0], description=f"Color RGB {', '.join(map(lambda x: str(x), tuple(webcolors.hex_to_rgb(hex_color_tuple[1]))))}")
-            color_file = common.image_from_rgb(webcolors.hex_to_rgb(hex_color_tuple[1]))
+            color_file = await self.bot.offload.run('image', common.image_from_rgb,
+                                                   webcolors.hex_to_rgb(hex_color_tuple[1]))
             e.set_image(url="attachment://color.png")
             return await ctx.send(embed=e, file=color_file)
 
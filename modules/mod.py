@@ -17,7 +17,7 @@ class Mod(commands.Cog):
     async def silent_mute_prep(self, member: discord.Member, mode: str) -> int:
         """Sets up mutes without output, this should only be called after permissions have been checked"""
         async with self.bot.db.acquire() as conn:
-            muted_role_id = await conn.fetchval("SELECT muted_role FROM roles WHERE guild_id = $1", member.guild.id)
+            muted_role_id = (await self.bot.guild_config.get(member.guild.id)).muted_role
             if not muted_role_id:
                 return -1  # no wizard to set up muted role, please use regular version for that
 
@@ -51,7 +51,7 @@ class Mod(commands.Cog):
             return -1
 
         async with self.bot.db.acquire() as conn:
-            muted_role_id = await conn.fetchval("SELECT muted_role FROM roles WHERE guild_id = $1", ctx.guild.id)
+            muted_role_id = (await self.bot.guild_config.get(ctx.guild.id)).muted_role
             muted_role = ctx.guild.get_role(muted_role_id)
             if muted_role_id is None or muted_role is None:
                 cog = self.bot.get_cog('Settings')
@@ -62,7 +62,7 @@ class Mod(commands.Cog):
                     await ctx.send(msg)
                     return -1
                 await cog.muted_role_setup(ctx)
-                muted_role_id = await conn.fetchval("SELECT muted_role FROM roles WHERE guild_id = $1", ctx.guild.id)
+                muted_role_id = (await self.bot.guild_config.get(ctx.guild.id)).muted_role
                 muted_role = ctx.guild.get_role(muted_role_id)
                 if not muted_role and not muted_role_id:
                     await ctx.send(
@@ -164,7 +164,7 @@ class Mod(commands.Cog):
 
         # get muted role and make sure it exists
         async with self.bot.db.acquire() as conn:
-            muted_role_id = await conn.fetchval("SELECT muted_role FROM roles WHERE guild_id = $1", ctx.guild.id)
+            muted_role_id = (await self.bot.guild_config.get(ctx.guild.id)).muted_role
             muted_role = ctx.guild.get_role(muted_role_id)
 
             if muted_role_id is None or muted_role is None:
@@ -195,8 +195,7 @@ class Mod(commands.Cog):
 
     async def silent_probation(self, member: discord.Member, author_id: int, reason: str) -> int:
         """Silently prepares and probates a user."""
-        probation_role_id = await self.bot.db.fetchval("SELECT probation_role FROM roles WHERE guild_id = $1",
-                                                       member.guild.id)
+        probation_role_id = (await self.bot.guild_config.get(member.guild.id)).probation_role
         probation_role = member.guild.get_role(probation_role_id)
         if probation_role_id is None or probation_role is None:
             return -1
@@ -231,8 +230,7 @@ class Mod(commands.Cog):
             await ctx.send(mod_bot_protection)
             return
 
-        probation_role_id = await self.bot.db.fetchval("SELECT probation_role FROM roles WHERE guild_id = $1",
-                                                       ctx.guild.id)
+        probation_role_id = (await self.bot.guild_config.get(ctx.guild.id)).probation_role
         probation_role = ctx.guild.get_role(probation_role_id)
         if probation_role_id is None or probation_role is None:
             cog = self.bot.get_cog("Settings")
@@ -246,8 +244,7 @@ class Mod(commands.Cog):
             if res == -1:
                 return await ctx.send("Unable to probate user, probation not configured properly.")
             else:
-                probation_role_id = await self.bot.db.fetchval("SELECT probation_role FROM roles WHERE guild_id = $1",
-                                                               ctx.guild.id)
+                probation_role_id = (await self.bot.guild_config.get(ctx.guild.id)).probation_role
                 probation_role = ctx.guild.get_role(probation_role_id)
 
         if probation_role in member.roles or await self.bot.db.fetchval(
@@ -283,8 +280,7 @@ class Mod(commands.Cog):
     @commands.command()
     async def unprobate(self, ctx: commands.Context, member: discord.Member):
         """Removes a user from probation (Mod+)"""
-        probation_role_id = await self.bot.db.fetchval("SELECT probation_role FROM roles WHERE guild_id = $1",
-                                                       ctx.guild.id)
+        probation_role_id = (await self.bot.guild_config.get(ctx.guild.id)).probation_role
         probation_role = ctx.guild.get_role(probation_role_id)
         if probation_role_id is None and probation_role is None:
             return await ctx.send("Probation system not configured, this cannot be used.")
@@ -410,8 +406,7 @@ class Mod(commands.Cog):
         error_string = ""
         for overwrite, perm_overwrite_obj in channel.overwrites.items():
             if isinstance(overwrite, discord.Role):
-                if overwrite not in staff_roles and overwrite.id != await self.bot.db.fetchval(
-                        "SELECT muted_role FROM roles WHERE guild_id = $1", ctx.guild.id):
+                if overwrite not in staff_roles and overwrite.id != (await self.bot.guild_config.get(ctx.guild.id)).muted_role:
                     try:
                         perm_overwrite_obj.send_messages = None
                         perm_overwrite_obj.add_reactions = None
@@ -442,7 +437,7 @@ class Mod(commands.Cog):
 
     async def remove_from_approval_list(self, member: discord.Member, guild: discord.Guild):
         async with self.bot.db.acquire() as conn:
-            if not await conn.fetchval("SELECT approval_system FROM guild_settings WHERE guild_id = $1", guild.id):
+            if not (await self.bot.guild_config.get(guild.id)).approval_system:
                 return
             else:
                 if not await conn.fetchval("SELECT * FROM approved_members WHERE guild_id = $1 AND user_id = $2",
@@ -486,9 +481,8 @@ class Mod(commands.Cog):
     async def ban_prep(self, ctx, member, mode, **kwargs) -> discord.Member or discord.User:
         """Boiler plate ban code"""
         if isinstance(member, int):
-            try:
-                member = await self.bot.fetch_user(member)  # calls the api to find and ban the user
-            except discord.NotFound:
+            member = await self.bot.user_resolver.fetch(member)  # calls the api to find and ban the user
+            if member is None:
                 return await ctx.send("User was not found")
         else:
             mod_bot_protection = await checks.mod_bot_protection(self.bot, ctx, member, "ban")
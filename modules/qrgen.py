@@ -3,6 +3,16 @@ from discord.ext import commands
 from discord import File
 from io import BytesIO
 
+
+def make_qr(data: str) -> BytesIO:
+    """Renders a QR code as a png, slow enough that it is run off the event loop"""
+    img = make(data)
+    imgbuf = BytesIO()
+    img.save(imgbuf, 'png')
+    imgbuf.seek(0)
+    return imgbuf
+
+
 # all credit for this goes to astronautlevel!
 class QRGen(commands.Cog):
     """
@@ -19,17 +29,11 @@ class QRGen(commands.Cog):
         if not url:
             async for m in ctx.channel.history():
                 if len(m.attachments) == 1:  # Currently this only supports 1 attachment at most
-                    img = make(m.attachments[0].url)
-                    imgbuf = BytesIO()
-                    img.save(imgbuf, 'png')
-                    imgbuf.seek(0)
+                    imgbuf = await self.bot.offload.run('qr', make_qr, m.attachments[0].url)
                     await ctx.send(file=File(imgbuf, "qr_code.png"))
                     return
         else:
-            img = make(url)
-            imgbuf = BytesIO()
-            img.save(imgbuf, 'png')
-            imgbuf.seek(0)
+            imgbuf = await self.bot.offload.run('qr', make_qr, url)
             await ctx.send(file=File(imgbuf, "qr_code.png"))
 
 
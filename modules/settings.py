@@ -1,7 +1,6 @@
 import discord
 from discord.ext import commands, flags
-from terrygon import read_config
-from utils import checks, errors, common, paginator
+from utils import checks, errors, common, paginator, memory
 import typing
 
 
@@ -12,16 +11,13 @@ class Settings(commands.Cog):
         self.bot = bot
 
     async def get_db_asset(self, asset: str, guild: discord.Guild):
-        async with self.bot.db.acquire() as conn:
-            if asset in ('mod_role', 'admin_role', 'owner_role', 'approved_role', 'muted_role'):
-                return (await conn.fetchrow(f"SELECT {asset} FROM roles WHERE guild_id = $1", guild.id))[0]
+        if asset in ('mod_role', 'admin_role', 'owner_role', 'approved_role', 'muted_role', 'probation_role',
+                     'mod_logs', 'message_logs', 'member_logs', 'filter_logs'):
+            return getattr(await self.bot.guild_config.get(guild.id), asset)
 
-            elif asset in ('mod_logs', 'message_logs', 'member_logs', 'filter_logs'):
-                return (await conn.fetchrow(f"SELECT {asset} FROM channels WHERE guild_id = $1", guild.id))[0]
-
-            else:
-                self.bot.error_log.error("Invalid input given for asset")
-                return None
+        else:
+            self.bot.error_log.error("Invalid input given for asset")
+            return None
 
     async def set_unset_role(self, ctx: commands.Context, role: typing.Union[discord.Role, None], role_type: str,
                              mode: str) -> int:
@@ -32,40 +28,38 @@ class Settings(commands.Cog):
         if role_type not in ('mod_role', 'admin_role', 'owner_role', 'approved_role', 'muted_role', 'probation_role'):
             raise commands.BadArgument("Invalid Database Role")
 
-        async with self.bot.db.acquire() as conn:
-
-            if mode == 'unset':
-                role_id = await self.get_db_asset(role_type, ctx.guild)
-                if role_id is None:
-                    return -1
-                try:
-                    role = ctx.guild.get_role(role_id)
-                    if not role:
-                        raise errors.LoggingError("Deleted role", ctx.guild)
-                    await self.bot.terrygon_logger.log_setup("unset", f"{role_type} role", ctx.author,
-                                                             role, 'mod_logs')
-                except errors.LoggingError:
-                    self.bot.console_output_log.warning(
-                        f"Failed to log {role_type} database unset on server {ctx.guild.name}. (ID: {ctx.guild.id})")
-                await conn.execute(f"UPDATE roles SET {role_type} = NULL WHERE guild_id = $1", ctx.guild.id)
-                return 0
+        if mode == 'unset':
+            role_id = await self.get_db_asset(role_type, ctx.guild)
+            if role_id is None:
+                return -1
+            try:
+                role = ctx.guild.get_role(role_id)
+                if not role:
+                    raise errors.LoggingError("Deleted role", ctx.guild)
+                await self.bot.terrygon_logger.log_setup("unset", f"{role_type} role", ctx.author,
+                                                         role, 'mod_logs')
+            except errors.LoggingError:
+                self.bot.console_output_log.warning(
+                    f"Failed to log {role_type} database unset on server {ctx.guild.name}. (ID: {ctx.guild.id})")
+            await self.bot.guild_config.set(ctx.guild.id, **{role_type: None})
+            self.bot.staff.invalidate(ctx.guild.id)
+            return 0
 
-            else:
-                # just in case!
-                if role is None:
-                    return -1
+        else:
+            # just in case!
+            if role is None:
+                return -1
 
-                await conn.execute(f"UPDATE roles SET {role_type} = $1 WHERE guild_id = $2", role.id, ctx.guild.id)
-                try:
-                    await self.bot.terrygon_logger.log_setup("set", f"{role_type} role", ctx.author,
-                                                             await self.get_db_asset(role_type,
-                                                                                     ctx.guild) if role is None else ctx.guild.get_role(
-                                                                 role.id), 'mod_logs')
-                except errors.LoggingError:
-                    self.bot.console_output_log.warning(
-                        f"Failed to log {role_type} database set! on server {ctx.guild.name}. (ID: {ctx.guild.id})")
+            await self.bot.guild_config.set(ctx.guild.id, **{role_type: role.id})
+            self.bot.staff.invalidate(ctx.guild.id)
+            try:
+                await self.bot.terrygon_logger.log_setup("set", f"{role_type} role", ctx.author,
+                                                         ctx.guild.get_role(role.id), 'mod_logs')
+            except errors.LoggingError:
+                self.bot.console_output_log.warning(
+                    f"Failed to log {role_type} database set! on server {ctx.guild.name}. (ID: {ctx.guild.id})")
 
-                return 0
+            return 0
 
     async def set_unset_channels(self, ctx: commands.Context, channel: typing.Union[discord.TextChannel, None],
                                  channel_type: str, mode: str) -> int:
@@ -77,43 +71,41 @@ class Settings(commands.Cog):
         if channel_type not in ('mod_logs', 'message_logs', 'member_logs', 'filter_logs'):
             raise commands.BadArgument("Invalid Database Channel")
 
-        async with self.bot.db.acquire() as conn:
-            if mode.lower() == 'unset':
-                try:
-                    channel_id = await self.get_db_asset(channel_type, ctx.guild)
-                    if channel_id is None:
-                        return -1
+        if mode.lower() == 'unset':
+            try:
+                channel_id = await self.get_db_asset(channel_type, ctx.guild)
+                if channel_id is None:
+                    return -1
 
-                    await self.bot.terrygon_logger.log_setup("unset", f"{channel_type} channel", ctx.author,
-                                                             self.bot.get_channel(channel_id), channel_type)
+                await self.bot.terrygon_logger.log_setup("unset", f"{channel_type} channel", ctx.author,
+                                                         self.bot.get_channel(channel_id), channel_type)
 
-                except errors.LoggingError:
-                    self.bot.console_output_log.warning(
-                        f"Failed log setting the {channel} log channel on server: {ctx.guild.name} (ID: {ctx.guild.id})")
+            except errors.LoggingError:
+                self.bot.console_output_log.warning(
+                    f"Failed log setting the {channel} log channel on server: {ctx.guild.name} (ID: {ctx.guild.id})")
 
-                await conn.execute(f"UPDATE channels SET {channel_type} = NULL WHERE guild_id = $1", ctx.guild.id)
-                return 0
+            await self.bot.guild_config.set(ctx.guild.id, **{channel_type: None})
+            return 0
 
-            elif mode.lower() == 'set':
-                # just in case
-                if channel is None:
-                    await ctx.send("Please enter a channel to set")
-                    return -1
+        elif mode.lower() == 'set':
+            # just in case
+            if channel is None:
+                await ctx.send("Please enter a channel to set")
+                return -1
 
-                await conn.execute(f"UPDATE channels SET {channel_type} = $1 WHERE guild_id = $2", channel.id,
-                                   ctx.guild.id)
+            await self.bot.guild_config.set(ctx.guild.id, **{channel_type: channel.id})
 
-                try:
-                    await self.bot.terrygon_logger.log_setup("set", f"{channel_type} channel", ctx.author, channel,
-                                                             channel_type)
-                except errors.LoggingError:
-                    self.bot.console_output_log.warning(
-                        f"Failed log setting the {channel} log channel on server: {ctx.guild.name} (ID: {ctx.guild.id})")
+            try:
+                await self.bot.terrygon_logger.log_setup("set", f"{channel_type} channel", ctx.author, channel,
+                                                         channel_type)
+            except errors.LoggingError:
+                self.bot.console_output_log.warning(
+                    f"Failed log setting the {channel} log channel on server: {ctx.guild.name} (ID: {ctx.guild.id})")
 
-                return 0
+            return 0
 
-            else:
-                raise commands.BadArgument("Unknown mode, valid modes are set and unset!")
+        else:
+            raise commands.BadArgument("Unknown mode, valid modes are set and unset!")
 
     # channels
     @commands.guild_only()
@@ -276,45 +268,35 @@ class Settings(commands.Cog):
                 await ctx.send("Unable to unset any roles to the database!")
 
     async def toggle_join_logs(self, ctx: commands.Context):
-        async with self.bot.db.acquire() as conn:
-            member_logs_channel_id = await conn.fetchval("SELECT member_logs FROM channels WHERE guild_id =  $1",
-                                                         ctx.guild.id)
-            if member_logs_channel_id is None:
-                await ctx.send("Member log channel not configured!")
-                return
-
-            if await conn.fetchval("SELECT enable_join_leave_logs FROM guild_settings WHERE guild_id = $1",
-                                   ctx.guild.id):
-                await conn.execute("UPDATE guild_settings SET enable_join_leave_logs = FALSE WHERE guild_id = $1",
-                                   ctx.guild.id)
-                await ctx.send("Join and leave logs are now off!")
-                await self.bot.terrygon_logger.toggle_log_setup("unset", "join leave logs", ctx.author, 'member_logs')
-            else:
-                await conn.execute("UPDATE guild_settings SET enable_join_leave_logs = TRUE WHERE guild_id = $1",
-                                   ctx.guild.id)
-                await ctx.send("Join and leave logs are now on!")
-                await self.bot.terrygon_logger.toggle_log_setup("set", "join leave logs", ctx.author, 'member_logs')
+        guild_config = await self.bot.guild_config.get(ctx.guild.id)
+        if guild_config.member_logs is None:
+            await ctx.send("Member log channel not configured!")
+            return
+
+        if guild_config.enable_join_leave_logs:
+            await self.bot.guild_config.set(ctx.guild.id, enable_join_leave_logs=False)
+            await ctx.send("Join and leave logs are now off!")
+            await self.bot.terrygon_logger.toggle_log_setup("unset", "join leave logs", ctx.author, 'member_logs')
+        else:
+            await self.bot.guild_config.set(ctx.guild.id, enable_join_leave_logs=True)
+            await ctx.send("Join and leave logs are now on!")
+            await self.bot.terrygon_logger.toggle_log_setup("set", "join leave logs", ctx.author, 'member_logs')
 
     async def toggle_core_message_logs(self, ctx: commands.Context):
-        async with self.bot.db.acquire() as conn:
-            member_logs_channel_id = await conn.fetchval("SELECT message_logs FROM channels WHERE guild_id =  $1",
-                                                         ctx.guild.id)
-            if member_logs_channel_id is None:
-                await ctx.send("Message log channel not configured!")
-                return
-
-            if await conn.fetchval("SELECT enable_core_message_logs FROM guild_settings WHERE guild_id = $1",
-                                   ctx.guild.id):
-                await conn.execute("UPDATE guild_settings SET enable_core_message_logs = FALSE WHERE guild_id = $1",
-                                   ctx.guild.id)
-                await ctx.send("Message edits and deletes are no longer logged!")
-                await self.bot.terrygon_logger.toggle_log_setup("unset", "core message logs", ctx.author,
-                                                                'message_logs')
-            else:
-                await conn.execute("UPDATE guild_settings SET enable_core_message_logs = TRUE WHERE guild_id = $1",
-                                   ctx.guild.id)
-                await ctx.send("Message edits and deletes are now being logged!")
-                await self.bot.terrygon_logger.toggle_log_setup("set", "core message logs", ctx.author, 'message_logs')
+        guild_config = await self.bot.guild_config.get(ctx.guild.id)
+        if guild_config.message_logs is None:
+            await ctx.send("Message log channel not configured!")
+            return
+
+        if guild_config.enable_core_message_logs:
+            await self.bot.guild_config.set(ctx.guild.id, enable_core_message_logs=False)
+            await ctx.send("Message edits and deletes are no longer logged!")
+            await self.bot.terrygon_logger.toggle_log_setup("unset", "core message logs", ctx.author,
+                                                            'message_logs')
+        else:
+            await self.bot.guild_config.set(ctx.guild.id, enable_core_message_logs=True)
+            await ctx.send("Message edits and deletes are now being logged!")
+            await self.bot.terrygon_logger.toggle_log_setup("set", "core message logs", ctx.author, 'message_logs')
 
     @commands.guild_only()
     @checks.is_staff_or_perms('Owner', administrator=True)
@@ -358,7 +340,7 @@ class Settings(commands.Cog):
     @muted_role.command(name="unset")
     async def muted_role_unset(self, ctx: commands.Context):
         """Unsets the muted role (Admin+, manage server)"""
-        muted_role_id = await self.bot.db.fetchval("SELECT muted_role FROM roles WHERE guild_id = $1", ctx.guild.id)
+        muted_role_id = (await self.bot.guild_config.get(ctx.guild.id)).muted_role
         if not muted_role_id:
             return await ctx.send("No muted_role saved in the database.")
         await self.set_unset_role(ctx, None, 'muted_role', 'unset')
@@ -401,6 +383,7 @@ class Settings(commands.Cog):
             for vc in ctx.guild.voice_channels:
                 if not vc.permissions_synced:
                     await vc.set_permissions(role, connect=False)
+            await memory.ensure_chunked(ctx.guild)
             for member in ctx.guild.members:
                 if member.id == await self.bot.db.fetchval("SELECT user_id FROM mutes WHERE guild_id = $1",
                                                            ctx.guild.id):
@@ -474,10 +457,8 @@ class Settings(commands.Cog):
             await ctx.send("Invalid data given, please run this command again.")
             return -1
 
-        await self.bot.db.execute("UPDATE channels SET probation_channel = $1 WHERE guild_id = $2",
-                                  probation_channel.id, ctx.guild.id)
-        await self.bot.db.execute("UPDATE roles SET probation_role = $1 WHERE guild_id = $2", probation_role.id,
-                                  ctx.guild.id)
+        await self.bot.guild_config.set(ctx.guild.id, probation_channel=probation_channel.id,
+                                        probation_role=probation_role.id)
 
         # set permissions
         async with ctx.channel.typing():
@@ -498,11 +479,11 @@ class Settings(commands.Cog):
             # channel
             await probation_channel.set_permissions(probation_role, read_messages=True, send_messages=None,
                                                     read_message_history=True, add_reactions=False, attach_files=False, embed_links=False)
-            staff_roles_id = await self.bot.db.fetchrow(
-                "SELECT mod_role, admin_role, owner_role FROM roles WHERE guild_id = $1", ctx.guild.id)
+            guild_config = await self.bot.guild_config.get(ctx.guild.id)
+            staff_roles_id = (guild_config.mod_role, guild_config.admin_role, guild_config.owner_role)
 
             await probation_channel.set_permissions(ctx.guild.default_role, read_messages=False)
-            if staff_roles_id:
+            if any(staff_roles_id):
                 staff_roles = []
                 for r_id in staff_roles_id:
                     role = ctx.guild.get_role(r_id)
@@ -522,14 +503,11 @@ class Settings(commands.Cog):
     @probation_settings.command(name="unset", aliases=['unconfigure'])
     async def probation_unset(self, ctx: commands.Context):
         """Removes a probation system."""
-        probation_role_id = await self.bot.db.fetchval("SELECT probation_role FROM roles WHERE guild_id = $1",
-                                                       ctx.guild.id)
-        probation_channel_id = await self.bot.db.fetchval("SELECT probation_channel FROM channels WHERE guild_id = $1",
-                                                          ctx.guild.id)
-        probation_role = ctx.guild.get_role(probation_role_id)
-        probation_channel = ctx.guild.get_channel(probation_channel_id)
-
-        await self.bot.db.execute("UPDATE roles SET probation_role = NULL WHERE guild_id = $1", ctx.guild.id)
+        guild_config = await self.bot.guild_config.get(ctx.guild.id)
+        probation_role = ctx.guild.get_role(guild_config.probation_role)
+        probation_channel = ctx.guild.get_channel(guild_config.probation_channel)
+
+        await self.bot.guild_config.set(ctx.guild.id, probation_role=None)
         if probation_role:
             res, msg = await paginator.YesNoMenu(
                 "Would you like to delete the probation role? This will unprobate all users.").prompt(ctx)
@@ -546,7 +524,7 @@ class Settings(commands.Cog):
         else:
             await ctx.send("Probation role has already been deleted, removing from database.")
 
-        await self.bot.db.execute("UPDATE channels SET probation_channel = NULL WHERE guild_id = $1", ctx.guild.id)
+        await self.bot.guild_config.set(ctx.guild.id, probation_channel=None)
         if probation_channel:
             res, msg = await paginator.YesNoMenu("Would you like to delete the probation channel?").prompt(ctx)
             if res:
@@ -561,7 +539,7 @@ class Settings(commands.Cog):
             await ctx.send("Probation channel has already been deleted")
 
         await self.bot.db.execute("DELETE FROM probations WHERE guild_id = $1", ctx.guild.id)
-        await self.bot.db.execute("UPDATE guild_settings SET auto_probate = FALSE WHERE guild_id = $1", ctx.guild.id)
+        await self.bot.guild_config.set(ctx.guild.id, auto_probate=False)
         await ctx.send("Probation system removed.")
         await self.bot.terrygon_logger.probation_settings("unset", ctx.author)
 
@@ -570,8 +548,9 @@ class Settings(commands.Cog):
     @probation_settings.command(name="list")
     async def probation_list(self, ctx: commands.Context):
         """Shows probation settings"""
-        c_id = await self.bot.db.fetchval("SELECT probation_channel FROM channels WHERE guild_id = $1", ctx.guild.id)
-        r_id = await self.bot.db.fetchval("SELECT probation_role FROM roles WHERE guild_id = $1", ctx.guild.id)
+        guild_config = await self.bot.guild_config.get(ctx.guild.id)
+        c_id = guild_config.probation_channel
+        r_id = guild_config.probation_role
         probation_channel = ctx.guild.get_channel(c_id)
         probation_role = ctx.guild.get_role(r_id)
         emb = discord.Embed(title=f"Probation settings for {ctx.guild.name}")
@@ -589,9 +568,7 @@ class Settings(commands.Cog):
         else:
             desc += f"No probation role set.\n"
 
-        status = await self.bot.db.fetchval("SELECT auto_probate FROM guild_settings WHERE guild_id = $1", ctx.guild.id)
-
-        if status:
+        if guild_config.auto_probate:
             desc += "Auto probate is currently enabled. To disable, please run `autoprobate disable`"
         else:
             desc += "Auto probate is currently disabled. To enable, please run `autoprobate enable`"
@@ -611,47 +588,35 @@ class Settings(commands.Cog):
     async def add(self, ctx: commands.Context, new_prefix: str):
         """Adds a prefix to the bot for your guild (Admin+, or manage server) (No more than 10 per guild)"""
         new_prefix = discord.utils.escape_mentions(new_prefix)  # ha ha no
-        async with self.bot.db.acquire() as conn:
-            guild_prefixes = await conn.fetchval("SELECT prefixes FROM guild_settings WHERE guild_id = $1",
-                                                 ctx.guild.id)
-            if guild_prefixes is None:
-                guild_prefixes = []
-
-            if new_prefix not in guild_prefixes and len(guild_prefixes) < 10:
-                await conn.execute(
-                    "UPDATE guild_settings SET prefixes = array_append(prefixes, $1) WHERE guild_id = $2",
-                    new_prefix, ctx.guild.id)
-                return await ctx.send(f"Added prefix `{new_prefix}` as a guild prefix")
+        guild_prefixes = (await self.bot.guild_config.get(ctx.guild.id)).prefixes
+        if new_prefix not in guild_prefixes and len(guild_prefixes) < 10:
+            await self.bot.guild_config.set(ctx.guild.id, prefixes=guild_prefixes + (new_prefix,))
+            return await ctx.send(f"Added prefix `{new_prefix}` as a guild prefix")
+        else:
+            if len(guild_prefixes) >= 10:
+                return await ctx.send("No more than 10 custom prefixes may be added!")
             else:
-                if len(guild_prefixes) >= 10:
-                    return await ctx.send("No more than 10 custom prefixes may be added!")
-                else:
-                    return await ctx.send("This prefix is already in the guild!")
+                return await ctx.send("This prefix is already in the guild!")
 
     @commands.guild_only()
     @checks.is_staff_or_perms("Admin", manage_guild=True)
     @prefix.command(aliases=['del', 'delete'])
     async def remove(self, ctx: commands.Context, prefix: str):
         """Removes a prefix from the guild (Admin+, or Manage Server)"""
-        async with self.bot.db.acquire() as conn:
-            guild_prefixes = await conn.fetchval("SELECT prefixes FROM guild_settings WHERE guild_id = $1",
-                                                 ctx.guild.id)
-            if not guild_prefixes:
-                return await ctx.send("No custom guild prefixes saved!")
-            elif prefix not in guild_prefixes:
-                return await ctx.send("This prefix is not saved to this guild!")
-            else:
-                await conn.execute(
-                    "UPDATE guild_settings SET prefixes = array_remove(prefixes, $1) WHERE guild_id = $2",
-                    prefix, ctx.guild.id)
-                await ctx.send("Prefix removed!")
+        guild_prefixes = (await self.bot.guild_config.get(ctx.guild.id)).prefixes
+        if not guild_prefixes:
+            return await ctx.send("No custom guild prefixes saved!")
+        elif prefix not in guild_prefixes:
+            return await ctx.send("This prefix is not saved to this guild!")
+        else:
+            await self.bot.guild_config.set(ctx.guild.id, prefixes=tuple(p for p in guild_prefixes if p != prefix))
+            await ctx.send("Prefix removed!")
 
     @commands.guild_only()
     @prefix.command()
     async def list(self, ctx: commands.Context):
         """List the guild's custom prefixes"""
-        guild_prefixes = await self.bot.db.fetchval("SELECT prefixes FROM guild_settings WHERE guild_id = $1",
-                                                    ctx.guild.id)
+        guild_prefixes = (await self.bot.guild_config.get(ctx.guild.id)).prefixes
         embed = discord.Embed(title=f"Prefixes for {ctx.guild.name}", color=common.gen_color(ctx.guild.id))
         if guild_prefixes:
             prefix_str = ""
@@ -665,7 +630,7 @@ class Settings(commands.Cog):
 
         embed.description = prefix_str
         embed.add_field(name="Global default prefixes",
-                        value=f"- {ctx.me.mention}\n- `{read_config('info', 'default_prefix')}`", inline=False)
+                        value=f"- {ctx.me.mention}\n- `{self.bot.config.default_prefix}`", inline=False)
         await ctx.send(embed=embed)
 
 
@@ -9,16 +9,16 @@ class Trusted(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    async def get_trusted_list(self, guild_id: int) -> list:
-        """Returns a list of trusted user ids for a guild, or None if none are found"""
-        return await self.bot.db.fetchval("SELECT trusted_uid FROM trusted_users WHERE guild_id = $1", guild_id)
+    def get_trusted_list(self, guild_id: int) -> typing.FrozenSet[int]:
+        """Returns a guild's trusted user ids"""
+        return self.bot.trusted.members(guild_id)
 
     @commands.guild_only()
     @flags.add_flag('--id', '-i', action="store_true", default=False)
     @flags.command(name="listtrusted", aliases=['trustlist', 'trusted_users', 'trustedlist'])
     async def list_trusted(self, ctx: commands.Context, **flag_arg):
         """Lists a guild's trusted users"""
-        trusted_ids = await self.get_trusted_list(ctx.guild.id)
+        trusted_ids = self.get_trusted_list(ctx.guild.id)
         embed = discord.Embed(title=f"Trusted users for {ctx.guild.name}", colour=common.gen_color(ctx.guild.id))
 
         if not trusted_ids:
@@ -27,10 +27,9 @@ class Trusted(commands.Cog):
 
         deleted_users = ""
         trusted_user_str = ""
-        for uid in trusted_ids:
-            user = self.bot.get_user(uid) if self.bot.get_user(uid) else await self.bot.fetch_user(uid)
+        users = await self.bot.user_resolver.fetch_many(trusted_ids)
+        for uid, user in users.items():
             if user is None:
-                deleted_users = True
                 deleted_users += f"- \U000026a0 {uid}\n"
             else:
                 trusted_user_str += f"- {user}"
@@ -50,15 +49,10 @@ class Trusted(commands.Cog):
     async def trust(self, ctx: commands.Context, member: typing.Union[discord.Member, int]):
         """Adds a member to the guild's trusted list (Admin+ or manage server)"""
         if isinstance(member, int):
-            try:
-                member = await self.bot.fetch_user(member)
-            except discord.NotFound:
+            member = await self.bot.user_resolver.fetch(member)
+            if member is None:
                 return await ctx.send("Invalid user given")
-        trusted_list = await self.get_trusted_list(ctx.guild.id)
-        if trusted_list is None or member.id not in trusted_list:
-            await self.bot.db.execute(
-                "UPDATE trusted_users SET trusted_uid = array_append(trusted_uid, $1) WHERE guild_id = $2", member.id,
-                ctx.guild.id)
+        if await self.bot.trusted.add(ctx.guild.id, member.id):
             await ctx.send(f"Added {member} to {ctx.guild.name}'s trusted list!")
         else:
             await ctx.send("This user is already trusted!")
@@ -68,17 +62,13 @@ class Trusted(commands.Cog):
     @commands.command()
     async def untrust(self, ctx: commands.Context, member: typing.Union[discord.Member, int]):
         """Removes a member to the guild's trusted list (Admin+ or manage server)"""
-        trusted_list = await self.get_trusted_list(ctx.guild.id)
         if isinstance(member, discord.Member):
             member = member.id
 
-        if trusted_list is None or len(trusted_list) == 0:
+        if not self.get_trusted_list(ctx.guild.id):
             return await ctx.send("No trusted users saved")
 
-        elif member in trusted_list:
-            await self.bot.db.execute(
-                "UPDATE trusted_users SET trusted_uid = array_remove(trusted_uid, $1) WHERE guild_id = $2", member,
-                ctx.guild.id)
+        elif await self.bot.trusted.remove(ctx.guild.id, member):
             await ctx.send(f"{ctx.guild.get_member(member) if ctx.guild.get_member(member) is not None else 'User'} has been removed from trusted list!")
         else:
             await ctx.send("This user is not trusted")
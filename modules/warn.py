@@ -1,10 +1,11 @@
 from datetime import datetime, timedelta
+import functools
 from discord.ext import commands
 import discord
 from discord.errors import Forbidden
 import typing
 
-from utils import checks, common, errors, paginator
+from utils import checks, common, errors, paginator, warns
 
 
 class DbWarn:
@@ -19,6 +20,39 @@ class DbWarn:
         self.reason = reason
 
 
+class WarnPageSource(paginator.KeysetPageSource):
+    """A user's warns, fetched a page at a time and numbered in the order they were given"""
+
+    def __init__(self, bot, guild: discord.Guild, user: typing.Union[discord.Member, discord.User], total: int,
+                 in_server: bool, per_page: int = 10):
+        self.bot = bot
+        self.user = user
+        self.in_server = in_server
+        super().__init__(functools.partial(warns.warns_after, bot.db, guild.id, user.id),
+                         functools.partial(warns.warns_before, bot.db, guild.id, user.id),
+                         total, per_page=per_page, key='warn_id')
+
+    async def format_page(self, menu, entries):
+        user_warns = [DbWarn(*record) for record in entries]
+        embed = discord.Embed(color=self.user.color)
+        embed.set_author(name=f"List of warns for {self.user.name}#{self.user.discriminator}:",
+                         icon_url=self.user.avatar.url)
+
+        issuers = await self.bot.user_resolver.fetch_many(warn.author_id for warn in user_warns)
+        for num, warn in enumerate(user_warns, menu.current_page * self.per_page + 1):
+            issuer = issuers[warn.author_id] or f"Deleted user ({warn.author_id})"
+
+            embed.add_field(name=f"\n\n{num} : {warn.time_stamp}",
+                            value=f"""{warn.reason if warn.reason is not None else 'No reason given for warn'}\n
+            Warn ID: {warn.id}\nIssuer: {issuer}""")
+
+        footer = f"Page {menu.current_page + 1} of {self.get_max_pages()}"
+        if not self.in_server:
+            footer += ", this user is not in the server"
+        embed.set_footer(text=footer)
+        return embed
+
+
 class Warn(commands.Cog):
     """
     Warning system
@@ -29,14 +63,7 @@ class Warn(commands.Cog):
 
     async def warn_user_out_server(self, ctx: commands.Context, user: discord.User, reason: str or None):
         """Warns a user outside of a server."""
-        warn_num = int(
-            await self.bot.db.fetchval("SELECT COUNT(warn_id) FROM warns WHERE user_id = $1 AND guild_id = $2;",
-                                       user.id, ctx.guild.id)) + 1
-        if warn_num is None:
-            warn_num = 1
-
-        await self.bot.db.execute("INSERT INTO warns (user_id, author_id, guild_id, reason) VALUES ($1, $2, $3, $4);",
-                                  user.id, ctx.author.id, ctx.guild.id, reason)
+        warn_num = await warns.add_warn(self.bot.db, ctx.guild.id, user.id, ctx.author.id, reason)
         await ctx.send(f"🚩 {user} has been warned. This is warning #{warn_num}.")
         await self.bot.terrygon_logger.mod_logs(ctx, 'warn', user, ctx.author, reason)
 
@@ -47,9 +74,8 @@ class Warn(commands.Cog):
         """Gives a user a warning without punishing them on 3, 4, and 5 warns (Mod+)"""
         # check if valid user
         if isinstance(member, int):
-            try:
-                user = await self.bot.fetch_user(member)
-            except discord.NotFound:
+            user = await self.bot.user_resolver.fetch(member)
+            if user is None:
                 return await ctx.send("Invalid user given.")
 
             return await self.warn_user_out_server(ctx, user, reason)
@@ -59,16 +85,7 @@ class Warn(commands.Cog):
             await ctx.send(mod_bot_protection)
             return
 
-        async with self.bot.db.acquire() as conn:
-
-            warn_num = int(
-                await conn.fetchval("SELECT COUNT(warn_id) FROM warns WHERE user_id = $1 AND guild_id = $2;", member.id,
-                                    ctx.guild.id)) + 1
-            if warn_num is None:
-                warn_num = 1
-
-            await conn.execute("INSERT INTO warns (user_id, author_id, guild_id, reason) VALUES ($1, $2, $3, $4);",
-                               member.id, ctx.author.id, ctx.guild.id, reason)
+        warn_num = await warns.add_warn(self.bot.db, ctx.guild.id, member.id, ctx.author.id, reason)
 
         await ctx.send(f"🚩 {member} has been warned. This is warning #{warn_num}.")
         await self.bot.terrygon_logger.mod_logs(ctx, 'warn', member, ctx.author, reason)
@@ -96,8 +113,7 @@ class Warn(commands.Cog):
     async def list(self, ctx: commands.Context):
         """Shows what warn will do what punishment"""
         out = discord.Embed(title=f"Warn Punishments for {ctx.guild.name}", colour=common.gen_color(ctx.guild.id))
-        warn_punishment_data = await self.bot.db.fetchval(
-            "SELECT warn_punishments FROM guild_settings WHERE guild_id = $1", ctx.guild.id)
+        warn_punishment_data = (await self.bot.guild_config.get(ctx.guild.id)).warn_punishments
 
         if not warn_punishment_data:
             out.description = f"There are no warn punishments on {ctx.guild.name}."
@@ -118,49 +134,37 @@ class Warn(commands.Cog):
         if warn_punishment.lower() not in ('kick', 'ban', 'mute', 'probate'):
             return await ctx.send(
                 "Invalid punishment given, valid punishments are `kick`, `ban`, 'probate' and `mute`.")
-        async with self.bot.db.acquire() as conn:
-            if warn_punishment.lower() == 'mute':
-                if await conn.fetchval("SELECT muted_role FROM roles WHERE guild_id = $1", ctx.guild.id) is None:
-                    cog = self.bot.get_cog('Settings')
-                    if not cog:
-                        return await ctx.send(
-                            "Settings cog not loaded and muted role not set, please manually set the muted role or load the setup cog to trigger the wizard")
-                    await cog.muted_role_setup(ctx)
-
-                if not mute_time:
-                    mute_time = "24h"
-                res = common.parse_time(mute_time)
+        guild_config = await self.bot.guild_config.get(ctx.guild.id)
+        if warn_punishment.lower() == 'mute':
+            if guild_config.muted_role is None:
+                cog = self.bot.get_cog('Settings')
+                if not cog:
+                    return await ctx.send(
+                        "Settings cog not loaded and muted role not set, please manually set the muted role or load the setup cog to trigger the wizard")
+                await cog.muted_role_setup(ctx)
+
+            if not mute_time:
+                mute_time = "24h"
+            res = common.parse_time(mute_time)
+            if res == -1:
+                return await ctx.send("Invalid time format")
+            await self.bot.guild_config.set(ctx.guild.id, warn_automute_time=res)
+
+        if warn_punishment.lower() == 'probate':
+            probation_role = ctx.guild.get_role(guild_config.probation_role)
+            if not probation_role and not guild_config.probation_channel:
+                cog = self.bot.get_cog("Settings")
+                if not cog:
+                    return await ctx.send(
+                        "Settings cog not loaded and muted role not set, please manually set the muted role or load the setup cog to trigger the wizard")
+
+                res = await cog.probation_setup(ctx, channel=None, roles=None)
                 if res == -1:
-                    return await ctx.send("Invalid time format")
-                await conn.execute("UPDATE guild_settings SET warn_automute_time = $1 WHERE guild_id = $2", res,
-                                   ctx.guild.id)
-
-            if warn_punishment.lower() == 'probate':
-                probate_role_id = await conn.fetchval("SELECT probation_role FROM roles WHERE guild_id = $1",
-                                                      ctx.guild.id)
-                probate_channel_id = await conn.fetchval("SELECT probation_channel FROM channels WHERE guild_id = $1",
-                                                         ctx.guild.id)
-                probation_role = ctx.guild.get_role(probate_role_id)
-                if not probation_role and not probate_channel_id:
-                    cog = self.bot.get_cog("Settings")
-                    if not cog:
-                        return await ctx.send(
-                            "Settings cog not loaded and muted role not set, please manually set the muted role or load the setup cog to trigger the wizard")
-
-                    res = await cog.probation_setup(ctx, channel=None, roles=None)
-                    if res == -1:
-                        return await ctx.send(
-                            "Unable to set probation warn punishment due to probation configuration error.")
-
-            if await conn.fetchval("SELECT warn_punishments FROM guild_settings WHERE guild_id = $1",
-                                   ctx.guild.id) is None:
-                await conn.execute(
-                    "UPDATE guild_settings SET warn_punishments = json_build_object() WHERE guild_id = $1",
-                    ctx.guild.id)
-
-            await conn.execute(
-                "UPDATE guild_settings SET warn_punishments = warn_punishments::jsonb || jsonb_build_object($1::INT, $2::TEXT) WHERE guild_id = $3",
-                warn_number, warn_punishment, ctx.guild.id)
+                    return await ctx.send(
+                        "Unable to set probation warn punishment due to probation configuration error.")
+
+        ladder = guild_config.warn_punishments.with_tier(warn_number, warn_punishment)
+        await self.bot.guild_config.set(ctx.guild.id, warn_punishments=ladder.to_json())
 
         await ctx.send(f"Ok, I will now {warn_punishment} when a user gets {warn_number} warn(s).")
         try:
@@ -173,15 +177,16 @@ class Warn(commands.Cog):
     @warn_punishments.command()
     async def unset(self, ctx: commands.Context, warn_number: int):
         """Unsets a warn punishment"""
-        async with self.bot.db.acquire() as conn:
-            if await conn.fetchval("SELECT warn_punishments->>$1 FROM guild_settings WHERE guild_id = $2", warn_number,
-                                   ctx.guild.id):
-                await conn.execute(
-                    "UPDATE guild_settings SET warn_punishments = warn_punishments::jsonb - $1 WHERE guild_id = $2",
-                    warn_number, ctx.guild.id)
-                await ctx.send("Deleted warn punishment!")
-            else:
-                await ctx.send("No punishment is set for this warn number!")
+        ladder = (await self.bot.guild_config.get(ctx.guild.id)).warn_punishments
+        if ladder.get(warn_number) is not None:
+            await self.bot.guild_config.set(ctx.guild.id, warn_punishments=ladder.without_tier(warn_number).to_json())
+            await ctx.send("Deleted warn punishment!")
+        else:
+            await ctx.send("No punishment is set for this warn number!")
+
+    async def warn_punishment(self, guild_id: int, warn_num: int) -> typing.Optional[str]:
+        """The punishment set for a user's warn_num'th warn, None if there is none"""
+        return (await self.bot.guild_config.get(guild_id)).warn_punishments.for_warn(warn_num)
 
     # handle warn punishments
     async def punish(self, member: discord.Member, warn_number: int, action: str, moderator: discord.Member = None):
@@ -210,8 +215,7 @@ class Warn(commands.Cog):
                 msg = "Unable to auto mute member, Mod module cannot be loaded. Please contact a bot maintainer."
                 await self.bot.terrygon_logger.custom_log("mod_logs", member.guild, msg)
 
-            time_seconds = await self.bot.db.fetchval(
-                "SELECT warn_automute_time FROM guild_settings WHERE guild_id = $1", member.guild.id)
+            time_seconds = (await self.bot.guild_config.get(member.guild.id)).warn_automute_time
             res = await cog.silent_mute_prep(member, 'timed')
             if res == -1:
                 self.bot.console_output_log.warn(
@@ -260,9 +264,8 @@ class Warn(commands.Cog):
         """Warns a user, set your punishments with the `punishment set` command"""
         # check if valid user
         if isinstance(member, int):
-            try:
-                user = await self.bot.fetch_user(member)
-            except discord.NotFound:
+            user = await self.bot.user_resolver.fetch(member)
+            if user is None:
                 return await ctx.send("Invalid user given.")
 
             return await self.warn_user_out_server(ctx, user, reason)
@@ -272,20 +275,7 @@ class Warn(commands.Cog):
             await ctx.send(mod_bot_protection)
             return
 
-        async with self.bot.db.acquire() as conn:
-
-            warn_num = int(
-                await conn.fetchval("SELECT COUNT(warn_id) FROM warns WHERE user_id = $1 AND guild_id = $2;", member.id,
-                                    ctx.guild.id)) + 1
-            if warn_num is None:
-                warn_num = 1
-
-            await conn.execute("INSERT INTO warns (user_id, author_id, guild_id, reason) VALUES ($1, $2, $3, $4);",
-                               member.id, ctx.author.id, ctx.guild.id, reason)
-
-            # get warn punishment data
-            punishment_data = await conn.fetchval("SELECT warn_punishments FROM guild_settings WHERE guild_id = $1",
-                                                  ctx.guild.id)
+        warn_num = await warns.add_warn(self.bot.db, ctx.guild.id, member.id, ctx.author.id, reason)
 
         await ctx.send(f"🚩 {member} has been warned. This is warning #{warn_num}.")
         try:
@@ -299,23 +289,18 @@ class Warn(commands.Cog):
 
         msg += f"This is warning {warn_num}\n"
 
-        if punishment_data:
-            highest_punishment_value = max(punishment_data.keys())
-            if str(warn_num + 1) in list(punishment_data.keys()):
-                msg += f"The next warn will **{punishment_data[str(warn_num + 1)]}** you."
+        next_punishment = await self.warn_punishment(ctx.guild.id, warn_num + 1)
+        if next_punishment is not None:
+            msg += f"The next warn will **{next_punishment}** you."
 
         try:
             await member.send(msg)
         except Forbidden:
             pass
 
-        if punishment_data:
-            if str(warn_num) in list(punishment_data.keys()):
-                await self.punish(member, warn_num, punishment_data[str(warn_num)], ctx.author)
-
-            # just in case
-            elif warn_num > int(highest_punishment_value):
-                await self.punish(member, warn_num, punishment_data[str(highest_punishment_value)], ctx.author)
+        punishment = await self.warn_punishment(ctx.guild.id, warn_num)
+        if punishment is not None:
+            await self.punish(member, warn_num, punishment, ctx.author)
 
     @commands.guild_only()
     @checks.is_staff_or_perms("Mod", manage_roles=True, manage_channels=True)
@@ -323,37 +308,21 @@ class Warn(commands.Cog):
     async def delete_warn(self, ctx: commands.Context, member: typing.Union[discord.Member, int], warn_num: int):
         """Removes a single warn (Staff only)"""
         if isinstance(member, int):
-            try:
-                member = await self.bot.fetch_user(member)
-            except discord.NotFound:
+            member = await self.bot.user_resolver.fetch(member)
+            if member is None:
                 return await ctx.send("Invalid user given.")
 
-        async with self.bot.db.acquire() as conn:
-            warn_records = await conn.fetch("SELECT * FROM warns WHERE user_id = $1 AND guild_id = $2", member.id,
-                                            ctx.guild.id)
-            if warn_records:
-                deleted_warn = None
-                for num, record in enumerate(warn_records, 1):
-                    if num == warn_num:
-                        deleted_warn = DbWarn(*record)
-                        break
-
-                if deleted_warn is None:
-                    await ctx.send(f"This user does not have a warn {warn_num}")
-                    return
-
-                # just in case, should never trigger!
-                if deleted_warn.guild_id != ctx.guild.id:
-                    await ctx.send("You cannot clear another guild's warns!")
-                    return
-
-                await conn.execute("DELETE FROM warns WHERE warn_id = $1", deleted_warn.id)
-
-            else:
+        record = await warns.nth_warn(self.bot.db, ctx.guild.id, member.id, warn_num)
+        if record is None:
+            if not await warns.warn_count(self.bot.db, ctx.guild.id, member.id):
                 return await ctx.send("This user has no warns on this server!")
+            return await ctx.send(f"This user does not have a warn {warn_num}")
+
+        deleted_warn = DbWarn(*record)
+        await warns.delete_warn(self.bot.db, ctx.guild.id, deleted_warn.id)
 
-            await ctx.send(f"Warn {warn_num} removed!")
-            await self.bot.terrygon_logger.warn_clear('clear', member, ctx.author, deleted_warn)
+        await ctx.send(f"Warn {warn_num} removed!")
+        await self.bot.terrygon_logger.warn_clear('clear', member, ctx.author, deleted_warn)
 
     @commands.guild_only()
     @commands.command(name='listwarns')
@@ -367,42 +336,26 @@ class Warn(commands.Cog):
             member = ctx.message.author
 
         elif isinstance(member, int):
-            member = await self.bot.fetch_user(member)
+            member = await self.bot.user_resolver.fetch(member)
+            if member is None:
+                return await ctx.send("Invalid user given.")
             in_server = False
 
-        has_perms = await checks.nondeco_is_staff_or_perms(ctx, self.bot.db, "Mod", manage_roles=True)
+        has_perms = await checks.nondeco_is_staff_or_perms(ctx, self.bot, "Mod", manage_roles=True)
 
         if not has_perms and member != ctx.message.author:
             return await ctx.send("You don't have permission to list other member's warns!")
 
-        async with self.bot.db.acquire() as conn:
-            warn_records = await conn.fetch("SELECT * FROM warns WHERE user_id = $1 AND guild_id = $2", member.id,
-                                            ctx.guild.id)
-
-        if len(warn_records) == 0:
+        total = await warns.warn_count(self.bot.db, ctx.guild.id, member.id)
+        if total == 0:
             embed = discord.Embed(color=member.color)
             embed.set_author(name=f"Warns for {member.name}#{member.discriminator}", icon_url=member.avatar.url)
             embed.description = "There are none!"
             return await ctx.send(embed=embed)
 
-        user_warns = []
-        for warn in warn_records:
-            user_warns.append(DbWarn(*warn))
-
-        embed = discord.Embed(color=member.color)
-        embed.set_author(name=f"List of warns for {member.name}#{member.discriminator}:", icon_url=member.avatar.url)
-
-        for num, warn in enumerate(user_warns, 1):
-            issuer = self.bot.get_user(warn.author_id) if self.bot.get_user(
-                warn.author_id) is not None else await self.bot.fetch_user(warn.author_id)
-
-            embed.add_field(name=f"\n\n{num} : {warn.time_stamp}",
-                            value=f"""{warn.reason if warn.reason is not None else 'No reason given for warn'}\n
-            Warn ID: {warn.id}\nIssuer: {issuer.name}#{issuer.discriminator}""")
-
-        if not in_server:
-            embed.set_footer(text="This user is not in the server")
-        await ctx.send(embed=embed)
+        pages = paginator.ReactDeletePages(WarnPageSource(self.bot, ctx.guild, member, total, in_server),
+                                           clear_reactions_after=True, check_embeds=True)
+        await pages.start(ctx)
 
     @commands.guild_only()
     @checks.is_staff_or_perms("Mod", manage_roles=True, manage_channels=True)
@@ -411,21 +364,17 @@ class Warn(commands.Cog):
         """Clear's all warns from a user"""
 
         if isinstance(member, int):
-            try:
-                member = await self.bot.fetch_user(member)
-            except discord.NotFound:
+            member = await self.bot.user_resolver.fetch(member)
+            if member is None:
                 return await ctx.send("Invalid user given.")
 
-        async with self.bot.db.acquire() as conn:
-            warn_nums = await conn.fetchval("SELECT COUNT(warn_id) FROM warns WHERE user_id = $1 AND guild_id = $2",
-                                            member.id, ctx.guild.id)
-            if warn_nums is None:
-                await ctx.send("No warns found")
+        warn_nums = await warns.clear_warns(self.bot.db, ctx.guild.id, member.id)
+        if not warn_nums:
+            await ctx.send("No warns found")
 
-            else:
-                await self.bot.terrygon_logger.warn_clear('clear', member, ctx.author)
-                await conn.execute("DELETE FROM warns WHERE user_id = $1 AND guild_id = $2", member.id, ctx.guild.id)
-                await ctx.send(f"{warn_nums} warns cleared from {member}")
+        else:
+            await self.bot.terrygon_logger.warn_clear('clear', member, ctx.author)
+            await ctx.send(f"{warn_nums} warns cleared from {member}")
 
 
 def setup(bot):
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import typing
+import time
 from traceback import format_exception
 import sys
 import os
@@ -8,9 +9,12 @@ from discord.ext import commands, flags
 import asyncpg
 import asyncio
 from logzero import setup_logger
-import toml
-from utils import errors, scheduler, checks
+from utils import errors, scheduler, checks, migrations, startup, memory, metrics, db, watchdog, offload
+from utils.cache import GuildConfigCache, StaffResolver, TrustedIndex, FilterIndex
+from utils.config import ConfigSnapshot, get_config
 from utils.logger import TerrygonLogger
+from utils.message_context import MessageContexts
+from utils.users import UserResolver
 import json
 
 # check if log folder and files exist
@@ -31,26 +35,24 @@ async def create_pool():
     async def configure_connection_codec(conn):
         await conn.set_type_codec('jsonb', encoder=json.dumps, decoder=json.loads, schema='pg_catalog')
 
-    return await asyncpg.create_pool(read_config("credentials", "db"), init=configure_connection_codec,
+    return await asyncpg.create_pool(get_config().snapshot.db, init=configure_connection_codec,
                                      server_settings={'search_path': "terrygon"})
 
 
 def read_config(block, config):
-    """Reads configurations from config.toml"""
-    output = toml.load(open("data/config.toml"), _dict=dict)
-    return output[block][config]
+    """Reads configurations from the current config.toml snapshot"""
+    return get_config().snapshot.get(block, config)
 
 
 # modified from https://gitlab.com/lightning-bot/Lightning/-/blob/v3/lightning.py#L42 and https://github.com/Rapptz/RoboDanny/blob/rewrite/bot.py#L44
 async def _callable_prefix(bot, message: discord.Message):
     """Allows for a dynamic bot prefix"""
-    default_prefix = read_config("info", 'default_prefix')
+    default_prefix = bot.config.default_prefix
     if message.guild is None:
         return commands.when_mentioned_or(default_prefix)(bot, message)
-    guild_prefixes = await bot.db.fetchval("SELECT prefixes FROM guild_settings WHERE guild_id = $1", message.guild.id)
+    guild_prefixes = (await bot.message_contexts.get(message).config()).prefixes
     if guild_prefixes:
-        guild_prefixes.append(default_prefix)
-        return commands.when_mentioned_or(*guild_prefixes)(bot, message)
+        return commands.when_mentioned_or(*guild_prefixes, default_prefix)(bot, message)
     else:
         return commands.when_mentioned_or(default_prefix)(bot, message)
 
@@ -76,23 +78,31 @@ class TerryHelp(commands.MinimalHelpCommand):
 class Terrygon(commands.AutoShardedBot):
     """Main bot class"""
 
-    def __init__(self):
+    def __init__(self, **options):
         # set up loggers
         self.error_log = setup_logger(name="error_log", logfile="data/logs/error.log", maxBytes=100000)
         self.console_output_log = setup_logger(name="console_output_log", logfile="data/logs/console_output.log",
                                                maxBytes=100000)
 
+        self.startup_report = startup.StartupReport()
+        self._started = False
         self.loop = asyncio.get_event_loop()
+        self.config_manager = get_config()
         help_cmd = TerryHelp(dm_help=None, dm_help_threshold=800)
-        super().__init__(command_prefix=_callable_prefix, description=read_config("info", "description"),
-                         max_messages=10000,
+        self.memory_profile = memory.profile_from_config(self.config.section('memory'))
+        super().__init__(command_prefix=_callable_prefix, description=self.config.description,
                          help_command=help_cmd,
                          allowed_mentions=discord.AllowedMentions(everyone=False, users=True, roles=True),
-                         intents=discord.Intents().all(), owner_ids=read_config("bot_management", "bot_owners"))
+                         owner_ids=set(self.config.bot_owners), **self.memory_profile.client_options(), **options)
 
+        self.metrics = metrics.MetricsRegistry()
         try:
             # attempt to set up the database connection pool, quit out if cannot.
-            self.db = self.loop.run_until_complete(create_pool())
+            with self.startup_report.timed("database pool"):
+                pool = self.loop.run_until_complete(create_pool())
+            slow_query_ms = self.config.section('database').get('slow_query_ms', 250)
+            self.db = db.InstrumentedPool(pool, db.QueryLog(self.console_output_log, slow_query_ms / 1000,
+                                                            histogram=self.metrics.db_latency))
         except Exception as e:
             print("Unable to connect to the postgresql database, please check your configuration!")
             self.error_log.exception("".join(format_exception(type(e), e, e.__traceback__)))
@@ -104,28 +114,123 @@ class Terrygon(commands.AutoShardedBot):
         self.console_output_log.info("Discord logger has been configured")
         self.scheduler = scheduler.Scheduler(self)
         self.console_output_log.info("Scheduler has started.")
+        self.guild_config = GuildConfigCache(self)
+        self.staff = StaffResolver(self)
+        self.trusted = TrustedIndex(self)
+        self.filters = FilterIndex(self)
+        self.message_contexts = MessageContexts(self)
+        self.user_resolver = UserResolver(self)
+        self.metrics_server = None
+        offload_config = self.config.section('offload')
+        self.offload = offload.Offloader(self, offload_config.get('workers', 4), offload_config.get('timeout', 10.0))
+        watchdog_config = self.config.section('watchdog')
+        self.watchdog = None
+        if watchdog_config.get('enabled', True):
+            self.watchdog = watchdog.LoopWatchdog(self, watchdog_config.get('threshold_ms', 250) / 1000)
+        # caches filled concurrently at startup, name: coroutine function
+        self.cache_warmups = {
+            'guild config': self.guild_config.load,
+            'trusted users': self.trusted.load,
+            'word filter': self.filters.load
+        }
+        self.config_manager.add_listener(self.on_config_reload)
         self.exit_code = 0
+        # set by launcher.py when running as one of several clusters
+        self.cluster = None
+        self._init_finished = time.perf_counter()
+
+    @property
+    def config(self) -> ConfigSnapshot:
+        """The current config snapshot, never touches the disk"""
+        return self.config_manager.snapshot
+
+    def on_config_reload(self, old: ConfigSnapshot, new: ConfigSnapshot):
+        """Applies a new config snapshot to the running bot"""
+        self.owner_ids = set(new.bot_owners)
+        for module in set(old.modules) - set(new.modules):
+            try:
+                self.unload_extension("modules." + module)
+                self.console_output_log.info(f"{module} module unloaded by config reload")
+            except commands.ExtensionNotLoaded:
+                pass
+
+        for module in startup.dependency_order(new.modules):
+            if "modules." + module in self.extensions:
+                continue
+            try:
+                self.load_extension("modules." + module)
+                self.console_output_log.info(f"{module} module loaded by config reload")
+            except Exception as e:
+                err_msg = f"Failed to load the module {module}:\n{''.join(format_exception(type(e), e, e.__traceback__))}"
+                self.error_log.exception(err_msg)
+
+        if old.activity != new.activity:
+            self.loop.create_task(self.change_presence(activity=discord.Game(new.activity)))
+        self.console_output_log.info("Config reloaded")
+
+    async def watch_config(self, interval: float = 5.0):
+        """Polls config.toml's modification time and reloads it when it changes"""
+        while not self.is_closed():
+            await asyncio.sleep(interval)
+            try:
+                self.config_manager.reload_if_changed()
+            except Exception as e:
+                self.error_log.exception(
+                    "Unable to reload config.toml, keeping the current config:\n{}".format(
+                        "".join(format_exception(type(e), e, e.__traceback__))))
 
     async def prepare_db(self):
-        """Prepare our database for use"""
+        """Prepare our database for use by applying any pending migrations"""
         async with self.db.acquire() as conn:
             try:
-                with open("data/schema.sql", 'r') as schema:
-                    try:
-                        await conn.execute(schema.read())
-                    except asyncpg.PostgresError as e:
-                        err = "A SQL error has occurred while running the schema, traceback is:\n{}".format("".join(
-                            format_exception(type(e), e, e.__traceback__)))
-                        self.error_log.exception(err)
-                        sys.exit(-1)
-
-            except FileNotFoundError as e:
-                self.error_log.exception("Unable to find schema.sql file traceback: {}\n").format(
-                    "".join(format_exception(type(e), e, e.__traceback__)))
+                applied = await migrations.migrate(conn)
+            except asyncpg.PostgresError as e:
+                err = "A SQL error has occurred while migrating the database, traceback is:\n{}".format("".join(
+                    format_exception(type(e), e, e.__traceback__)))
+                self.error_log.exception(err)
+                sys.exit(-1)
+
+            except (OSError, ValueError) as e:
+                self.error_log.exception("Unable to read the migrations in {}, traceback: {}\n".format(
+                    migrations.MIGRATIONS_PATH, "".join(format_exception(type(e), e, e.__traceback__))))
                 sys.exit(-1)
 
+        for migration in applied:
+            self.console_output_log.info(f"Applied migration {migration.version:04d} {migration.name}")
+
+    def dispatch(self, event_name, *args, **kwargs):
+        # every on_message listener and prefix resolution share one context per message
+        if event_name == 'message' and args[0].guild is not None:
+            self.message_contexts.create(args[0])
+        super().dispatch(event_name, *args, **kwargs)
+
+    async def _run_event(self, coro, event_name, *args, **kwargs):
+        # times every listener, errors are counted in on_error as the base class handles them
+        start = time.perf_counter()
+        try:
+            await super()._run_event(coro, event_name, *args, **kwargs)
+        finally:
+            self.metrics.listener_latency.observe(event_name, coro.__qualname__, value=time.perf_counter() - start)
+
+    async def on_error(self, event_method, *args, **kwargs):
+        self.metrics.listener_errors.inc(event_method)
+        await super().on_error(event_method, *args, **kwargs)
+
+    async def on_command(self, ctx: commands.Context):
+        ctx.started_at = time.perf_counter()
+
+    async def on_command_completion(self, ctx: commands.Context):
+        self.metrics.command_latency.observe(ctx.command.qualified_name, "ok",
+                                             value=time.perf_counter() - ctx.started_at)
+
     async def on_command_error(self, ctx, error):
         """Function to handle all command errors, event is called on error"""
+        if ctx.command is not None:
+            original = getattr(error, 'original', error)
+            self.metrics.command_errors.inc(ctx.command.qualified_name, type(original).__name__)
+            if hasattr(ctx, 'started_at'):
+                self.metrics.command_latency.observe(ctx.command.qualified_name, "error",
+                                                     value=time.perf_counter() - ctx.started_at)
 
         # handles errors for commands that do not exist
         if isinstance(error, commands.errors.CommandNotFound):
@@ -187,8 +292,8 @@ class Terrygon(commands.AutoShardedBot):
                 self.error_log.error(f"COMMAND: {ctx.command.name}, DMs with a user.")
             tb_string = "".join(format_exception(type(error), error, error.__traceback__))
             self.error_log.exception(tb_string + '\n\n')
-            for error_channel_id in read_config("bot_management", 'bot_error_channels'):
-                err_channel = self.get_channel(int(error_channel_id))
+            for error_channel_id in self.config.bot_error_channels:
+                err_channel = self.get_channel(error_channel_id)
                 if err_channel:
                     err_emb = discord.Embed(title=log_msg, description="\n```" + tb_string + "\n```",
                                             color=discord.Color.red())
@@ -197,24 +302,83 @@ class Terrygon(commands.AutoShardedBot):
                     self.error_log.error("No error channel set!")
 
     async def on_ready(self):
-        """Code that runs when the bot is starting up"""
-        await self.prepare_db()
-        self.load_extension("jishaku")  # de-bugging cog
-        self.console_output_log.info("jsk has been loaded")
+        """Code that runs when the bot is ready, discord also fires this after reconnects"""
+        if not self._started:
+            self._started = True
+            await self.startup()
+        else:
+            self.console_output_log.info(f"Reconnected as {self.user}")
+        await self.change_presence(activity=discord.Game(self.config.activity))
+
+    async def on_guild_join(self, guild: discord.Guild):
+        memory.resize_message_cache(self, self.memory_profile.messages_per_guild)
+
+    async def on_guild_remove(self, guild: discord.Guild):
+        memory.resize_message_cache(self, self.memory_profile.messages_per_guild)
+
+    def load_module(self, module: str) -> bool:
+        """Loads a module, logging instead of raising on failure"""
+        try:
+            with self.startup_report.timed(f"module {module}"):
+                self.load_extension("modules." + module)
+            self.console_output_log.info(f"{module} module loaded")
+            return True
+        except Exception as e:
+            err_msg = f"Failed to load the module {module}:\n{''.join(format_exception(type(e), e, e.__traceback__))}"
+            self.error_log.exception(err_msg)
+            return False
+
+    async def startup(self):
+        """Runs once per process, prepares the database, caches and modules then logs how long each phase took"""
+        report = self.startup_report
+        if self.watchdog is not None:
+            self.watchdog.start()
+        report.record("login and gateway", time.perf_counter() - self._init_finished)
+        if self.cluster is not None:
+            with report.timed("cluster ipc"):
+                await self.cluster.connect()
+            self.console_output_log.info(f"Connected to the launcher as cluster {self.cluster.cluster_id}")
+        with report.timed("schema"):
+            await self.prepare_db()
         self.console_output_log.info("Schema configured")
-        modules = read_config("info", "modules")
-        if modules:
-            for module in modules:
-                try:
-                    self.load_extension("modules." + module)
-                    self.console_output_log.info(f"{module} module loaded")
-                except Exception as e:
-                    err_msg = f"Failed to load the module {module}:\n{''.join(format_exception(type(e), e, e.__traceback__))}"
-                    self.error_log.exception(err_msg)
+        memory.resize_message_cache(self, self.memory_profile.messages_per_guild)
+        self.console_output_log.info(f"Using the {self.memory_profile.name} memory profile")
+
+        await asyncio.gather(*(report.timed_coro(f"warmup {name}", warmup())
+                               for name, warmup in self.cache_warmups.items()))
+        self.console_output_log.info("Caches loaded")
+
+        with report.timed("module jishaku"):
+            self.load_extension("jishaku")  # de-bugging cog
+        self.console_output_log.info("jsk has been loaded")
+
+        try:
+            modules = startup.dependency_order(self.config.modules)
+        except ValueError as e:
+            self.error_log.error(f"{e}, loading modules in config order")
+            modules = self.config.modules
+
+        failed = set()
+        for module in modules:
+            missing = [d for d in startup.MODULE_DEPENDENCIES.get(module, ()) if d in failed]
+            if missing:
+                self.error_log.error(f"Not loading the module {module}, it depends on {', '.join(missing)} which failed")
+                failed.add(module)
+            elif not self.load_module(module):
+                failed.add(module)
 
         self.console_output_log.info(f"Client logged in as {self.user}")
         self.loop.create_task(self.scheduler.run_timed_jobs())
-        await self.change_presence(activity=discord.Game(read_config("info", "activity")))
+        self.loop.create_task(self.watch_config())
+        metrics_config = self.config.section('metrics')
+        if metrics_config.get('enabled', False):
+            # every cluster serves its own metrics on the next port up
+            port = metrics_config.get('port', 9100) + (self.cluster.cluster_id if self.cluster is not None else 0)
+            self.metrics_server = metrics.MetricsServer(self, self.metrics)
+            await self.metrics_server.start(metrics_config.get('host', "127.0.0.1"), port)
+            self.console_output_log.info(f"Serving metrics on port {port}")
+        report.finish()
+        self.console_output_log.info(report.format())
 
     def run(self, *args, **kwargs):
         """Runs the bot and exits using certain codes."""
@@ -223,23 +387,9 @@ class Terrygon(commands.AutoShardedBot):
 
     async def is_log_registered(self, guild: discord.Guild, log_type):
         """Checks to see if a log channel is registered for a given guild"""
-        if guild is None:
+        if guild is None or log_type not in ('mod_logs', 'member_logs', 'message_logs', 'filter_logs'):
             return False
-        async with self.db.acquire() as conn:
-            log_channel_types = await conn.fetchrow("SELECT column_name FROM information_schema.columns WHERE table_name = 'channels' AND column_name != 'guild_id';")
-            i = 0
-            for channel in log_channel_types:
-                if log_type == channel:
-                    break
-                i += 1
-
-            if i > len(log_channel_types):
-                return
-
-            if (await conn.fetchrow(f"SELECT {log_type} FROM channels WHERE guild_id = $1", guild.id)) is not None:
-                return True
-            else:
-                return False
+        return getattr(await self.guild_config.get(guild.id), log_type) is not None
 
 
 if __name__ == "__main__":
@@ -247,7 +397,7 @@ if __name__ == "__main__":
     """Runs the bot"""
     bot = Terrygon()
     try:
-        bot.run(read_config("credentials", "token"))
+        bot.run(bot.config.token)
     except Exception:
         print("Unable to login as a bot, please check your configuration for the bot token")
         sys.exit(-1)
@@ -0,0 +1,60 @@
+import time
+import pytest
+from utils.filter_engine import REGEX_BUDGET, FilterMatcher, FilterWord, UnsafePattern, check_pattern
+
+# each of these backtracked for seconds on a message of repeated letters
+BACKTRACKING_PATTERNS = ("a*a*a*b", ".*.*.*x", "a{0,100}a{0,100}a{0,100}b", r"\w*\w*\w*b")
+MESSAGES = ("a" * 500, "b" + "a" * 2000 + "c", "x" * 2000 + "y")
+
+
+@pytest.mark.parametrize("pattern", BACKTRACKING_PATTERNS)
+@pytest.mark.parametrize("content", MESSAGES)
+def test_backtracking_regex_is_rejected_or_stopped(pattern, content):
+    try:
+        check_pattern(pattern)
+    except UnsafePattern:
+        return
+
+    matcher = FilterMatcher([FilterWord(pattern, 'delete', is_regex=True)])
+    start = time.perf_counter()
+    matcher.find(content)
+    # generous slack for slow machines, without the timeout these took seconds
+    assert time.perf_counter() - start < REGEX_BUDGET + 0.1
+
+
+def test_budget_is_shared_between_patterns():
+    words = [FilterWord(".*.*.*" + c, 'delete', is_regex=True) for c in "bcdefghij"]
+    matcher = FilterMatcher(words)
+    start = time.perf_counter()
+    matcher.find("bcdefghij" + "a" * 3000)
+    assert time.perf_counter() - start < REGEX_BUDGET + 0.1
+    assert matcher.overruns == 1
+
+
+@pytest.mark.parametrize("pattern", (r"(a+)+b", r"(ab|cd)+", r"(a)\1", r"(?=a)b", "a{0,1000}"))
+def test_unsafe_patterns_are_rejected(pattern):
+    with pytest.raises(UnsafePattern):
+        check_pattern(pattern)
+
+
+def test_regex_still_matches():
+    matcher = FilterMatcher([FilterWord(r"fr[e3]+ n[i1]tro", 'warn', is_regex=True)])
+    matches = matcher.find("get FREE NITRO here")
+    assert [(m.start, m.end) for m in matches] == [(4, 14)]
+
+
+@pytest.mark.parametrize("content, spans", [
+    ("you are b  a .. d", [(8, 17)]),
+    ("a bad idea", [(2, 5)]),
+    ("a b a d", [(2, 7)]),
+    ("badge", [(0, 3)]),
+    ("a bd", [])
+])
+def test_words_are_found_spelled_out_or_not(content, spans):
+    matcher = FilterMatcher([FilterWord("bad", 'delete')])
+    assert sorted((m.start, m.end) for m in matcher.find(content)) == spans
+
+
+def test_one_letter_words_are_found_spelled_out():
+    matcher = FilterMatcher([FilterWord("x", 'notify'), FilterWord("zyzzyva", 'notify')])
+    assert [(m.start, m.end) for m in matcher.find("so x then")] == [(3, 4)]
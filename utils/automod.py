@@ -0,0 +1,150 @@
+"""Sliding window spam detection, kept free of discord like the filter engine.
+
+Every user being tracked has a small ring buffer per check, each message is an O(1) update:
+
+- flood: timestamps of the user's last flood_messages messages, a flood is when the oldest
+  of them is still inside the window.
+- mentions: (timestamp, mentions) of recent messages that mentioned anyone and their running total.
+- duplicates: (timestamp, content hash) of recent messages and how often each hash is in the window.
+
+Users are kept in least recently seen order and dropped once they have been quiet for longer than
+the longest window, so memory follows how many people are talking rather than how many ever did.
+"""
+import collections
+import re
+import typing
+
+CHECKS = ('flood', 'mentions', 'duplicates')
+# longest window a check can be given, also how long a quiet user is remembered
+MAX_WINDOW = 600
+# duplicate hashes remembered per user, also the highest duplicate_limit that can be set
+MAX_HASHES = 50
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+class AutomodLimits(typing.NamedTuple):
+    """A guild's thresholds, each check trips at count or more within seconds"""
+    flood_messages: int = 6
+    flood_seconds: int = 5
+    mention_limit: int = 10
+    mention_seconds: int = 15
+    duplicate_limit: int = 4
+    duplicate_seconds: int = 30
+
+    @classmethod
+    def from_config(cls, config) -> 'AutomodLimits':
+        """Reads the limits from a GuildConfig, unset columns keep their default"""
+        defaults = cls()
+        return cls(*(getattr(config, field) or default for field, default in zip(cls._fields, defaults)))
+
+    def for_check(self, check: str) -> typing.Tuple[int, int]:
+        """(count, seconds) of a check"""
+        return {
+            'flood': (self.flood_messages, self.flood_seconds),
+            'mentions': (self.mention_limit, self.mention_seconds),
+            'duplicates': (self.duplicate_limit, self.duplicate_seconds)
+        }[check]
+
+
+class Violation(typing.NamedTuple):
+    check: str
+    count: int
+    seconds: int
+
+
+def content_hash(content: str) -> typing.Optional[int]:
+    """Hash of a message ignoring case and whitespace, None for messages without text"""
+    content = _SPACE_RE.sub(" ", content).strip().lower()
+    return hash(content) if content else None
+
+
+class UserActivity:
+    __slots__ = ('limits', 'last_seen', 'messages', 'mentions', 'mention_total', 'hashes', 'hash_counts')
+
+    def __init__(self, limits: AutomodLimits):
+        self.limits = limits
+        self.last_seen = 0.0
+        self.messages: typing.Deque[float] = collections.deque(maxlen=limits.flood_messages)
+        self.mentions: typing.Deque[typing.Tuple[float, int]] = collections.deque()
+        self.mention_total = 0
+        self.hashes: typing.Deque[typing.Tuple[float, int]] = collections.deque()
+        self.hash_counts: typing.Counter[int] = collections.Counter()
+
+    def _expire(self, now: float):
+        limits = self.limits
+        while self.mentions and now - self.mentions[0][0] > limits.mention_seconds:
+            self.mention_total -= self.mentions.popleft()[1]
+        while self.hashes and (now - self.hashes[0][0] > limits.duplicate_seconds or len(self.hashes) > MAX_HASHES):
+            self._drop_hash()
+
+    def _drop_hash(self):
+        _, digest = self.hashes.popleft()
+        self.hash_counts[digest] -= 1
+        if not self.hash_counts[digest]:
+            del self.hash_counts[digest]
+
+    def record(self, now: float, mentions: int, digest: typing.Optional[int]) -> typing.Optional[Violation]:
+        """Adds a message and returns the first check it trips, that check's buffer is emptied so the
+        same burst is not reported again"""
+        limits = self.limits
+        self.last_seen = now
+        self._expire(now)
+
+        if digest is not None:
+            self.hashes.append((now, digest))
+            self.hash_counts[digest] += 1
+            if self.hash_counts[digest] >= limits.duplicate_limit:
+                self.hashes.clear()
+                self.hash_counts.clear()
+                return Violation('duplicates', limits.duplicate_limit, limits.duplicate_seconds)
+
+        if mentions:
+            self.mentions.append((now, mentions))
+            self.mention_total += mentions
+            if self.mention_total >= limits.mention_limit:
+                self.mentions.clear()
+                self.mention_total = 0
+                return Violation('mentions', limits.mention_limit, limits.mention_seconds)
+
+        self.messages.append(now)
+        if len(self.messages) == self.messages.maxlen and now - self.messages[0] <= limits.flood_seconds:
+            self.messages.clear()
+            return Violation('flood', limits.flood_messages, limits.flood_seconds)
+
+        return None
+
+
+class AutomodEngine:
+    """Tracks recent activity of every user talking in a guild with automod on"""
+
+    def __init__(self, idle_after: float = MAX_WINDOW):
+        self.idle_after = idle_after
+        self._users: typing.OrderedDict[typing.Tuple[int, int], UserActivity] = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._users)
+
+    def check(self, guild_id: int, user_id: int, limits: AutomodLimits, now: float, mentions: int,
+              content: str) -> typing.Optional[Violation]:
+        """Records a message, returns the violation it caused if any"""
+        self.evict(now)
+        key = (guild_id, user_id)
+        activity = self._users.get(key)
+        if activity is None or activity.limits != limits:
+            # limits changed since the user was last seen, their buffers are sized for the old ones
+            activity = self._users[key] = UserActivity(limits)
+        self._users.move_to_end(key)
+        return activity.record(now, mentions, content_hash(content))
+
+    def evict(self, now: float):
+        """Forgets users quiet for longer than idle_after, they are at the front as users move to the back when seen"""
+        while self._users:
+            key, activity = next(iter(self._users.items()))
+            if now - activity.last_seen <= self.idle_after:
+                break
+            del self._users[key]
+
+    def forget_guild(self, guild_id: int):
+        for key in [key for key in self._users if key[0] == guild_id]:
+            del self._users[key]
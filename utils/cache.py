@@ -0,0 +1,387 @@
+import asyncio
+import typing
+from utils import metrics
+from utils.filter_engine import FilterMatch, FilterMatcher, FilterWord
+from utils.warns import PunishmentLadder
+
+# columns cached for each guild config table, guild_id is the key of every table
+GUILD_CONFIG_TABLES = {
+    'guild_settings': ('approval_system', 'enable_join_leave_logs', 'enable_core_message_logs', 'warn_punishments',
+                       'staff_filter', 'auto_probate', 'warn_automute_time', 'prefixes'),
+    'roles': ('mod_role', 'admin_role', 'owner_role', 'approved_role', 'muted_role', 'probation_role'),
+    'channels': ('mod_logs', 'member_logs', 'message_logs', 'filter_logs', 'probation_channel', 'approval_channel'),
+    'automod_settings': ('automod_enabled', 'flood_messages', 'flood_seconds', 'mention_limit', 'mention_seconds',
+                         'duplicate_limit', 'duplicate_seconds', 'automod_punishment')
+}
+
+COLUMN_TABLES = {column: table for table, columns in GUILD_CONFIG_TABLES.items() for column in columns}
+
+
+class GuildConfig:
+    """A guild's row from guild_settings, roles and channels"""
+    __slots__ = ('guild_id',) + tuple(COLUMN_TABLES)
+
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+        for column in COLUMN_TABLES:
+            setattr(self, column, None)
+        self.prefixes = ()
+        self.warn_punishments = PunishmentLadder()
+
+    def _apply(self, column: str, value):
+        if column == 'prefixes':
+            value = tuple(value or ())
+        elif column == 'warn_punishments' and not isinstance(value, PunishmentLadder):
+            value = PunishmentLadder(value)
+        setattr(self, column, value)
+
+    def __repr__(self):
+        return f"<GuildConfig guild_id={self.guild_id}>"
+
+
+class GuildConfigCache:
+    """Write through cache of every guild's configuration"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._configs: typing.Dict[int, GuildConfig] = {}
+        # refreshes in flight, concurrent misses for a guild wait on the same one
+        self._pending: typing.Dict[int, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def _load_table(self, table: str, columns: typing.Tuple[str, ...]):
+        async with self.bot.db.acquire() as conn:
+            return await conn.fetch(f"SELECT guild_id, {', '.join(columns)} FROM {table}")
+
+    async def load(self):
+        """Loads every guild's config, one query per table with the tables fetched concurrently"""
+        tables = list(GUILD_CONFIG_TABLES.items())
+        results = await asyncio.gather(*(self._load_table(table, columns) for table, columns in tables))
+        configs = {}
+        for (table, columns), records in zip(tables, results):
+            for record in records:
+                config = configs.get(record['guild_id'])
+                if config is None:
+                    config = configs[record['guild_id']] = GuildConfig(record['guild_id'])
+                for column in columns:
+                    config._apply(column, record[column])
+
+        self._configs = configs
+
+    async def refresh(self, guild_id: int) -> GuildConfig:
+        """Reloads a single guild's config from the database"""
+        config = GuildConfig(guild_id)
+        async with self.bot.db.acquire() as conn:
+            for table, columns in GUILD_CONFIG_TABLES.items():
+                record = await conn.fetchrow(f"SELECT {', '.join(columns)} FROM {table} WHERE guild_id = $1", guild_id)
+                if record is None:
+                    continue
+                for column in columns:
+                    config._apply(column, record[column])
+
+        self._configs[guild_id] = config
+        return config
+
+    async def get(self, guild_id: int) -> GuildConfig:
+        """Gets a guild's config, only queries the database if the guild has not been cached yet"""
+        config = self._configs.get(guild_id)
+        if config is not None:
+            self.hits += 1
+            return config
+
+        self.misses += 1
+        pending = self._pending.get(guild_id)
+        if pending is None:
+            pending = self._pending[guild_id] = asyncio.ensure_future(self.refresh(guild_id))
+            pending.add_done_callback(lambda _: self._pending.pop(guild_id, None))
+        return await asyncio.shield(pending)
+
+    @staticmethod
+    async def _write_row(conn, table: str, guild_id: int, columns: typing.Dict[str, typing.Any]) -> bool:
+        """Updates a guild's row, inserting it if it is missing as not every table has a unique guild_id to upsert on.
+        Returns True if the row was inserted"""
+        assignments = ", ".join(f"{column} = ${i}" for i, column in enumerate(columns, 2))
+        update = f"UPDATE {table} SET {assignments} WHERE guild_id = $1"
+        if await conn.execute(update, guild_id, *columns.values()) != "UPDATE 0":
+            return False
+
+        placeholders = ", ".join(f"${i}" for i in range(2, len(columns) + 2))
+        insert = f"INSERT INTO {table} (guild_id, {', '.join(columns)}) VALUES ($1, {placeholders}) ON CONFLICT DO NOTHING"
+        if await conn.execute(insert, guild_id, *columns.values()) == "INSERT 0 0":
+            # another write created the row first
+            await conn.execute(update, guild_id, *columns.values())
+            return False
+        return True
+
+    async def set(self, guild_id: int, **values):
+        """Writes config values to the database then updates the cache, values are given as column=value"""
+        tables = {}
+        for column, value in values.items():
+            if column not in COLUMN_TABLES:
+                raise KeyError(f"{column} is not a guild config column")
+            tables.setdefault(COLUMN_TABLES[column], {})[column] = value
+
+        inserted = False
+        async with self.bot.db.acquire() as conn:
+            async with conn.transaction():
+                for table, columns in tables.items():
+                    inserted |= await self._write_row(conn, table, guild_id, columns)
+
+        if inserted:
+            # the new row's other columns took their defaults, which the cached config does not have
+            self.invalidate(guild_id)
+
+        config = await self.get(guild_id)
+        for column, value in values.items():
+            config._apply(column, value)
+
+    def invalidate(self, guild_id: int = None):
+        """Drops a guild, or every guild, from the cache so it is reloaded on next use"""
+        if guild_id is None:
+            self._configs.clear()
+        else:
+            self._configs.pop(guild_id, None)
+
+    def stats(self) -> dict:
+        """Returns the cache's hit and miss counters"""
+        total = self.hits + self.misses
+        return {
+            'guilds': len(self._configs),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+
+STAFF_LEVELS = ('mod', 'admin', 'owner')
+
+
+class StaffTiers(typing.NamedTuple):
+    """Role ids that count as at least each staff level"""
+    mod: typing.FrozenSet[int]
+    admin: typing.FrozenSet[int]
+    owner: typing.FrozenSet[int]
+
+
+class StaffResolver:
+    """Answers staff level checks from memory, built from the guild config cache's staff roles"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._tiers: typing.Dict[int, StaffTiers] = {}
+
+    async def tiers(self, guild_id: int) -> StaffTiers:
+        tiers = self._tiers.get(guild_id)
+        if tiers is None:
+            config = await self.bot.guild_config.get(guild_id)
+            owner = frozenset(r for r in (config.owner_role,) if r is not None)
+            admin = owner | frozenset(r for r in (config.admin_role,) if r is not None)
+            mod = admin | frozenset(r for r in (config.mod_role,) if r is not None)
+            tiers = self._tiers[guild_id] = StaffTiers(mod, admin, owner)
+        return tiers
+
+    async def is_staff(self, member, min_staff_role: str) -> bool:
+        """Checks if a member has a staff role of at least the given level (Mod, Admin or Owner)"""
+        roles = getattr(member, 'roles', None)
+        if not roles:
+            return False
+        tier = getattr(await self.tiers(member.guild.id), min_staff_role.lower())
+        return not tier.isdisjoint(role.id for role in roles)
+
+    def invalidate(self, guild_id: int = None):
+        """Drops a guild's, or every guild's, tiers so they are rebuilt from the guild config on next use"""
+        if guild_id is None:
+            self._tiers.clear()
+        else:
+            self._tiers.pop(guild_id, None)
+
+
+class TrustedIndex:
+    """Every guild's trusted user ids, written through to the trusted_members table"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._trusted: typing.Dict[int, typing.Set[int]] = {}
+
+    async def load(self):
+        """Loads every trusted user in one query"""
+        trusted = {}
+        for record in await self.bot.db.fetch("SELECT guild_id, user_id FROM trusted_members"):
+            trusted.setdefault(record['guild_id'], set()).add(record['user_id'])
+        self._trusted = trusted
+
+    def is_trusted(self, guild_id: int, user_id: int) -> bool:
+        trusted = self._trusted.get(guild_id)
+        return trusted is not None and user_id in trusted
+
+    def members(self, guild_id: int) -> typing.FrozenSet[int]:
+        """A guild's trusted user ids"""
+        return frozenset(self._trusted.get(guild_id, ()))
+
+    async def add(self, guild_id: int, user_id: int) -> bool:
+        """Trusts a user, returns False if they already were"""
+        if self.is_trusted(guild_id, user_id):
+            return False
+        await self.bot.db.execute("INSERT INTO trusted_members (guild_id, user_id) VALUES ($1, $2) "
+                                  "ON CONFLICT DO NOTHING", guild_id, user_id)
+        self._trusted.setdefault(guild_id, set()).add(user_id)
+        return True
+
+    async def remove(self, guild_id: int, user_id: int) -> bool:
+        """Untrusts a user, returns False if they were not trusted"""
+        if not self.is_trusted(guild_id, user_id):
+            return False
+        await self.bot.db.execute("DELETE FROM trusted_members WHERE guild_id = $1 AND user_id = $2", guild_id, user_id)
+        self._trusted[guild_id].discard(user_id)
+        return True
+
+    def invalidate(self, guild_id: int):
+        """Forgets a guild whose data was removed from the database"""
+        self._trusted.pop(guild_id, None)
+
+
+class FilterState:
+    """What the word filter needs to check a guild's messages"""
+    __slots__ = ('guild_id', 'words', 'whitelist', 'matcher')
+
+    def __init__(self, guild_id: int, words: typing.Dict[str, FilterWord] = None, whitelist: typing.Set[int] = None):
+        self.guild_id = guild_id
+        self.words = words or {}
+        self.whitelist = whitelist or set()
+        self.matcher = FilterMatcher(self.words.values())
+
+    def rebuild(self):
+        """Recompiles the matcher after the word list changed"""
+        self.matcher = FilterMatcher(self.words.values())
+
+    def scan(self, channel_id: int, content: str) -> typing.List[FilterMatch]:
+        """The filtered words in a message sent to a channel, empty if the channel is whitelisted"""
+        if not self.words or channel_id in self.whitelist:
+            return []
+        return self.matcher.find(content)
+
+    def __repr__(self):
+        return f"<FilterState guild_id={self.guild_id} words={len(self.words)} whitelist={len(self.whitelist)}>"
+
+
+class FilterIndex:
+    """Every guild's filtered words and whitelisted channels, written through to the database.
+    Whether staff bypass the filter is guild_settings.staff_filter, held by the guild config cache"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._states: typing.Dict[int, FilterState] = {}
+        bot.metrics.add(metrics.Gauge("terrygon_filter_regex_overruns",
+                                      "Messages that ran out of regex time since each guild's filter last changed",
+                                      callback=self.regex_overruns))
+
+    def regex_overruns(self) -> typing.Dict[tuple, int]:
+        return {(): sum(state.matcher.overruns for state in self._states.values())}
+
+    async def _fetch(self, query: str, *args):
+        async with self.bot.db.acquire() as conn:
+            return await conn.fetch(query, *args)
+
+    async def load(self):
+        """Loads every guild's filter, both tables are fetched concurrently"""
+        words, channels = await asyncio.gather(
+            self._fetch("SELECT guild_id, word, punishment, fuzzy_threshold, is_regex FROM filtered_words"),
+            self._fetch("SELECT guild_id, channel_id FROM whitelisted_channels")
+        )
+        guild_words = {}
+        for record in words:
+            guild_words.setdefault(record['guild_id'], {})[record['word']] = FilterWord(
+                record['word'], record['punishment'], record['fuzzy_threshold'], record['is_regex'])
+        whitelists = {}
+        for record in channels:
+            whitelists.setdefault(record['guild_id'], set()).add(record['channel_id'])
+
+        self._states = {guild_id: FilterState(guild_id, guild_words.get(guild_id), whitelists.get(guild_id))
+                        for guild_id in guild_words.keys() | whitelists.keys()}
+
+    async def refresh(self, guild_id: int) -> FilterState:
+        """Reloads a single guild's filter from the database"""
+        async with self.bot.db.acquire() as conn:
+            words = await conn.fetch("SELECT word, punishment, fuzzy_threshold, is_regex FROM filtered_words "
+                                     "WHERE guild_id = $1", guild_id)
+            channels = await conn.fetch("SELECT channel_id FROM whitelisted_channels WHERE guild_id = $1", guild_id)
+
+        state = self._states[guild_id] = FilterState(guild_id, {r['word']: FilterWord(*r) for r in words},
+                                                     {r['channel_id'] for r in channels})
+        return state
+
+    def get(self, guild_id: int) -> FilterState:
+        """A guild's filter, a guild that has never been loaded has an empty one"""
+        state = self._states.get(guild_id)
+        if state is None:
+            state = self._states[guild_id] = FilterState(guild_id)
+        return state
+
+    async def add_word(self, guild_id: int, word: str, punishment: str, is_regex: bool = False) -> bool:
+        """Adds a word, or a regex already checked with check_pattern, to the filter, returns False if it already was"""
+        state = self.get(guild_id)
+        if word in state.words:
+            return False
+        await self.bot.db.execute("INSERT INTO filtered_words (word, guild_id, punishment, is_regex) "
+                                  "VALUES ($1, $2, $3, $4)", word, guild_id, punishment, is_regex)
+        state.words[word] = FilterWord(word, punishment, is_regex=is_regex)
+        state.rebuild()
+        return True
+
+    async def update_word(self, guild_id: int, word: str, punishment: str) -> bool:
+        """Changes a filtered word's punishment, returns False if the word is not filtered"""
+        state = self.get(guild_id)
+        if word not in state.words:
+            return False
+        await self.bot.db.execute("UPDATE filtered_words SET punishment = $1 WHERE word = $2 AND guild_id = $3",
+                                  punishment, word, guild_id)
+        state.words[word] = state.words[word]._replace(punishment=punishment)
+        state.rebuild()
+        return True
+
+    async def set_threshold(self, guild_id: int, word: str, threshold: typing.Optional[int]) -> bool:
+        """Sets how close a spelled out run of letters must be to a word to count, None turns fuzzy matching off.
+        Returns False if the word is not filtered"""
+        state = self.get(guild_id)
+        if word not in state.words:
+            return False
+        await self.bot.db.execute("UPDATE filtered_words SET fuzzy_threshold = $1 WHERE word = $2 AND guild_id = $3",
+                                  threshold, word, guild_id)
+        state.words[word] = state.words[word]._replace(fuzzy_threshold=threshold)
+        state.rebuild()
+        return True
+
+    async def remove_word(self, guild_id: int, word: str) -> bool:
+        """Removes a word from the filter, returns False if it was not filtered"""
+        state = self.get(guild_id)
+        if word not in state.words:
+            return False
+        await self.bot.db.execute("DELETE FROM filtered_words WHERE word = $1 AND guild_id = $2", word, guild_id)
+        del state.words[word]
+        state.rebuild()
+        return True
+
+    async def add_channel(self, guild_id: int, channel_id: int) -> bool:
+        """Whitelists a channel, returns False if it already was"""
+        state = self.get(guild_id)
+        if channel_id in state.whitelist:
+            return False
+        await self.bot.db.execute("INSERT INTO whitelisted_channels (channel_id, guild_id) VALUES ($1, $2)",
+                                  channel_id, guild_id)
+        state.whitelist.add(channel_id)
+        return True
+
+    async def remove_channel(self, guild_id: int, channel_id: int) -> bool:
+        """Removes a channel from the whitelist, returns False if it was not whitelisted"""
+        state = self.get(guild_id)
+        if channel_id not in state.whitelist:
+            return False
+        await self.bot.db.execute("DELETE FROM whitelisted_channels WHERE channel_id = $1 AND guild_id = $2",
+                                  channel_id, guild_id)
+        state.whitelist.discard(channel_id)
+        return True
+
+    def invalidate(self, guild_id: int):
+        """Forgets a guild whose data was removed from the database"""
+        self._states.pop(guild_id, None)
@@ -25,24 +25,7 @@ def is_staff_or_perms(min_staff_role: str, **perms):
         permissions = ctx.author.guild_permissions
         missing = [perm for perm, value in perms.items() if getattr(permissions, perm, None) != value]
 
-        # check for staff
-        check_roles = ['mod', 'admin', 'owner']
-        for role in check_roles.copy():
-            if check_roles.index(role) < check_roles.index(min_staff_role.lower()):
-                check_roles.remove(role)
-
-        staff_roles = list(
-            await ctx.bot.db.fetchrow("SELECT mod_role, admin_role, owner_role FROM roles WHERE guild_id = $1",
-                                      ctx.guild.id))
-
-        while len(check_roles) != len(staff_roles):
-            try:
-                del staff_roles[0]
-            except IndexError as e:
-                raise commands.CommandInvokeError(e)
-
-        user_roles = [role.id for role in ctx.message.author.roles]
-        if any(role in user_roles for role in staff_roles) or not missing or permissions.administrator:
+        if not missing or permissions.administrator or await ctx.bot.staff.is_staff(ctx.author, min_staff_role):
             return True
         else:
             raise errors.MissingStaffRoleOrPerms(min_staff_role, missing)
@@ -51,7 +34,8 @@ def is_staff_or_perms(min_staff_role: str, **perms):
 
 
 # TODO: look into running checks as non decorators. If not possible, merge this and the deco together under one function.
-async def nondeco_is_staff_or_perms(target, db, min_staff_role, **perms) -> bool:
+async def nondeco_is_staff_or_perms(target: typing.Union[commands.Context, discord.Message], bot, min_staff_role: str,
+                                    **perms) -> bool:
     if not target or not target.guild:
         return False
 
@@ -67,32 +51,8 @@ async def nondeco_is_staff_or_perms(target, db, min_staff_role, **perms) -> bool
     else:
         missing = ['no perms given']
         permissions = discord.Permissions(administrator=False)
-    # check for staff
-    check_roles = ['mod', 'admin', 'owner']
-    for role in check_roles.copy():
-        if check_roles.index(role) < check_roles.index(min_staff_role.lower()):
-            check_roles.remove(role)
-    res = await db.fetchrow("SELECT mod_role, admin_role, owner_role FROM roles WHERE guild_id = $1", target.guild.id)
-    if not res:
-        return False
-    staff_roles = list(res)
-
-    while len(check_roles) != len(staff_roles):
-        try:
-            del staff_roles[0]
-        except IndexError as e:
-            raise commands.CommandInvokeError(e)
-
-    if isinstance(target, commands.Context):
-        user_roles = [role.id for role in target.message.author.roles]
-    elif isinstance(target, discord.Message):
-        user_roles = [role.id for role in target.author.roles]
-    else:
-        raise commands.BadArgument(message="Bad argument passed")
-    if any(role in user_roles for role in staff_roles) or not missing or permissions.administrator:
-        return True
-    else:
-        return False
+
+    return not missing or permissions.administrator or await bot.staff.is_staff(target.author, min_staff_role)
 
 
 def is_trusted_or_perms(**perms):
@@ -100,16 +60,13 @@ def is_trusted_or_perms(**perms):
         if not ctx.guild:
             return False
 
-        if await nondeco_is_staff_or_perms(ctx, ctx.bot.db, 'Mod', **perms):
+        if await nondeco_is_staff_or_perms(ctx, ctx.bot, 'Mod', **perms):
             return True
 
-        async with ctx.bot.db.acquire() as conn:
-            trusted_users = await conn.fetchval("SELECT trusted_uid FROM trusted_users WHERE guild_id = $1",
-                                                ctx.guild.id)
-            if trusted_users and ctx.author.id in trusted_users:
-                return True
-            else:
-                raise errors.UntrustedError()
+        if ctx.bot.trusted.is_trusted(ctx.guild.id, ctx.author.id):
+            return True
+        else:
+            raise errors.UntrustedError()
 
     return commands.check(wrapper)
 
@@ -130,13 +87,6 @@ async def mod_bot_protection(bot, ctx: commands.Context,
     # check if valid user
     if isinstance(target, discord.User):
         return None
-    owner_role = ctx.guild.get_role(
-        (await bot.db.fetchval("SELECT owner_role FROM roles WHERE guild_id = $1", ctx.guild.id)))
-    admin_role = ctx.guild.get_role(
-        (await bot.db.fetchval("SELECT admin_role FROM roles WHERE guild_id = $1", ctx.guild.id)))
-    mod_role = ctx.guild.get_role(
-        (await bot.db.fetchval("SELECT mod_role FROM roles WHERE guild_id = $1", ctx.guild.id)))
-    staff_roles = (admin_role, mod_role)
 
     if target == ctx.author:
         return f"You cannot {action} yourself"
@@ -144,10 +94,10 @@ async def mod_bot_protection(bot, ctx: commands.Context,
     elif target == ctx.bot.user:
         return f"You cannot {action} me"
 
-    elif owner_role in target.roles or target == target.guild.owner:
+    elif target == target.guild.owner or await bot.staff.is_staff(target, 'Owner'):
         return f"You cannot {action} an owner"
 
-    elif any(role in staff_roles for role in target.roles) and owner_role not in ctx.author.roles:
+    elif await bot.staff.is_staff(target, 'Mod') and not await bot.staff.is_staff(ctx.author, 'Owner'):
         return f"Cannot {action} a staff member unless you are an owner!"
 
     else:
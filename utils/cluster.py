@@ -0,0 +1,192 @@
+import asyncio
+import itertools
+import json
+import os
+import typing
+from traceback import format_exception
+
+# clusters talk to the launcher over newline delimited json on a local socket.
+# a worker sends a request, the launcher forwards it to every cluster as a command
+# and replies with each cluster's response keyed by cluster id.
+IPC_HOST = "127.0.0.1"
+
+
+async def _send(writer: asyncio.StreamWriter, message: dict):
+    writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+
+
+async def _receive(reader: asyncio.StreamReader) -> typing.Optional[dict]:
+    line = await reader.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def split_shards(shard_count: int, clusters: int) -> typing.List[typing.List[int]]:
+    """Splits shard ids into contiguous ranges, one per cluster"""
+    clusters = max(1, min(clusters, shard_count))
+    return [list(range(i * shard_count // clusters, (i + 1) * shard_count // clusters)) for i in range(clusters)]
+
+
+class ClusterHub:
+    """Runs in the launcher, forwards requests from one cluster to all of them"""
+
+    def __init__(self, secret: str, log, timeout: float = 10.0):
+        self.secret = secret
+        self.log = log
+        self.timeout = timeout
+        self._clusters: typing.Dict[int, asyncio.StreamWriter] = {}
+        # hub request id: (clusters expected to respond, responses so far, set once all have responded)
+        self._pending: typing.Dict[int, typing.Tuple[typing.Set[int], dict, asyncio.Event]] = {}
+        self._ids = itertools.count()
+
+    async def start(self, port: int) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self._handle, IPC_HOST, port)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        identify = await _receive(reader)
+        if identify is None or identify.get('op') != 'identify' or identify.get('secret') != self.secret:
+            writer.close()
+            return
+
+        cluster_id = identify['cluster']
+        self._clusters[cluster_id] = writer
+        self.log.info(f"Cluster {cluster_id} connected to IPC")
+        try:
+            while True:
+                message = await _receive(reader)
+                if message is None:
+                    break
+                if message['op'] == 'request':
+                    asyncio.ensure_future(self._broadcast(writer, message))
+                elif message['op'] == 'response' and message['id'] in self._pending:
+                    expected, results, done = self._pending[message['id']]
+                    results[cluster_id] = message['result']
+                    if expected <= set(results):
+                        done.set()
+        except (ConnectionError, json.JSONDecodeError):
+            pass
+        finally:
+            if self._clusters.get(cluster_id) is writer:
+                del self._clusters[cluster_id]
+            writer.close()
+            self.log.info(f"Cluster {cluster_id} disconnected from IPC")
+
+    async def _broadcast(self, requester: asyncio.StreamWriter, request: dict):
+        hub_id = next(self._ids)
+        clusters = dict(self._clusters)
+        results = {}
+        done = asyncio.Event()
+        self._pending[hub_id] = (set(clusters), results, done)
+        command = {'op': 'command', 'id': hub_id, 'command': request['command'], 'args': request.get('args', {})}
+        for writer in clusters.values():
+            try:
+                await _send(writer, command)
+            except ConnectionError:
+                pass
+
+        try:
+            await asyncio.wait_for(done.wait(), self.timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            del self._pending[hub_id]
+
+        for cluster_id in clusters:
+            results.setdefault(cluster_id, {'error': "No response"})
+        try:
+            await _send(requester, {'op': 'reply', 'id': request['id'], 'results': results})
+        except ConnectionError:
+            pass
+
+
+class ClusterClient:
+    """A cluster's connection to the launcher, runs owner commands for other clusters and sends its own"""
+
+    def __init__(self, bot, cluster_id: int, port: int, secret: str):
+        self.bot = bot
+        self.cluster_id = cluster_id
+        self.port = port
+        self.secret = secret
+        self._writer: typing.Optional[asyncio.StreamWriter] = None
+        self._pending: typing.Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count()
+        self.handlers = {
+            'load': self.load_module,
+            'unload': self.unload_module,
+            'restart': self.restart,
+            'stats': self.stats
+        }
+
+    async def connect(self):
+        reader, self._writer = await asyncio.open_connection(IPC_HOST, self.port)
+        await _send(self._writer, {'op': 'identify', 'cluster': self.cluster_id, 'secret': self.secret})
+        self.bot.loop.create_task(self._read_loop(reader))
+
+    async def _read_loop(self, reader: asyncio.StreamReader):
+        while True:
+            message = await _receive(reader)
+            if message is None:
+                self.bot.error_log.error(f"Cluster {self.cluster_id} lost its IPC connection")
+                return
+            if message['op'] == 'reply':
+                future = self._pending.pop(message['id'], None)
+                if future is not None and not future.done():
+                    # json object keys are always strings
+                    future.set_result({int(k): v for k, v in message['results'].items()})
+            elif message['op'] == 'command':
+                self.bot.loop.create_task(self._run_command(message))
+
+    async def _run_command(self, message: dict):
+        handler = self.handlers.get(message['command'])
+        try:
+            if handler is None:
+                raise KeyError(f"Unknown cluster command {message['command']}")
+            result = await handler(**message['args'])
+        except Exception as e:
+            self.bot.error_log.exception("".join(format_exception(type(e), e, e.__traceback__)))
+            result = {'error': f"{type(e).__name__}: {e}"}
+        await _send(self._writer, {'op': 'response', 'id': message['id'], 'result': result})
+
+    async def broadcast(self, command: str, timeout: float = 15.0, **args) -> typing.Dict[int, typing.Any]:
+        """Runs a command on every cluster including this one, returns each cluster's result by id"""
+        request_id = next(self._ids)
+        future = self._pending[request_id] = self.bot.loop.create_future()
+        await _send(self._writer, {'op': 'request', 'id': request_id, 'command': command, 'args': args})
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def load_module(self, module: str) -> dict:
+        extension = "modules." + module
+        reloading = extension in self.bot.extensions
+        if reloading:
+            self.bot.unload_extension(extension)
+        self.bot.load_extension(extension)
+        self.bot.console_output_log.info(f"{module} {'reloaded' if reloading else 'loaded'} by cluster command")
+        return {'reloaded': reloading}
+
+    async def unload_module(self, module: str) -> dict:
+        self.bot.unload_extension("modules." + module)
+        self.bot.console_output_log.warning(f"{module} unloaded by cluster command")
+        return {}
+
+    async def restart(self) -> dict:
+        async def close():
+            # let the response go out first, exit code 0 makes the launcher start this cluster again
+            await asyncio.sleep(1)
+            self.bot.exit_code = 0
+            await self.bot.close()
+
+        self.bot.loop.create_task(close())
+        return {}
+
+    async def stats(self) -> dict:
+        return {
+            'pid': os.getpid(),
+            'shards': {str(shard_id): latency for shard_id, latency in self.bot.latencies},
+            'guilds': len(self.bot.guilds),
+            'users': len(self.bot.users)
+        }
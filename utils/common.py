@@ -37,14 +37,12 @@ def parse_time(time_string: str) -> int:
 
 async def get_staff_roles(ctx: commands.Context) -> list:
     """Get's a guild's staff roles"""
-    async with ctx.bot.db.acquire() as conn:
-        ids = await conn.fetchrow("SELECT mod_role, admin_role, owner_role FROM roles WHERE guild_id = $1",
-                                  ctx.guild.id)
-        staff_roles = []
-        for id in ids:
-            staff_roles.append(ctx.guild.get_role(id))
-        while None in staff_roles:
-            staff_roles.remove(None)
+    guild_config = await ctx.bot.guild_config.get(ctx.guild.id)
+    staff_roles = []
+    for id in (guild_config.mod_role, guild_config.admin_role, guild_config.owner_role):
+        staff_roles.append(ctx.guild.get_role(id))
+    while None in staff_roles:
+        staff_roles.remove(None)
 
     return staff_roles
 
@@ -52,10 +50,10 @@ async def get_staff_roles(ctx: commands.Context) -> list:
 async def check_private_channel(ctx: commands.Context, channel: discord.TextChannel) -> bool:
     """Checks if a channel is private"""
     roles = []
-    if await ctx.bot.db.fetchval("SELECT approval_system FROM guild_settings WHERE guild_id = $1", ctx.guild.id):
+    guild_config = await ctx.bot.guild_config.get(ctx.guild.id)
+    if guild_config.approval_system:
 
-        roles.append(ctx.guild.get_role(
-            await ctx.bot.db.fetchval("SELECT approved_role FROM roles WHERE guild_id = $1", ctx.guild.id)))
+        roles.append(ctx.guild.get_role(guild_config.approved_role))
         while None in roles:
             roles.remove(None)
 
@@ -83,7 +81,7 @@ def hex_to_color(color_hex: str) -> (discord.Color, str) or None:
 
 
 def image_from_rgb(rgb_triple: (int, int, int)) -> discord.File:
-    """Gets a color image"""
+    """Gets a color image, this is slow so run it with bot.offload"""
     color_img = Image.new("RGB", (500, 500), rgb_triple)
     attachment = io.BytesIO()
     color_img.save(attachment, 'PNG')
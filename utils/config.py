@@ -0,0 +1,102 @@
+import os
+import types
+import typing
+import toml
+
+CONFIG_PATH = "data/config.toml"
+
+
+def _freeze(value):
+    """Recursively makes parsed toml data read only"""
+    if isinstance(value, dict):
+        return types.MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    elif isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class ConfigSnapshot(typing.NamedTuple):
+    """Immutable parsed copy of config.toml"""
+    token: str
+    db: str
+    default_prefix: str
+    description: str
+    activity: str
+    modules: typing.Tuple[str, ...]
+    bot_error_channels: typing.Tuple[int, ...]
+    bot_owners: typing.Tuple[int, ...]
+    sections: typing.Mapping[str, typing.Mapping]
+    mtime: float
+
+    def get(self, block: str, config: str):
+        """Gets a single value by its block and key, raises KeyError if it does not exist"""
+        return self.sections[block][config]
+
+    def section(self, block: str) -> typing.Mapping:
+        """Gets a whole block, optional blocks that are not in the file are empty"""
+        return self.sections.get(block, types.MappingProxyType({}))
+
+
+class ConfigManager:
+    """Holds the current config snapshot and swaps it out when config.toml changes"""
+
+    def __init__(self, path: str = CONFIG_PATH):
+        self.path = path
+        self._listeners: typing.List[typing.Callable[[ConfigSnapshot, ConfigSnapshot], None]] = []
+        self._snapshot = self._parse()
+
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        return self._snapshot
+
+    def _parse(self) -> ConfigSnapshot:
+        """Reads and parses the config file into a new snapshot"""
+        mtime = os.stat(self.path).st_mtime
+        with open(self.path) as config_file:
+            sections = _freeze(toml.load(config_file, _dict=dict))
+
+        credentials = sections['credentials']
+        info = sections['info']
+        bot_management = sections['bot_management']
+        return ConfigSnapshot(
+            token=credentials['token'],
+            db=credentials['db'],
+            default_prefix=info['default_prefix'],
+            description=info['description'],
+            activity=info['activity'],
+            modules=tuple(info.get('modules', ())),
+            bot_error_channels=tuple(int(c) for c in bot_management.get('bot_error_channels', ())),
+            bot_owners=tuple(int(u) for u in bot_management.get('bot_owners', ())),
+            sections=sections,
+            mtime=mtime
+        )
+
+    def add_listener(self, listener: typing.Callable[[ConfigSnapshot, ConfigSnapshot], None]):
+        """Registers a function called with the old and new snapshot after every reload"""
+        self._listeners.append(listener)
+
+    def reload(self) -> ConfigSnapshot:
+        """Parses the config file and swaps it in, a broken file raises and leaves the current snapshot in place"""
+        new = self._parse()
+        old, self._snapshot = self._snapshot, new
+        for listener in self._listeners:
+            listener(old, new)
+        return new
+
+    def reload_if_changed(self) -> bool:
+        """Reloads only if the config file has been modified since the last parse"""
+        if os.stat(self.path).st_mtime == self._snapshot.mtime:
+            return False
+        self.reload()
+        return True
+
+
+_manager: typing.Optional[ConfigManager] = None
+
+
+def get_config() -> ConfigManager:
+    """Gets the process wide config manager, parsing the config file on first use"""
+    global _manager
+    if _manager is None:
+        _manager = ConfigManager()
+    return _manager
@@ -0,0 +1,167 @@
+import functools
+import os
+import random
+import re
+import sys
+import time
+import typing
+import asyncpg
+
+# statements are grouped by their text with literals stripped out, so queries built with f-strings group together
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w$])\d+(?:\.\d+)?\b")
+_SPACE_RE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def normalise(query: str) -> str:
+    """Strips whitespace differences and literal values from a query"""
+    query = _STRING_RE.sub("?", query)
+    query = _NUMBER_RE.sub("?", query)
+    return _SPACE_RE.sub(" ", query).strip()
+
+
+def call_site() -> str:
+    """The first frame outside of this file, the code that ran the query"""
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_code.co_filename == __file__:
+        frame = frame.f_back
+    if frame is None:
+        return "unknown"
+    return f"{os.path.relpath(frame.f_code.co_filename)}:{frame.f_lineno} in {frame.f_code.co_name}"
+
+
+class QueryStats:
+    """Count and timings of one normalised query, percentiles come from a fixed size random sample"""
+    __slots__ = ('query', 'count', 'total', 'max', 'sample')
+
+    SAMPLE_SIZE = 512
+
+    def __init__(self, query: str):
+        self.query = query
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.sample: typing.List[float] = []
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        # reservoir sampling keeps every run equally likely to be in the sample
+        if len(self.sample) < self.SAMPLE_SIZE:
+            self.sample.append(seconds)
+        else:
+            i = random.randrange(self.count)
+            if i < self.SAMPLE_SIZE:
+                self.sample[i] = seconds
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p: float) -> float:
+        if not self.sample:
+            return 0.0
+        ordered = sorted(self.sample)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+class QueryLog:
+    """Collects statistics for every query and logs slow ones"""
+
+    def __init__(self, log, slow_threshold: float = 0.25, histogram=None):
+        self.log = log
+        self.slow_threshold = slow_threshold
+        self.histogram = histogram
+        self.queries: typing.Dict[str, QueryStats] = {}
+
+    def record(self, method: str, query: str, seconds: float):
+        normalised = normalise(query)
+        stats = self.queries.get(normalised)
+        if stats is None:
+            stats = self.queries[normalised] = QueryStats(normalised)
+        stats.record(seconds)
+        if self.histogram is not None:
+            self.histogram.observe(method, value=seconds)
+        if self.slow_threshold is not None and seconds >= self.slow_threshold:
+            self.log.warning(f"Slow query ({seconds * 1000:.1f}ms) from {call_site()}: {normalised}")
+
+    def top(self, n: int = 10, key: str = 'total') -> typing.List[QueryStats]:
+        """The n queries with the highest total, count, mean or max"""
+        return sorted(self.queries.values(), key=lambda q: getattr(q, key), reverse=True)[:n]
+
+    def reset(self):
+        self.queries.clear()
+
+
+def _timed(method: str):
+    async def wrapper(self, query, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await getattr(self._wrapped, method)(query, *args, **kwargs)
+        finally:
+            self._query_log.record(method, query, time.perf_counter() - start)
+
+    wrapper.__name__ = method
+    return wrapper
+
+
+class _TimedQueries:
+    execute = _timed('execute')
+    executemany = _timed('executemany')
+    fetch = _timed('fetch')
+    fetchrow = _timed('fetchrow')
+    fetchval = _timed('fetchval')
+
+
+class InstrumentedConnection(_TimedQueries):
+    """Proxy for a pool connection that times queries, anything else is passed through"""
+
+    def __init__(self, connection: asyncpg.Connection, query_log: QueryLog):
+        self._wrapped = connection
+        self._query_log = query_log
+
+    def __getattr__(self, item):
+        return getattr(self._wrapped, item)
+
+
+class _AcquireContext:
+    def __init__(self, pool: 'InstrumentedPool', context):
+        self.pool = pool
+        self.context = context
+
+    async def __aenter__(self) -> InstrumentedConnection:
+        return InstrumentedConnection(await self.context.__aenter__(), self.pool._query_log)
+
+    async def __aexit__(self, *exc):
+        return await self.context.__aexit__(*exc)
+
+    def __await__(self):
+        async def acquire():
+            return InstrumentedConnection(await self.context, self.pool._query_log)
+        return acquire().__await__()
+
+
+class InstrumentedPool(_TimedQueries):
+    """Stands in for the asyncpg pool at bot.db, recording every query run through it"""
+
+    def __init__(self, pool: asyncpg.pool.Pool, query_log: QueryLog):
+        self._wrapped = pool
+        self._query_log = query_log
+
+    @property
+    def query_log(self) -> QueryLog:
+        return self._query_log
+
+    def acquire(self, *, timeout: float = None) -> _AcquireContext:
+        return _AcquireContext(self, self._wrapped.acquire(timeout=timeout))
+
+    async def release(self, connection, *, timeout: float = None):
+        if isinstance(connection, InstrumentedConnection):
+            connection = connection._wrapped
+        await self._wrapped.release(connection, timeout=timeout)
+
+    def __getattr__(self, item):
+        return getattr(self._wrapped, item)
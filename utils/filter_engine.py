@@ -0,0 +1,483 @@
+"""Word filter matching, kept free of discord so it can be benchmarked and tested on its own.
+
+Messages and words are first normalised the same way: accents, look-alike characters from other
+scripts, fullwidth and styled letters and leetspeak are folded to lowercase ascii through one
+precomputed str.translate table, invisible characters are dropped and repeated letters collapsed,
+keeping count of the repeats so a word with a doubled letter does not match its single letter form.
+Every filtered word is compiled into one Aho-Corasick automaton per guild, so a message is
+scanned once no matter how many words the guild filters. Two variants of the message are scanned:
+
+- dense: letters and digits only, with everything else including spaces removed,
+  catches words hidden with punctuation or spacing (b.a.d, b a d, bad).
+- spaced: letters, digits and spaces, for words shorter than SHORT_WORD_LENGTH spelled out one
+  letter at a time. These only count when the spelled out word stands on its own.
+  Short words are also matched densely, same as long ones.
+
+The variants are scanned without tracking where each character came from, that is only worked out
+for messages with a match, and the spaced variant is skipped unless the message has single letters
+in a row to spell a word out with.
+
+Short words given a fuzzy threshold are also compared against every run of spelled out letters in the
+spaced variant, so near misses like "b o a d" are caught. Each run is scored against every fuzzy word
+in one rapidfuzz call, which stops scoring a pair once it cannot reach the lowest threshold.
+
+Regex entries are run as written against the original message, ignoring case. They are compiled once
+per guild with the regex module rather than re, as it backtracks just the same but can be given a
+timeout: every message gets REGEX_BUDGET seconds of regex matching in total, enforced inside a pattern,
+so no pattern can hold the event loop for longer. check_pattern also turns away the usual causes of
+runaway backtracking up front, so well behaved patterns are not cut short.
+"""
+import functools
+import itertools
+import operator
+import re
+import time
+import typing
+import unicodedata
+import regex
+from rapidfuzz import fuzz, process
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    # python < 3.11
+    import sre_parse
+
+# words shorter than this are also matched when spelled out with spaces between the letters
+SHORT_WORD_LENGTH = 5
+
+PUNISHMENT_ORDER = ('notify', 'delete', 'warn')
+
+# seconds of regex matching a message gets, a pattern still running when it is used up is stopped
+REGEX_BUDGET = 0.005
+MAX_PATTERN_LENGTH = 200
+MAX_UNBOUNDED_REPEATS = 3
+MAX_REPEAT_COUNT = 100
+
+_TOKEN_RE = re.compile(r"[^ ]+")
+
+
+class FilterWord(typing.NamedTuple):
+    """A row of filtered_words"""
+    word: str
+    punishment: str
+    # minimum similarity out of 100 for a spelled out run of letters to count, None for exact matches only
+    fuzzy_threshold: typing.Optional[int] = None
+    is_regex: bool = False
+
+
+class FilterMatch(typing.NamedTuple):
+    word: str
+    punishment: str
+    # span in the original message
+    start: int
+    end: int
+
+
+class AhoCorasick:
+    """Finds every occurrence of a set of strings in one pass over the text"""
+
+    def __init__(self, patterns: typing.Iterable[str]):
+        self.patterns: typing.List[str] = []
+        self._goto: typing.List[typing.Dict[str, int]] = [{}]
+        self._fail: typing.List[int] = [0]
+        # pattern indexes that end at each state, including ones reached through fail links
+        self._out: typing.List[typing.Tuple[int, ...]] = [()]
+        # every transition out of a state with its fail links followed ahead of time, except the root's own
+        self._next: typing.List[typing.Dict[str, int]] = [{}]
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str):
+        if not pattern:
+            return
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = self._goto[state][char] = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+                self._next.append({})
+            state = next_state
+        self._out[state] += (len(self.patterns),)
+        self.patterns.append(pattern)
+
+    def _build(self):
+        # breadth first so every state's fail link is final before its children need it
+        queue = list(self._goto[0].values())
+        for state in queue:
+            # the root's children fail to the root, their own transitions are all there is
+            self._next[state] = self._goto[state]
+        for state in queue:
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] += self._out[self._fail[child]]
+                # the fail state is shallower so its transitions are already complete
+                self._next[child] = {**self._next[self._fail[child]], **self._goto[child]}
+
+    def __bool__(self):
+        return bool(self.patterns)
+
+    def find(self, text: str) -> typing.Iterator[typing.Tuple[int, int, int]]:
+        """Yields (pattern index, start, end) for every occurrence, overlapping ones included"""
+        transitions = self._next
+        root = self._goto[0].get
+        out = self._out
+        state = 0
+        # one dict lookup per character, no transition leads back to the root so a miss falls back to its own
+        for i, char in enumerate(text):
+            state = transitions[state].get(char) or root(char, 0)
+            for index in out[state]:
+                yield index, i + 1 - len(self.patterns[index]), i + 1
+
+
+# characters commonly swapped in for a letter, applied after accents are stripped and the text is lowercased
+LEET = {'0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '8': 'b', '9': 'g', '@': 'a', '$': 's'}
+CONFUSABLES = {
+    # cyrillic
+    'а': 'a', 'в': 'b', 'ь': 'b', 'с': 'c', 'ԁ': 'd', 'е': 'e', 'һ': 'h', 'н': 'h', 'і': 'i', 'ј': 'j', 'к': 'k',
+    'м': 'm', 'о': 'o', 'р': 'p', 'ԛ': 'q', 'ѕ': 's', 'т': 't', 'у': 'y', 'ԝ': 'w', 'х': 'x',
+    # greek
+    'α': 'a', 'β': 'b', 'ε': 'e', 'η': 'n', 'ι': 'i', 'κ': 'k', 'ν': 'v', 'ο': 'o', 'ρ': 'p', 'τ': 't', 'υ': 'u',
+    'χ': 'x', 'ω': 'w',
+    # latin letters that do not decompose to a base letter
+    'ß': 'ss', 'æ': 'ae', 'œ': 'oe', 'ø': 'o', 'đ': 'd', 'ð': 'd', 'ħ': 'h', 'ı': 'i', 'ł': 'l', 'ŧ': 't', 'þ': 'th'
+}
+# blocks that hold look-alikes of ascii letters and digits: latin, greek, cyrillic, modifier letters and
+# super/subscripts, letterlike symbols, enclosed alphanumerics, ligatures, fullwidth forms and math alphanumerics
+_TABLE_RANGES = ((0x0, 0x250), (0x2b0, 0x370), (0x370, 0x530), (0x1d00, 0x1dc0), (0x1e00, 0x1f00), (0x2000, 0x2150),
+                 (0x2460, 0x2500), (0xfb00, 0xfb07), (0xff00, 0xfff0), (0x1d400, 0x1d800), (0x1f100, 0x1f1ff))
+_ASCII_ALNUM = frozenset("abcdefghijklmnopqrstuvwxyz0123456789")
+
+
+def _fold(char: str) -> typing.Optional[str]:
+    """The ascii letters and digits a character stands for, a space for whitespace,
+    None for anything else"""
+    if char.isspace():
+        return " "
+    decomposed = "".join(c for c in unicodedata.normalize('NFKD', char) if not unicodedata.combining(c)).lower()
+    folded = "".join(LEET.get(c, CONFUSABLES.get(c, c)) for c in decomposed)
+    if folded and all(c in _ASCII_ALNUM for c in folded):
+        return folded
+    return None
+
+
+def _build_table() -> typing.Dict[int, str]:
+    table = {}
+    for start, end in _TABLE_RANGES:
+        for codepoint in range(start, end):
+            folded = _fold(chr(codepoint))
+            if folded is not None and folded != chr(codepoint):
+                table[codepoint] = folded
+    return table
+
+
+# built once at import, anything left out of the table is dropped after translating
+_TABLE = _build_table()
+_DENSE_CHARS = _ASCII_ALNUM
+_SPACED_CHARS = _ASCII_ALNUM | {" "}
+_REPEAT_RE = re.compile(r"(.)\1+")
+_DENSE_DROP_RE = re.compile(r"[^a-z0-9]+")
+_SPACED_DROP_RE = re.compile(r"[^a-z0-9 ]+")
+# a spelled out word is a run of single character tokens, two or more unless a filtered word is one character long
+_SPELLED_RE = re.compile(r"(?:^| )[a-z0-9] [a-z0-9](?: |$)")
+_SINGLE_RE = re.compile(r"(?:^| )[a-z0-9](?: |$)")
+
+
+def _translate(content: str) -> typing.Tuple[str, typing.Optional[typing.List[int]]]:
+    """Folds every character, returns the folded text and, only if some character folded into
+    more than one, the index in content each folded character came from"""
+    translated = content.translate(_TABLE)
+    if len(translated) == len(content):
+        return translated, None
+
+    chars = []
+    origin = []
+    for i, char in enumerate(content):
+        folded = char.translate(_TABLE)
+        chars.append(folded)
+        origin.extend([i] * len(folded))
+    return "".join(chars), origin
+
+
+class _Normalised(typing.NamedTuple):
+    text: str
+    # index in the original message of the first and last character each character of text stands for
+    starts: typing.List[int]
+    ends: typing.List[int]
+    # how many times each character of text was repeated, None if nothing was
+    runs: typing.Optional[typing.List[int]]
+
+
+def _keep(translated: str, origin: typing.Optional[typing.List[int]], kept: typing.FrozenSet[str]) -> _Normalised:
+    """Keeps the characters in kept and collapses repeats, baaad is matched as bad.
+    Done with compress and map so the per character work stays out of the interpreter loop"""
+    flags = list(map(kept.__contains__, translated))
+    text = "".join(itertools.compress(translated, flags))
+    offsets = list(itertools.compress(range(len(translated)) if origin is None else origin, flags))
+    if _REPEAT_RE.search(text) is None:
+        return _Normalised(text, offsets, offsets, None)
+
+    # a character starts a run when it differs from the one before it and ends one when it differs from the next
+    firsts = list(map(operator.ne, text, "\0" + text))
+    run_starts = list(itertools.compress(range(len(text)), firsts))
+    runs = list(map(operator.sub, run_starts[1:] + [len(text)], run_starts))
+    starts = list(itertools.compress(offsets, firsts))
+    ends = list(itertools.compress(offsets, map(operator.ne, text, text[1:] + "\0")))
+    return _Normalised("".join(itertools.compress(text, firsts)), starts, ends, runs)
+
+
+def _kept_text(translated: str, dropped: typing.Pattern) -> str:
+    """The text _keep would give, without tracking where each character came from.
+    Scanning only needs this, the offsets are worked out once something matches"""
+    return _REPEAT_RE.sub(r"\1", dropped.sub("", translated))
+
+
+def normalise_word(word: str) -> str:
+    """A filtered word folded the same way as messages, before repeated letters are collapsed"""
+    return "".join(c for c in word.translate(_TABLE) if c in _DENSE_CHARS)
+
+
+def _collapse(folded: str) -> typing.Tuple[str, typing.Optional[typing.Tuple[int, ...]]]:
+    """A folded word's collapsed form and how often each letter repeats, None if none do"""
+    groups = [(char, len(list(run))) for char, run in itertools.groupby(folded)]
+    collapsed = "".join(char for char, _ in groups)
+    if len(collapsed) == len(folded):
+        return collapsed, None
+    return collapsed, tuple(length for _, length in groups)
+
+
+class UnsafePattern(ValueError):
+    """A regex entry that is invalid or could take too long to run"""
+
+
+_REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, 'POSSESSIVE_REPEAT', None)}
+_FORBIDDEN = {
+    sre_parse.GROUPREF: "backreferences",
+    sre_parse.GROUPREF_EXISTS: "conditional groups",
+    sre_parse.ASSERT: "lookarounds",
+    sre_parse.ASSERT_NOT: "lookarounds"
+}
+
+
+def _check_parsed(parsed, in_repeat: bool) -> int:
+    """Walks a parsed pattern rejecting anything that can backtrack badly, returns the number of unbounded repeats"""
+    unbounded = 0
+    for op, av in parsed:
+        if op in _FORBIDDEN:
+            raise UnsafePattern(f"{_FORBIDDEN[op]} are not allowed")
+        if op in _REPEATS:
+            low, high, body = av
+            if in_repeat:
+                raise UnsafePattern("repeats inside repeats, like (a+)+, are not allowed")
+            if high == sre_parse.MAXREPEAT:
+                unbounded += 1
+            elif high > MAX_REPEAT_COUNT:
+                raise UnsafePattern(f"repeat counts over {MAX_REPEAT_COUNT} are not allowed")
+            unbounded += _check_parsed(body, in_repeat=True)
+        elif op == sre_parse.SUBPATTERN:
+            unbounded += _check_parsed(av[-1], in_repeat)
+        elif op == sre_parse.BRANCH:
+            if in_repeat:
+                raise UnsafePattern("repeated alternations, like (ab|cd)+, are not allowed")
+            unbounded += sum(_check_parsed(branch, in_repeat) for branch in av[1])
+        elif op == getattr(sre_parse, 'ATOMIC_GROUP', None):
+            unbounded += _check_parsed(av, in_repeat)
+    return unbounded
+
+
+@functools.lru_cache(maxsize=1024)
+def check_pattern(pattern: str) -> regex.Pattern:
+    """Compiles a regex entry, raising UnsafePattern unless it sticks to a subset that rarely backtracks
+    badly: no backreferences or lookarounds, no nested repeats or repeated alternations and at most
+    MAX_UNBOUNDED_REPEATS unbounded repeats. Patterns that still do are stopped by the timeout in find"""
+    if len(pattern) > MAX_PATTERN_LENGTH:
+        raise UnsafePattern(f"patterns can be at most {MAX_PATTERN_LENGTH} characters")
+    try:
+        parsed = sre_parse.parse(pattern, re.IGNORECASE)
+    except re.error as e:
+        raise UnsafePattern(f"invalid regex: {e}")
+
+    if _check_parsed(parsed, in_repeat=False) > MAX_UNBOUNDED_REPEATS:
+        raise UnsafePattern(f"at most {MAX_UNBOUNDED_REPEATS} unbounded repeats (*, + or {{n,}}) are allowed")
+    try:
+        compiled = regex.compile(pattern, regex.IGNORECASE)
+    except regex.error as e:
+        raise UnsafePattern(f"invalid regex: {e}")
+    if compiled.search("") is not None:
+        raise UnsafePattern("the pattern matches an empty message")
+    return compiled
+
+
+class FilterMatcher:
+    """A guild's compiled word filter"""
+
+    def __init__(self, words: typing.Iterable[FilterWord]):
+        self.words: typing.List[FilterWord] = []
+        self.regexes: typing.List[typing.Tuple[regex.Pattern, FilterWord]] = []
+        # regex entries stored before a rule they break was added, they are not run
+        self.rejected: typing.List[FilterWord] = []
+        # messages that ran out of regex budget
+        self.overruns = 0
+        # pattern indexes line up with self.words for dense and with _spaced_words for spaced
+        self._spaced_words: typing.List[FilterWord] = []
+        self._fuzzy_words: typing.List[FilterWord] = []
+        # words with doubled letters are matched collapsed, but only where the message repeats them as often
+        self._dense_runs: typing.List[typing.Optional[typing.Tuple[int, ...]]] = []
+        dense = []
+        spaced = []
+        fuzzy = []
+        for filter_word in words:
+            if filter_word.is_regex:
+                try:
+                    self.regexes.append((check_pattern(filter_word.word), filter_word))
+                except UnsafePattern:
+                    self.rejected.append(filter_word)
+                continue
+
+            normalised = normalise_word(filter_word.word)
+            if not normalised:
+                continue
+            collapsed, runs = _collapse(normalised)
+            self.words.append(filter_word)
+            dense.append(collapsed)
+            self._dense_runs.append(runs)
+            if len(normalised) < SHORT_WORD_LENGTH:
+                spaced.append(" ".join(normalised))
+                self._spaced_words.append(filter_word)
+                if filter_word.fuzzy_threshold is not None:
+                    fuzzy.append(normalised)
+                    self._fuzzy_words.append(filter_word)
+
+        self._dense = AhoCorasick(dense)
+        self._spaced = AhoCorasick(spaced)
+        self._fuzzy = fuzzy
+        self._fuzzy_thresholds = [w.fuzzy_threshold for w in self._fuzzy_words]
+        self._fuzzy_cutoff = min(self._fuzzy_thresholds, default=100)
+        self._spelled_re = _SINGLE_RE if any(len(pattern) == 1 for pattern in spaced) else _SPELLED_RE
+
+    def __len__(self):
+        return len(self.words) + len(self.regexes)
+
+    def find(self, content: str) -> typing.List[FilterMatch]:
+        """Every filtered word in a message, spans point into content"""
+        matches = []
+        if self.words:
+            matches.extend(self._find_words(content))
+        if self.regexes:
+            matches.extend(self._find_regexes(content))
+        # a spelled out short word is found by both the dense and spaced scans
+        return list(dict.fromkeys(matches))
+
+    def _find_words(self, content: str) -> typing.List[FilterMatch]:
+        matches = []
+        # the expensive folding is shared by both variants
+        translated, origin = _translate(content)
+        hits = list(self._dense.find(_kept_text(translated, _DENSE_DROP_RE)))
+        dense = _keep(translated, origin, _DENSE_CHARS) if hits else None
+        for index, start, end in hits:
+            runs = self._dense_runs[index]
+            if runs is not None and (dense.runs is None or any(map(operator.lt, dense.runs[start:end], runs))):
+                continue
+            filter_word = self.words[index]
+            matches.append(FilterMatch(filter_word.word, filter_word.punishment, dense.starts[start],
+                                       dense.ends[end - 1] + 1))
+
+        if self._spaced and self._spelled_re.search(_kept_text(translated, _SPACED_DROP_RE)):
+            # most messages spell nothing out and skip the second scan
+            spaced, spaced_starts, spaced_ends, _ = _keep(translated, origin, _SPACED_CHARS)
+            for index, start, end in self._spaced.find(spaced):
+                # a spelled out word only counts if it is not part of a longer run of letters
+                if (start > 0 and spaced[start - 1] != " ") or (end < len(spaced) and spaced[end] != " "):
+                    continue
+                filter_word = self._spaced_words[index]
+                matches.append(FilterMatch(filter_word.word, filter_word.punishment, spaced_starts[start],
+                                           spaced_ends[end - 1] + 1))
+
+            if self._fuzzy:
+                matches.extend(self._find_fuzzy(spaced, spaced_starts, spaced_ends))
+
+        return matches
+
+    def _find_regexes(self, content: str) -> typing.List[FilterMatch]:
+        """Runs regex entries until REGEX_BUDGET is spent, a pattern still running when it is gets stopped
+        part way through and the patterns after it are skipped"""
+        matches = []
+        deadline = time.perf_counter() + REGEX_BUDGET
+        for pattern, filter_word in self.regexes:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    raise TimeoutError
+                for match in pattern.finditer(content, timeout=remaining):
+                    if match.end() > match.start():
+                        matches.append(FilterMatch(filter_word.word, filter_word.punishment, match.start(),
+                                                   match.end()))
+            except TimeoutError:
+                self.overruns += 1
+                break
+        return matches
+
+    def _find_fuzzy(self, spaced: str, starts: typing.List[int],
+                    ends: typing.List[int]) -> typing.List[FilterMatch]:
+        """Scores every spelled out run against every fuzzy word, one call into rapidfuzz per run"""
+        matches = []
+        for letters, start, end in _spelled_out_runs(spaced):
+            # pairs that cannot reach the lowest threshold are abandoned early and left out
+            for _, score, index in process.extract(letters, self._fuzzy, scorer=fuzz.ratio, limit=None,
+                                                   score_cutoff=self._fuzzy_cutoff):
+                if score >= self._fuzzy_thresholds[index]:
+                    filter_word = self._fuzzy_words[index]
+                    matches.append(FilterMatch(filter_word.word, filter_word.punishment, starts[start],
+                                               ends[end - 1] + 1))
+        return matches
+
+
+def _spelled_out_runs(spaced: str) -> typing.Iterator[typing.Tuple[str, int, int]]:
+    """Yields (letters, start, end) for every run of two or more single character tokens"""
+    run = []
+    run_start = run_end = 0
+    for token in _TOKEN_RE.finditer(spaced):
+        if token.end() - token.start() == 1:
+            if not run:
+                run_start = token.start()
+            run.append(token.group())
+            run_end = token.end()
+            continue
+        if len(run) >= 2:
+            yield "".join(run), run_start, run_end
+        run = []
+    if len(run) >= 2:
+        yield "".join(run), run_start, run_end
+
+
+def highest_punishment(matches: typing.Iterable[FilterMatch]) -> str:
+    """The harshest punishment of the matched words, warn > delete > notify"""
+    return max((m.punishment for m in matches), key=PUNISHMENT_ORDER.index, default='notify')
+
+
+def highlight(content: str, matches: typing.Iterable[FilterMatch]) -> str:
+    """Bolds every matched span in the message, overlapping spans are merged"""
+    spans = sorted((m.start, m.end) for m in matches)
+    merged = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+
+    out = []
+    last = 0
+    for start, end in merged:
+        out.append(content[last:start])
+        out.append(f"**{content[start:end]}**")
+        last = end
+    out.append(content[last:])
+    return "".join(out)
@@ -67,6 +67,7 @@ class TerrygonLogger:
             "worddelete": ":thumbsdown:",
             "wordupdate": ":arrows_counterclockwise:",
             "filterpop": ":mega:",
+            "automod": ":rotating_light:",
             "channelwhitelist": ":ballot_box_with_check:",
             "channeldewhitelist": ":no_mouth:"
         }
@@ -76,21 +77,18 @@ class TerrygonLogger:
         if not database_channel in ("mod_logs", "member_logs", "message_logs", "filter_logs"):
             raise errors.LoggingError(command_name, guild)
 
-        query = f"SELECT {database_channel} FROM channels WHERE guild_id = $1"
-        async with self.bot.db.acquire() as conn:
-
-            channel_id = await conn.fetchval(query, guild.id)
-            if channel_id is None:
-                raise errors.LoggingError(command_name, guild)
+        channel_id = getattr(await self.bot.guild_config.get(guild.id), database_channel)
+        if channel_id is None:
+            raise errors.LoggingError(command_name, guild)
 
+        else:
+            log_channel = self.bot.get_channel(channel_id)
+            if log_channel is None:
+                self.bot.error_log.error("Did not parse asyncpg record object properly.")
             else:
-                log_channel = self.bot.get_channel(channel_id)
-                if log_channel is None:
-                    self.bot.error_log.error("Did not parse asyncpg record object properly.")
-                else:
-                    await log_channel.send(msg)
-                    if embed:
-                        await log_channel.send(embed=embed)
+                await log_channel.send(msg)
+                if embed:
+                    await log_channel.send(embed=embed)
 
     async def mod_logs(self, ctx, log_type: str,
                        target: typing.Union[discord.Member, discord.TextChannel, discord.Role], author: discord.Member,
@@ -189,8 +187,9 @@ class TerrygonLogger:
             logging_msg = f"{self.emotes['clear']} **__Cleared Warn__** {member.mention} ({member}) had warn id {warn.id} removed by {author.mention} ({author} | {author.id})\n{self.emotes['id']} User ID: {member.id}"
             embed = discord.Embed(color=0xe6ff33)
             embed.set_author(name=f"{member}", icon_url=member.avatar_url)
+            issuer = await self.bot.user_resolver.fetch(warn.author_id) or warn.author_id
             embed.add_field(name=f"\n\n{warn.time_stamp}",
-                            value=f"{warn.reason if warn.reason is not None else 'No reason given for warn'}\n Issuer: {self.bot.get_user(warn.author_id) if self.bot.get_user(warn.author_id) is not None else self.bot.fetch_user(warn.author_id)}")
+                            value=f"{warn.reason if warn.reason is not None else 'No reason given for warn'}\n Issuer: {issuer}")
         try:
             await self.dispatch('mod_logs', author.guild, log_type, logging_msg, embed)
         except errors.LoggingError:
@@ -218,9 +217,10 @@ class TerrygonLogger:
         except errors.LoggingError:
             pass
 
-    async def softban_join(self, member: discord.Member, author: discord.Member, reason=None):
-        """Softban logging"""
-        logging_msg = f"{self.emotes['failure']} **__Attempted Join:__** {member.mention} ({member.name}#{member.discriminator}) tried to join {member.guild.name} but is softbanned by {author} ({author.id})\n{self.emotes['id']} User ID: {member.id}"
+    async def softban_join(self, member: discord.Member, author: typing.Union[discord.User, int], reason=None):
+        """Softban logging, author is just the issuer's id if they could not be found"""
+        issuer = f"Unknown user ({author})" if isinstance(author, int) else f"{author} ({author.id})"
+        logging_msg = f"{self.emotes['failure']} **__Attempted Join:__** {member.mention} ({member.name}#{member.discriminator}) tried to join {member.guild.name} but is softbanned by {issuer}\n{self.emotes['id']} User ID: {member.id}"
         if reason:
             logging_msg += f"\n{self.emotes['reason']} Reason: `{reason}.`"
 
@@ -233,9 +233,8 @@ class TerrygonLogger:
         """User updates, agnostic to servers"""
         logging_msg = f"{self.emotes[logtype]} **__User Update:__** {user} updated their {logtype}\n{self.emotes['id']} User ID: {user.id}\n:pencil: `{user_before}` -> `{user_after}`"
         for g in self.bot.guilds:
-            if user in g.members:
-                channel = g.get_channel(
-                    await self.bot.db.fetchval("SELECT member_logs FROM channels WHERE guild_id = $1", g.id))
+            if g.get_member(user.id) is not None:
+                channel = g.get_channel((await self.bot.guild_config.get(g.id)).member_logs)
                 if not channel:
                     continue
                 else:
@@ -453,6 +452,18 @@ class TerrygonLogger:
         except errors.LoggingError:
             pass
 
+    async def automod_action(self, member: discord.Member, check: str, content: str, punishment: str):
+        """Logs automod catching a user"""
+        embed = discord.Embed(description=content, color=common.gen_color(member.id))
+        msg = f"{self.emotes['automod']} **__Automod:__** {member.mention} ({member}) tripped the {check} check\n{self.emotes['id']}User ID: {member.id}"
+        if punishment != "notify":
+            msg += f"\nPunishment: {punishment}"
+
+        try:
+            await self.dispatch("filter_logs", member.guild, "automod", msg, embed=embed)
+        except errors.LoggingError:
+            pass
+
     async def custom_log(self, log_channel: str, guild: discord.Guild, msg: str, embed: discord.Embed = None):
         """Sends a custom log to any channel"""
 
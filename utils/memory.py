@@ -0,0 +1,80 @@
+import collections
+import typing
+import discord
+
+
+class MemoryProfile(typing.NamedTuple):
+    """Discord client cache settings for a deployment size"""
+    name: str
+    presences: bool
+    member_cache: str  # all, joined or none
+    chunk_guilds_at_startup: bool
+    messages_per_guild: typing.Optional[int]  # None keeps the old global 10000 message cache
+
+    def intents(self) -> discord.Intents:
+        intents = discord.Intents.all()
+        intents.presences = self.presences
+        return intents
+
+    def member_cache_flags(self) -> discord.MemberCacheFlags:
+        if self.member_cache == 'all':
+            return discord.MemberCacheFlags.from_intents(self.intents())
+        elif self.member_cache == 'joined':
+            flags = discord.MemberCacheFlags.none()
+            flags.joined = True
+            flags.voice = True
+            return flags
+        elif self.member_cache == 'none':
+            return discord.MemberCacheFlags.none()
+        raise ValueError(f"Unknown member cache setting {self.member_cache}, use all, joined or none")
+
+    def client_options(self) -> dict:
+        """Keyword arguments for the bot's constructor"""
+        return {
+            'intents': self.intents(),
+            'member_cache_flags': self.member_cache_flags(),
+            'chunk_guilds_at_startup': self.chunk_guilds_at_startup,
+            'max_messages': 10000 if self.messages_per_guild is None else self.messages_per_guild
+        }
+
+
+PROFILES = {
+    # everything cached, the previous behaviour
+    'full': MemoryProfile('full', presences=True, member_cache='all', chunk_guilds_at_startup=True,
+                          messages_per_guild=None),
+    # members who join or are in voice while the bot is running, guilds chunked on demand
+    'balanced': MemoryProfile('balanced', presences=False, member_cache='joined', chunk_guilds_at_startup=False,
+                              messages_per_guild=200),
+    # no member cache, for large shards
+    'minimal': MemoryProfile('minimal', presences=False, member_cache='none', chunk_guilds_at_startup=False,
+                             messages_per_guild=25)
+}
+
+
+def profile_from_config(section: typing.Mapping) -> MemoryProfile:
+    """Builds a profile from the [memory] config block, keys other than profile override the preset"""
+    name = section.get('profile', 'full')
+    if name not in PROFILES:
+        raise ValueError(f"Unknown memory profile {name}, use one of {', '.join(PROFILES)}")
+    overrides = {k: section[k] for k in ('presences', 'member_cache', 'chunk_guilds_at_startup', 'messages_per_guild')
+                 if k in section}
+    return PROFILES[name]._replace(**overrides)
+
+
+def resize_message_cache(bot: discord.Client, messages_per_guild: typing.Optional[int]):
+    """discord.py keeps a single message cache for every guild, so size it by guild count
+    to get roughly the given number of messages per guild"""
+    if messages_per_guild is None:
+        return
+    state = bot._connection
+    size = messages_per_guild * max(len(bot.guilds), 1)
+    if state._messages is None or state._messages.maxlen != size:
+        state._messages = collections.deque(state._messages or (), maxlen=size)
+        state.max_messages = size
+
+
+async def ensure_chunked(guild: discord.Guild):
+    """Requests a guild's full member list when guilds are not chunked at startup,
+    use before relying on guild.members"""
+    if not guild.chunked:
+        await guild.chunk(cache=True)
@@ -0,0 +1,67 @@
+import asyncio
+import collections
+import typing
+from utils import checks
+from utils.cache import FilterState, GuildConfig
+
+# contexts kept around, listeners read theirs as soon as they start so only a burst this large could evict one early
+MAX_CONTEXTS = 512
+
+
+class MessageContext:
+    """What the on_message listeners need to know about a guild message, built once and shared between them.
+    Lookups are memoised, so however many modules are loaded each is done at most once per message."""
+    __slots__ = ('bot', 'message', 'guild_id', 'actioned', '_config', '_staff')
+
+    def __init__(self, bot, message):
+        self.bot = bot
+        self.message = message
+        self.guild_id = message.guild.id if message.guild is not None else None
+        # set by the first listener to delete or warn for the message, so the others do not punish it again
+        self.actioned = False
+        self._config: typing.Optional[asyncio.Future] = None
+        self._staff: typing.Dict[tuple, asyncio.Future] = {}
+
+    async def config(self) -> GuildConfig:
+        """The guild's config, only the first listener to ask can cause a cache miss"""
+        if self._config is None:
+            self._config = asyncio.ensure_future(self.bot.guild_config.get(self.guild_id))
+        return await self._config
+
+    @property
+    def filter(self) -> FilterState:
+        return self.bot.filters.get(self.guild_id)
+
+    async def is_staff(self, min_staff_role: str, **perms) -> bool:
+        """checks.nondeco_is_staff_or_perms for the message's author, memoised per role and permissions"""
+        key = (min_staff_role, tuple(sorted(perms.items())))
+        staff = self._staff.get(key)
+        if staff is None:
+            staff = self._staff[key] = asyncio.ensure_future(
+                checks.nondeco_is_staff_or_perms(self.message, self.bot, min_staff_role, **perms))
+        return await staff
+
+    def __repr__(self):
+        return f"<MessageContext message_id={self.message.id} guild_id={self.guild_id}>"
+
+
+class MessageContexts:
+    """The contexts of recently dispatched messages, the bot creates one before any listener runs"""
+
+    def __init__(self, bot, size: int = MAX_CONTEXTS):
+        self.bot = bot
+        self.size = size
+        self._contexts: typing.OrderedDict[int, MessageContext] = collections.OrderedDict()
+
+    def create(self, message) -> MessageContext:
+        context = self._contexts[message.id] = MessageContext(self.bot, message)
+        if len(self._contexts) > self.size:
+            self._contexts.popitem(last=False)
+        return context
+
+    def get(self, message) -> MessageContext:
+        """The message's context, one evicted already or from a message that was never dispatched is rebuilt"""
+        context = self._contexts.get(message.id)
+        if context is None or context.message is not message:
+            context = self.create(message)
+        return context
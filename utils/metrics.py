@@ -0,0 +1,171 @@
+import bisect
+import typing
+from aiohttp import web
+
+# seconds, roughly the prometheus client defaults
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = typing.Tuple[str, ...]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: typing.Sequence[str], values: typing.Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: typing.Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+
+    def samples(self) -> typing.Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: typing.Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.values: typing.Dict[LabelValues, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield f"{self.name}{_format_labels(self.label_names, labels)} {value}"
+
+
+class Gauge(Metric):
+    """A value read when metrics are collected, the callback returns {label values: value}"""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: typing.Sequence[str] = (),
+                 callback: typing.Callable[[], typing.Dict[LabelValues, float]] = None):
+        super().__init__(name, documentation, labels)
+        self.values: typing.Dict[LabelValues, float] = {}
+        self.callback = callback
+
+    def set(self, *labels, value: float):
+        self.values[labels] = value
+
+    def samples(self):
+        if self.callback is not None:
+            self.values = self.callback()
+        for labels, value in self.values.items():
+            yield f"{self.name}{_format_labels(self.label_names, labels)} {value}"
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: typing.Sequence[str] = (),
+                 buckets: typing.Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values: [per bucket counts..., +Inf count], sum
+        self.counts: typing.Dict[LabelValues, typing.List[int]] = {}
+        self.sums: typing.Dict[LabelValues, float] = {}
+
+    def observe(self, *labels, value: float):
+        counts = self.counts.get(labels)
+        if counts is None:
+            counts = self.counts[labels] = [0] * (len(self.buckets) + 1)
+            self.sums[labels] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sums[labels] += value
+
+    def samples(self):
+        for labels, counts in self.counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound}"'
+                yield f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.label_names, labels)} {self.sums[labels]}"
+            yield f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}"
+
+
+class MetricsRegistry:
+    """Every metric the bot exposes, always recorded, only served when [metrics] is enabled"""
+
+    def __init__(self):
+        self.metrics: typing.Dict[str, Metric] = {}
+        self.command_latency = self.add(Histogram(
+            "terrygon_command_seconds", "Time taken to run a command", ("command", "status")))
+        self.command_errors = self.add(Counter(
+            "terrygon_command_errors_total", "Commands that raised an error", ("command", "error")))
+        self.listener_latency = self.add(Histogram(
+            "terrygon_listener_seconds", "Time taken by an event listener", ("event", "listener")))
+        self.listener_errors = self.add(Counter(
+            "terrygon_listener_errors_total", "Event listeners that raised an error", ("event",)))
+        self.db_latency = self.add(Histogram(
+            "terrygon_db_query_seconds", "Time taken by a database query", ("method",)))
+        self.loop_lag = self.add(Histogram(
+            "terrygon_loop_lag_seconds", "How late the event loop ran a scheduled wake up",
+            buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)))
+
+    def add(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+
+class MetricsServer:
+    """Serves the registry in prometheus' text format over http"""
+
+    def __init__(self, bot, registry: MetricsRegistry):
+        self.bot = bot
+        self.registry = registry
+        self.runner: typing.Optional[web.AppRunner] = None
+        self.timed_jobs = 0
+        self.overdue_timed_jobs = 0
+        registry.add(Gauge("terrygon_db_pool_connections", "Database pool connections", ("state",),
+                           callback=self.pool_connections))
+        registry.add(Gauge("terrygon_scheduler_jobs", "Timed jobs waiting in the database", ("state",),
+                           callback=lambda: {('pending',): self.timed_jobs, ('overdue',): self.overdue_timed_jobs}))
+        registry.add(Gauge("terrygon_gateway_latency_seconds", "Heartbeat latency per shard", ("shard",),
+                           callback=lambda: {(str(shard_id),): latency for shard_id, latency in self.bot.latencies}))
+        registry.add(Gauge("terrygon_guilds", "Guilds this process is in",
+                           callback=lambda: {(): len(self.bot.guilds)}))
+
+    def pool_connections(self) -> typing.Dict[LabelValues, float]:
+        size = self.bot.db.get_size()
+        idle = self.bot.db.get_idle_size()
+        return {('open',): size, ('idle',): idle, ('in_use',): size - idle, ('max',): self.bot.db.get_max_size()}
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        # the only gauge that needs a query, so read it per scrape rather than on every job change
+        record = await self.bot.db.fetchrow("SELECT COUNT(*) AS pending, "
+                                            "COUNT(*) FILTER (WHERE expiration < (now() at time zone 'utc')) "
+                                            "AS overdue FROM timed_jobs")
+        self.timed_jobs, self.overdue_timed_jobs = record['pending'], record['overdue']
+        return web.Response(text=self.registry.render(), content_type="text/plain", charset="utf-8")
+
+    async def start(self, host: str, port: int):
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
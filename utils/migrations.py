@@ -0,0 +1,79 @@
+import os
+import re
+import typing
+import asyncpg
+
+MIGRATIONS_PATH = "data/migrations"
+
+# arbitrary key so only one process migrates the database at a time
+MIGRATION_LOCK_ID = 0x7465727279
+
+# files are named <version>_<name>.sql, for example 0002_warn_index.sql
+MIGRATION_FILE_RE = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+class Migration(typing.NamedTuple):
+    version: int
+    name: str
+    path: str
+
+    def read(self) -> str:
+        with open(self.path, 'r') as migration_file:
+            return migration_file.read()
+
+
+def find_migrations(path: str = MIGRATIONS_PATH) -> typing.List[Migration]:
+    """Finds every migration file in order, raises ValueError if two files share a version"""
+    migrations = {}
+    for file_name in os.listdir(path):
+        match = MIGRATION_FILE_RE.match(file_name)
+        if match is None:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f"Migration version {version} is used by both {migrations[version].path} and {file_name}")
+        migrations[version] = Migration(version, match.group(2), os.path.join(path, file_name))
+
+    return [migrations[v] for v in sorted(migrations)]
+
+
+async def applied_versions(conn: asyncpg.Connection) -> typing.Set[int]:
+    """Gets the versions recorded in schema_version"""
+    return {r['version'] for r in await conn.fetch("SELECT version FROM terrygon.schema_version")}
+
+
+async def migrate(conn: asyncpg.Connection, path: str = MIGRATIONS_PATH) -> typing.List[Migration]:
+    """Applies every migration that has not been applied yet, each in its own transaction.
+    Returns the migrations that were applied, an up to date database only costs two queries,
+    creating schema_version if it is missing and reading the applied versions."""
+    migrations = find_migrations(path)
+    await conn.execute("""
+        CREATE SCHEMA IF NOT EXISTS terrygon;
+        CREATE TABLE IF NOT EXISTS terrygon.schema_version
+        (
+            version INT PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT (now() at time zone 'utc')
+        );
+    """)
+    applied = await applied_versions(conn)
+    if all(m.version in applied for m in migrations):
+        return []
+
+    done = []
+    await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+    try:
+        # another process may have migrated while we waited on the lock
+        applied = await applied_versions(conn)
+        for migration in migrations:
+            if migration.version in applied:
+                continue
+            async with conn.transaction():
+                await conn.execute(migration.read())
+                await conn.execute("INSERT INTO terrygon.schema_version (version, name) VALUES ($1, $2)",
+                                   migration.version, migration.name)
+            done.append(migration)
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
+
+    return done
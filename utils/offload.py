@@ -0,0 +1,74 @@
+import asyncio
+import collections
+import functools
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from utils import metrics
+
+# how many jobs of each kind may run at once, the rest wait their turn without holding a thread
+DEFAULT_LIMITS = {
+    'image': 2,
+    'qr': 2
+}
+DEFAULT_LIMIT = 2
+
+
+class Offloader:
+    """Runs CPU heavy functions on a shared thread pool so they do not block the event loop"""
+
+    def __init__(self, bot, workers: int = 4, timeout: float = 10.0, limits: typing.Mapping[str, int] = None):
+        self.bot = bot
+        self.timeout = timeout
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="terrygon-offload")
+        self._semaphores: typing.Dict[str, asyncio.Semaphore] = {}
+        self.queued = collections.Counter()
+        self.running = collections.Counter()
+        self.timeouts = bot.metrics.add(metrics.Counter(
+            "terrygon_offload_timeouts_total", "Offloaded jobs that took longer than their timeout", ("kind",)))
+        bot.metrics.add(metrics.Gauge("terrygon_offload_jobs", "Offloaded jobs by state", ("kind", "state"),
+                                      callback=self.job_counts))
+
+    def job_counts(self) -> typing.Dict[typing.Tuple[str, str], int]:
+        counts = {(kind, 'queued'): n for kind, n in self.queued.items()}
+        counts.update({(kind, 'running'): n for kind, n in self.running.items()})
+        return counts
+
+    def _semaphore(self, kind: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(kind)
+        if semaphore is None:
+            semaphore = self._semaphores[kind] = asyncio.Semaphore(self.limits.get(kind, DEFAULT_LIMIT))
+        return semaphore
+
+    async def run(self, kind: str, func: typing.Callable, *args, timeout: float = None, **kwargs):
+        """Runs func(*args, **kwargs) in the pool and returns its result.
+        Raises asyncio.TimeoutError if it takes longer than timeout, a job that has not started by then is cancelled,
+        one that has keeps its slot until it finishes as threads cannot be interrupted."""
+        loop = asyncio.get_event_loop()
+        semaphore = self._semaphore(kind)
+        self.queued[kind] += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.queued[kind] -= 1
+
+        self.running[kind] += 1
+
+        def release(_):
+            loop.call_soon_threadsafe(self._release, kind, semaphore)
+
+        job = self.executor.submit(functools.partial(func, *args, **kwargs))
+        job.add_done_callback(release)
+        try:
+            # cancelling the wrapped future on timeout also cancels the job if it is still waiting for a thread
+            return await asyncio.wait_for(asyncio.wrap_future(job), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts.inc(kind)
+            raise
+
+    def _release(self, kind: str, semaphore: asyncio.Semaphore):
+        self.running[kind] -= 1
+        semaphore.release()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
@@ -47,6 +47,43 @@ class BasicEmbedMenu(menus.ListPageSource):
         return embed
 
 
+class KeysetPageSource(menus.PageSource):
+    """Pages through rows ordered by a unique key, a page at a time instead of fetching every row up front.
+    fetch_after(key, limit) and fetch_before(key, limit) return rows in key order, fetch_before(None, limit) the last
+    rows. Every page the menu buttons can reach has a known neighbouring key, so each page is a single indexed query."""
+
+    def __init__(self, fetch_after, fetch_before, total: int, *, per_page: int, key: str = 'id', first_key=0):
+        self.fetch_after = fetch_after
+        self.fetch_before = fetch_before
+        self.total = total
+        self.per_page = per_page
+        self.key = key
+        # page number: key just before its first row or just after its last row
+        self._after = {0: first_key}
+        self._before = {self.get_max_pages() - 1: None}
+
+    def is_paginating(self):
+        return self.total > self.per_page
+
+    def get_max_pages(self):
+        return max(1, -(-self.total // self.per_page))
+
+    async def get_page(self, page_number):
+        if page_number in self._after:
+            rows = await self.fetch_after(self._after[page_number], self.per_page)
+        elif page_number in self._before:
+            last_page = page_number == self.get_max_pages() - 1
+            limit = self.total - page_number * self.per_page if last_page else self.per_page
+            rows = await self.fetch_before(self._before[page_number], limit)
+        else:
+            raise IndexError(f"Page {page_number} is not next to a page that has been shown")
+
+        if rows:
+            self._after[page_number + 1] = rows[-1][self.key]
+            self._before[page_number - 1] = rows[0][self.key]
+        return rows
+
+
 class ReactDeletePages(menus.MenuPages):
     def __init__(self, source, **kwargs):
         super().__init__(source, **kwargs)
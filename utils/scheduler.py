@@ -85,24 +85,19 @@ class Scheduler:
             return None
 
         guild = self.bot.get_guild(action_record['guild_id'])
-        author = guild.get_member(action_record['author_id'])
-        user = guild.get_member(action_record['user_id'])
         if guild is None:
             # properly log later THIS SHOULD TRIGGER ALMOST NEVER
             await self.bot.db.execute(f"DELETE FROM {table} WHERE id = $1", action_id)
             return None
 
-        if user is None:
-            try:
-                user = await self.bot.fetch_user(action_record['user_id'])
-            except discord.NotFound:
-                user = action_record['user_id']
-
-        if author is None:
-            try:
-                author = await self.bot.fetch_user(action_record['author_id'])
-            except discord.NotFound:
-                author = action_record['author_id']
+        author = guild.get_member(action_record['author_id'])
+        user = guild.get_member(action_record['user_id'])
+        if user is None or author is None:
+            users = await self.bot.user_resolver.fetch_many((action_record['user_id'], action_record['author_id']))
+            if user is None:
+                user = users[action_record['user_id']] or action_record['user_id']
+            if author is None:
+                author = users[action_record['author_id']] or action_record['author_id']
 
         return guild, author, user
 
@@ -115,8 +110,7 @@ class Scheduler:
         else:
             return
 
-        muted_role = guild.get_role(
-            await self.bot.db.fetchval("SELECT muted_role FROM roles WHERE guild_id = $1", guild.id))
+        muted_role = guild.get_role((await self.bot.guild_config.get(guild.id)).muted_role)
         if muted_role is None:
             return await self.bot.terrygon_logger.custom_log("mod_logs", guild, f":warning: **Muted role could not be found !** Could not unmute user.")
 
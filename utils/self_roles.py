@@ -188,7 +188,7 @@ async def get_role_info(ctx: commands.Context, table: str, token: tuple) -> int:
     file = None
     if table[-6:].lower() == "colors":
         role_rgb = role.color.to_rgb()
-        file = common.image_from_rgb(role_rgb)
+        file = await ctx.bot.offload.run('image', common.image_from_rgb, role_rgb)
         embed.set_image(url="attachment://color.png")
 
     await ctx.send(embed=embed, file=file)
@@ -0,0 +1,82 @@
+import time
+import typing
+from contextlib import contextmanager
+
+# modules that must be loaded before the key module, only matters when both are in the config
+MODULE_DEPENDENCIES = {
+    'mod': ('settings',),
+    'warn': ('mod', 'settings'),
+    'filter': ('warn',),
+    'automod': ('filter',),
+    'events': ('settings',)
+}
+
+
+def dependency_order(modules: typing.Iterable[str]) -> typing.List[str]:
+    """Orders modules so dependencies load first, otherwise keeping config order.
+    Raises ValueError on a dependency cycle."""
+    modules = list(dict.fromkeys(modules))
+    configured = set(modules)
+    ordered = []
+    visiting = set()
+    done = set()
+
+    def visit(module: str):
+        if module in done:
+            return
+        if module in visiting:
+            raise ValueError(f"Module dependency cycle involving {module}")
+        visiting.add(module)
+        for dependency in MODULE_DEPENDENCIES.get(module, ()):
+            if dependency in configured:
+                visit(dependency)
+        visiting.discard(module)
+        done.add(module)
+        ordered.append(module)
+
+    for m in modules:
+        visit(m)
+    return ordered
+
+
+class StartupReport:
+    """Records how long each startup phase took"""
+
+    def __init__(self):
+        self.phases: typing.List[typing.Tuple[str, float]] = []
+        self.started = time.perf_counter()
+        self.finished: typing.Optional[float] = None
+
+    def record(self, phase: str, seconds: float):
+        self.phases.append((phase, seconds))
+
+    @contextmanager
+    def timed(self, phase: str):
+        """Times the body of a with block as a phase, failed phases are recorded too"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start)
+
+    async def timed_coro(self, phase: str, coro: typing.Awaitable):
+        """Times an awaitable as a phase, for phases that run concurrently"""
+        with self.timed(phase):
+            return await coro
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def total(self) -> float:
+        """Wall clock time from the report's creation until finish(), concurrent phases overlap within it"""
+        return (self.finished or time.perf_counter()) - self.started
+
+    def format(self) -> str:
+        """Formats the phases slowest first"""
+        width = max((len(phase) for phase, _ in self.phases), default=0)
+        lines = [f"Startup took {self.total * 1000:.1f}ms wall clock:"]
+        for phase, seconds in sorted(self.phases, key=lambda p: p[1], reverse=True):
+            share = seconds / self.total if self.total else 0.0
+            lines.append(f"  {phase.ljust(width)}  {seconds * 1000:9.1f}ms  {share:6.1%}")
+        return "\n".join(lines)
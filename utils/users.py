@@ -0,0 +1,81 @@
+import asyncio
+import collections
+import time
+import typing
+import discord
+from utils import metrics
+
+# (expiry, user or None if the user does not exist)
+_Entry = typing.Tuple[float, typing.Optional[discord.User]]
+
+
+class UserResolver:
+    """Looks up users by id without repeating REST calls.
+    Users discord has cached are returned straight away, the rest are fetched with at most `concurrency` requests
+    at once and kept for `ttl` seconds, users that do not exist included. Concurrent lookups of an id share a request."""
+
+    def __init__(self, bot, ttl: float = 3600.0, size: int = 10000, concurrency: int = 8):
+        self.bot = bot
+        self.ttl = ttl
+        self.size = size
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # oldest first
+        self._cache: typing.OrderedDict[int, _Entry] = collections.OrderedDict()
+        self._pending: typing.Dict[int, asyncio.Future] = {}
+        self.lookups = bot.metrics.add(metrics.Counter(
+            "terrygon_user_lookups_total", "User lookups by where the answer came from", ("source",)))
+
+    def cached(self, user_id: int) -> typing.Tuple[bool, typing.Optional[discord.User]]:
+        """(found, user) from discord's cache or ours, found is False if the user has to be fetched"""
+        user = self.bot.get_user(user_id)
+        if user is not None:
+            return True, user
+
+        entry = self._cache.get(user_id)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                return True, entry[1]
+            del self._cache[user_id]
+        return False, None
+
+    async def fetch(self, user_id: int) -> typing.Optional[discord.User]:
+        """The user with this id, None if there is none. Other HTTP errors are raised and not cached"""
+        found, user = self.cached(user_id)
+        if found:
+            self.lookups.inc('cache')
+            return user
+
+        pending = self._pending.get(user_id)
+        if pending is None:
+            pending = self._pending[user_id] = asyncio.ensure_future(self._fetch(user_id))
+            pending.add_done_callback(lambda _: self._pending.pop(user_id, None))
+        else:
+            self.lookups.inc('shared')
+        return await asyncio.shield(pending)
+
+    async def _fetch(self, user_id: int) -> typing.Optional[discord.User]:
+        async with self._semaphore:
+            try:
+                user = await self.bot.fetch_user(user_id)
+                self.lookups.inc('fetched')
+            except discord.NotFound:
+                user = None
+                self.lookups.inc('missing')
+
+        self._cache[user_id] = (time.monotonic() + self.ttl, user)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.size:
+            self._cache.popitem(last=False)
+        return user
+
+    async def fetch_many(self, user_ids: typing.Iterable[int]) -> typing.Dict[int, typing.Optional[discord.User]]:
+        """Looks up every id concurrently, ids of users that do not exist map to None"""
+        user_ids = list(dict.fromkeys(user_ids))
+        users = await asyncio.gather(*(self.fetch(user_id) for user_id in user_ids))
+        return dict(zip(user_ids, users))
+
+    def invalidate(self, user_id: int = None):
+        if user_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(user_id, None)
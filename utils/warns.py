@@ -0,0 +1,125 @@
+"""Warn storage, every change to warns keeps warn_counters in step in the same statement so counting is one row read"""
+import bisect
+import typing
+
+ADD_WARN = """
+    WITH warn AS (
+        INSERT INTO warns (user_id, author_id, guild_id, reason) VALUES ($1, $2, $3, $4) RETURNING guild_id, user_id
+    )
+    INSERT INTO warn_counters (guild_id, user_id, warns) SELECT guild_id, user_id, 1 FROM warn
+    ON CONFLICT (guild_id, user_id) DO UPDATE SET warns = warn_counters.warns + 1
+    RETURNING warns
+"""
+
+DELETE_WARN = """
+    WITH warn AS (
+        DELETE FROM warns WHERE warn_id = $1 AND guild_id = $2 RETURNING guild_id, user_id
+    )
+    UPDATE warn_counters SET warns = warn_counters.warns - 1 FROM warn
+    WHERE warn_counters.guild_id = warn.guild_id AND warn_counters.user_id = warn.user_id
+    RETURNING warn_counters.warns
+"""
+
+CLEAR_WARNS = """
+    WITH cleared AS (
+        DELETE FROM warns WHERE guild_id = $1 AND user_id = $2
+    )
+    DELETE FROM warn_counters WHERE guild_id = $1 AND user_id = $2 RETURNING warns
+"""
+
+
+async def add_warn(db, guild_id: int, user_id: int, author_id: int, reason: typing.Optional[str]) -> int:
+    """Warns a user and returns their warn number. Concurrent warns of the same user queue on the counter's row
+    so each gets its own number"""
+    return await db.fetchval(ADD_WARN, user_id, author_id, guild_id, reason)
+
+
+async def delete_warn(db, guild_id: int, warn_id: int) -> typing.Optional[int]:
+    """Deletes a warn by id, returns how many warns its user has left or None if the guild has no such warn"""
+    return await db.fetchval(DELETE_WARN, warn_id, guild_id)
+
+
+async def clear_warns(db, guild_id: int, user_id: int) -> int:
+    """Deletes all of a user's warns and returns how many there were"""
+    return await db.fetchval(CLEAR_WARNS, guild_id, user_id) or 0
+
+
+async def warn_count(db, guild_id: int, user_id: int) -> int:
+    return await db.fetchval("SELECT warns FROM warn_counters WHERE guild_id = $1 AND user_id = $2",
+                             guild_id, user_id) or 0
+
+
+NTH_WARN = """
+    SELECT * FROM warns WHERE warn_id = (
+        SELECT warn_id FROM warns WHERE guild_id = $1 AND user_id = $2 ORDER BY warn_id OFFSET $3 LIMIT 1
+    )
+"""
+
+
+async def nth_warn(db, guild_id: int, user_id: int, warn_num: int):
+    """A user's warn_num'th warn counting from 1, None if they have fewer warns.
+    The inner query only reads the (guild_id, user_id, warn_id) index, the one warn found is the only row read"""
+    if warn_num < 1:
+        return None
+    return await db.fetchrow(NTH_WARN, guild_id, user_id, warn_num - 1)
+
+
+async def warns_after(db, guild_id: int, user_id: int, after_warn_id: int, limit: int) -> typing.List:
+    """Up to limit of a user's warns following after_warn_id, oldest first"""
+    return await db.fetch("SELECT * FROM warns WHERE guild_id = $1 AND user_id = $2 AND warn_id > $3 "
+                          "ORDER BY warn_id LIMIT $4", guild_id, user_id, after_warn_id, limit)
+
+
+async def warns_before(db, guild_id: int, user_id: int, before_warn_id: typing.Optional[int],
+                       limit: int) -> typing.List:
+    """Up to limit of a user's warns preceding before_warn_id, or their latest warns if it is None, oldest first"""
+    if before_warn_id is None:
+        records = await db.fetch("SELECT * FROM warns WHERE guild_id = $1 AND user_id = $2 "
+                                 "ORDER BY warn_id DESC LIMIT $3", guild_id, user_id, limit)
+    else:
+        records = await db.fetch("SELECT * FROM warns WHERE guild_id = $1 AND user_id = $2 AND warn_id < $3 "
+                                 "ORDER BY warn_id DESC LIMIT $4", guild_id, user_id, before_warn_id, limit)
+    return records[::-1]
+
+
+class PunishmentLadder:
+    """A guild's warn punishments as warn numbers in order and the action at each, stored as jsonb with string keys"""
+    __slots__ = ('numbers', 'actions')
+
+    def __init__(self, tiers: typing.Mapping[int, str] = None):
+        ordered = sorted((int(number), action) for number, action in (tiers or {}).items())
+        self.numbers: typing.Tuple[int, ...] = tuple(number for number, _ in ordered)
+        self.actions: typing.Tuple[str, ...] = tuple(action for _, action in ordered)
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def items(self) -> typing.Iterator[typing.Tuple[int, str]]:
+        return zip(self.numbers, self.actions)
+
+    def to_json(self) -> typing.Dict[str, str]:
+        return {str(number): action for number, action in self.items()}
+
+    def get(self, warn_num: int) -> typing.Optional[str]:
+        """The action set for exactly this warn number"""
+        i = bisect.bisect_left(self.numbers, warn_num)
+        if i < len(self.numbers) and self.numbers[i] == warn_num:
+            return self.actions[i]
+        return None
+
+    def for_warn(self, warn_num: int) -> typing.Optional[str]:
+        """The action for a user's warn_num'th warn, every warn past the last tier gets the last tier's action"""
+        if self.numbers and warn_num > self.numbers[-1]:
+            return self.actions[-1]
+        return self.get(warn_num)
+
+    def with_tier(self, warn_num: int, action: str) -> 'PunishmentLadder':
+        tiers = dict(self.items())
+        tiers[warn_num] = action
+        return PunishmentLadder(tiers)
+
+    def without_tier(self, warn_num: int) -> 'PunishmentLadder':
+        return PunishmentLadder({number: action for number, action in self.items() if number != warn_num})
+
+    def __repr__(self):
+        return f"<PunishmentLadder {self.to_json()}>"
@@ -0,0 +1,73 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+import typing
+
+
+class LoopWatchdog:
+    """Measures how late the event loop runs scheduled callbacks, and when it stops
+    responding for longer than the threshold, logs what the loop thread is stuck running"""
+
+    def __init__(self, bot, threshold: float = 0.25, interval: float = 0.1):
+        self.bot = bot
+        self.threshold = threshold
+        self.interval = interval
+        self.last_beat = time.monotonic()
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._loop: typing.Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: typing.Optional[int] = None
+        self._reported_beat: typing.Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: typing.Optional[threading.Thread] = None
+        self._task: typing.Optional[asyncio.Task] = None
+
+    def start(self):
+        self._loop = asyncio.get_event_loop()
+        self._loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self._task = self._loop.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _heartbeat(self):
+        """Runs on the loop, how late each wake up is compared to the requested sleep is the lag"""
+        while not self._stop.is_set():
+            before = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - before - self.interval)
+            self.last_beat = now
+            self.max_lag = max(self.max_lag, lag)
+            self.bot.metrics.loop_lag.observe(value=lag)
+            if lag >= self.threshold:
+                self.stalls += 1
+                self.bot.error_log.warning(f"Event loop was blocked for {lag * 1000:.0f}ms")
+
+    def _monitor(self):
+        """Runs in its own thread so it can look at the loop while the loop is stuck"""
+        while not self._stop.wait(self.interval):
+            beat = self.last_beat
+            blocked = time.monotonic() - beat
+            # one stack per stall, the heartbeat logs how long it lasted once the loop is free again
+            if blocked < self.threshold + self.interval or self._reported_beat == beat:
+                continue
+            self._reported_beat = beat
+            try:
+                self.bot.error_log.error(self.describe_stall(blocked))
+            except Exception:
+                pass
+
+    def describe_stall(self, blocked: float) -> str:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else "Unable to get the loop's stack\n"
+        task = asyncio.current_task(self._loop)
+        running = f"task {task.get_name()} running {task.get_coro()!r}" if task is not None else "a callback"
+        return f"Event loop blocked for over {blocked * 1000:.0f}ms by {running}, stack:\n{stack}"